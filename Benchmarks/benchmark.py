@@ -0,0 +1,527 @@
+#! /usr/bin/env python
+"""Benchmark the time and peak memory of fontTools' main pipelines on
+synthetic fonts, and compare the results against a stored baseline.
+
+The fonts are generated from scratch, deterministically, with the sizes
+given on the command line: TrueType outlines drawn with TTGlyphPen, a
+'kern' and a 'ss01' feature built with feaLib, and a number of masters
+along a weight axis for varLib. Nothing is downloaded. The startup time
+of the ttx, pyftsubset, pyftmerge and varLib command line tools is also
+measured, by running them in a new interpreter.
+
+	$ python Benchmarks/benchmark.py --save baseline.json
+	$ # ... make some changes ...
+	$ python Benchmarks/benchmark.py --compare baseline.json
+
+Timings are the best of --repeat runs. Peak memory is the highest amount
+of memory allocated by Python during one run, as traced by tracemalloc
+(not available on Python 2). A benchmark regresses when its time or
+peak memory exceeds the baseline by more than --tolerance; in that case
+the script exits with status 1. Baselines are only comparable when
+recorded on the same machine, with the same font sizes.
+"""
+
+from __future__ import print_function, division, absolute_import
+import os
+import sys
+
+# run against the fontTools in this repository, not an installed one
+LIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Lib")
+sys.path.insert(0, LIB_DIR)
+
+from fontTools.misc.py23 import *
+from fontTools.misc.timeTools import timestampFromString
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables._c_m_a_p import cmap_format_4
+from fontTools.ttLib.tables.O_S_2f_2 import Panose, panoseFormat
+from fontTools.misc import sstruct
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.feaLib.builder import addOpenTypeFeaturesFromString
+from fontTools.misc.loggingTools import Timer
+from collections import OrderedDict
+import argparse
+import platform
+import subprocess
+import tempfile
+import shutil
+import random
+import json
+import gc
+
+try:
+	import tracemalloc
+except ImportError:
+	# Python 2
+	tracemalloc = None
+
+
+# the first code point mapped by the synthetic fonts; glyphs are mapped to
+# consecutive code points, skipping the surrogates
+FIRST_CODEPOINT = 0x100
+
+WEIGHT_MIN, WEIGHT_MAX = 100, 900
+
+
+def glyphCodepoints(numGlyphs):
+	codepoints = []
+	code = FIRST_CODEPOINT
+	while len(codepoints) < numGlyphs - 1:
+		if not 0xD800 <= code <= 0xDFFF:
+			codepoints.append(code)
+		code += 1
+	return codepoints
+
+
+def drawGlyph(pen, index, weight):
+	"""Draw a glyph with two contours, whose shape depends on 'index', and
+	whose stem width depends on 'weight'."""
+	stem = 20 + weight // 10
+	width = 300 + (index * 37) % 400
+	height = 500 + (index * 53) % 250
+	pen.moveTo((50, 0))
+	pen.lineTo((50, height))
+	pen.qCurveTo((50 + width // 2, height + 80), (50 + width, height))
+	pen.lineTo((50 + width, 0))
+	pen.closePath()
+	pen.moveTo((50 + stem, stem))
+	pen.lineTo((50 + width - stem, stem))
+	pen.lineTo((50 + width - stem, height - stem))
+	pen.lineTo((50 + stem, height - stem))
+	pen.closePath()
+	return width + 100
+
+
+def makeFeatures(glyphOrder, numKernPairs, weight, seed):
+	rng = random.Random(seed)
+	glyphs = glyphOrder[1:]
+	lines = ["languagesystem DFLT dflt;", "", "feature kern {"]
+	pairs = set()
+	while len(pairs) < min(numKernPairs, len(glyphs) ** 2):
+		pairs.add((rng.choice(glyphs), rng.choice(glyphs)))
+	for left, right in sorted(pairs):
+		# same pairs in all masters, with weight-dependent values
+		value = -(rng.randint(10, 60) + weight // 20)
+		lines.append("    pos %s %s %d;" % (left, right, value))
+	lines.append("} kern;")
+	lines.append("")
+	lines.append("feature ss01 {")
+	half = len(glyphs) // 2
+	for i in range(0, half, 10):
+		lines.append("    sub %s by %s;" % (glyphs[i], glyphs[half + i]))
+	lines.append("} ss01;")
+	return "\n".join(lines) + "\n"
+
+
+def makeFont(numGlyphs, numKernPairs, weight=WEIGHT_MIN, seed=0):
+	"""Return a synthetic TrueType font with 'numGlyphs' glyphs (including
+	.notdef), each mapped to a code point, and 'numKernPairs' kerning pairs.
+	"""
+	codepoints = glyphCodepoints(numGlyphs)
+	glyphOrder = [".notdef"] + ["uni%04X" % c for c in codepoints]
+
+	font = TTFont()
+	font.setGlyphOrder(glyphOrder)
+
+	glyf = font["glyf"] = newTable("glyf")
+	glyf.glyphOrder = glyphOrder
+	glyf.glyphs = {}
+	hmtx = font["hmtx"] = newTable("hmtx")
+	hmtx.metrics = {}
+	for index, glyphName in enumerate(glyphOrder):
+		pen = TTGlyphPen(None)
+		advance = drawGlyph(pen, index, weight)
+		glyph = glyf.glyphs[glyphName] = pen.glyph()
+		glyph.recalcBounds(glyf)
+		hmtx.metrics[glyphName] = (advance, glyph.xMin)
+	font["loca"] = newTable("loca")
+
+	head = font["head"] = newTable("head")
+	head.tableVersion = 1.0
+	head.fontRevision = 1.0
+	head.checkSumAdjustment = 0
+	head.magicNumber = 0x5F0F3CF5
+	head.flags = 0x0003
+	head.unitsPerEm = 1000
+	head.created = head.modified = timestampFromString("Mon Jan  1 00:00:00 2018")
+	head.xMin = head.yMin = head.xMax = head.yMax = 0
+	head.macStyle = 0
+	head.lowestRecPPEM = 8
+	head.fontDirectionHint = 2
+	head.indexToLocFormat = 0
+	head.glyphDataFormat = 0
+
+	hhea = font["hhea"] = newTable("hhea")
+	hhea.tableVersion = 0x00010000
+	hhea.ascent = 900
+	hhea.descent = -300
+	hhea.lineGap = 0
+	hhea.advanceWidthMax = hhea.minLeftSideBearing = 0
+	hhea.minRightSideBearing = hhea.xMaxExtent = 0
+	hhea.caretSlopeRise = 1
+	hhea.caretSlopeRun = hhea.caretOffset = 0
+	hhea.reserved0 = hhea.reserved1 = hhea.reserved2 = hhea.reserved3 = 0
+	hhea.metricDataFormat = 0
+	hhea.numberOfHMetrics = numGlyphs
+
+	maxp = font["maxp"] = newTable("maxp")
+	maxp.tableVersion = 0x00010000
+	maxp.numGlyphs = numGlyphs
+	for name in ("maxPoints", "maxContours", "maxCompositePoints",
+			"maxCompositeContours", "maxTwilightPoints", "maxStorage",
+			"maxFunctionDefs", "maxInstructionDefs", "maxStackElements",
+			"maxSizeOfInstructions", "maxComponentElements",
+			"maxComponentDepth"):
+		setattr(maxp, name, 0)
+	maxp.maxZones = 1
+
+	os2 = font["OS/2"] = newTable("OS/2")
+	os2.version = 4
+	os2.xAvgCharWidth = 0
+	os2.usWeightClass = weight
+	os2.usWidthClass = 5
+	os2.fsType = 0
+	os2.ySubscriptXSize = os2.ySuperscriptXSize = 700
+	os2.ySubscriptYSize = os2.ySuperscriptYSize = 650
+	os2.ySubscriptXOffset = os2.ySuperscriptXOffset = 0
+	os2.ySubscriptYOffset = 140
+	os2.ySuperscriptYOffset = 477
+	os2.yStrikeoutSize = 50
+	os2.yStrikeoutPosition = 250
+	os2.sFamilyClass = 0
+	os2.panose = Panose()
+	for name in sstruct.getformat(panoseFormat)[1]:
+		setattr(os2.panose, name, 0)
+	os2.ulUnicodeRange1 = os2.ulUnicodeRange2 = 0
+	os2.ulUnicodeRange3 = os2.ulUnicodeRange4 = 0
+	os2.achVendID = "NONE"
+	os2.fsSelection = 0x0040
+	os2.usFirstCharIndex = os2.usLastCharIndex = 0
+	os2.sTypoAscender = 750
+	os2.sTypoDescender = -250
+	os2.sTypoLineGap = 200
+	os2.usWinAscent = 900
+	os2.usWinDescent = 300
+	os2.ulCodePageRange1 = 1
+	os2.ulCodePageRange2 = 0
+	os2.sxHeight = 500
+	os2.sCapHeight = 700
+	os2.usDefaultChar = 0
+	os2.usBreakChar = 32
+	os2.usMaxContext = 2
+
+	cmap = font["cmap"] = newTable("cmap")
+	cmap.tableVersion = 0
+	subtable = cmap_format_4(4)
+	subtable.platformID, subtable.platEncID, subtable.language = 3, 1, 0
+	subtable.cmap = dict(zip(codepoints, glyphOrder[1:]))
+	cmap.tables = [subtable]
+
+	name = font["name"] = newTable("name")
+	name.names = []
+	for nameID, string in ((1, "Benchmark"), (2, "Regular"),
+			(3, "Benchmark-%d" % weight), (4, "Benchmark Regular"),
+			(5, "Version 1.000"), (6, "Benchmark-Regular")):
+		name.setName(string, nameID, 3, 1, 0x409)
+
+	post = font["post"] = newTable("post")
+	post.formatType = 2.0
+	post.italicAngle = 0.0
+	post.underlinePosition = -75
+	post.underlineThickness = 50
+	post.isFixedPitch = 0
+	post.minMemType42 = post.maxMemType42 = 0
+	post.minMemType1 = post.maxMemType1 = 0
+	post.extraNames = []
+	post.mapping = {}
+
+	addOpenTypeFeaturesFromString(
+		font, makeFeatures(glyphOrder, numKernPairs, weight, seed))
+	return font
+
+
+DESIGNSPACE = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<designspace format="3">
+  <axes>
+    <axis default="%(min)d" maximum="%(max)d" minimum="%(min)d" name="weight" tag="wght"/>
+  </axes>
+  <sources>
+%(sources)s
+  </sources>
+</designspace>
+"""
+
+SOURCE = """\
+    <source filename="%(filename)s" name="master_%(weight)d">
+      <location>
+        <dimension name="weight" xvalue="%(weight)d"/>
+      </location>
+    </source>"""
+
+
+def makeMasters(directory, numGlyphs, numKernPairs, numMasters, seed=0):
+	"""Write 'numMasters' synthetic fonts along a weight axis, and the
+	designspace referencing them, in 'directory'. Return the path of the
+	designspace and the paths of the masters, the default one first."""
+	weights = [WEIGHT_MIN]
+	if numMasters > 1:
+		step = (WEIGHT_MAX - WEIGHT_MIN) // (numMasters - 1)
+		weights = [WEIGHT_MIN + i * step for i in range(numMasters)]
+	sources = []
+	paths = []
+	for weight in weights:
+		filename = "Benchmark-%d.ttf" % weight
+		path = os.path.join(directory, filename)
+		makeFont(numGlyphs, numKernPairs, weight, seed).save(path)
+		paths.append(path)
+		sources.append(SOURCE % {"filename": filename, "weight": weight})
+	designspace = os.path.join(directory, "Benchmark.designspace")
+	with open(designspace, "w") as f:
+		f.write(DESIGNSPACE % {
+			"min": WEIGHT_MIN, "max": weights[-1], "sources": "\n".join(sources)})
+	return designspace, paths
+
+
+class Benchmark(object):
+
+	"""A benchmark named 'name', running 'func' with the result of 'setup',
+	which is neither timed nor traced. If 'traceMemory' is false, only the
+	time is measured."""
+
+	def __init__(self, name, func, setup=None, traceMemory=True):
+		self.name = name
+		self.func = func
+		self.setup = setup
+		self.traceMemory = traceMemory and tracemalloc is not None
+
+	def runOnce(self):
+		arg = self.setup() if self.setup is not None else None
+		gc.collect()
+		peak = None
+		if self.traceMemory:
+			tracemalloc.start()
+		try:
+			with Timer() as timer:
+				if arg is None:
+					self.func()
+				else:
+					self.func(arg)
+			if self.traceMemory:
+				peak = tracemalloc.get_traced_memory()[1]
+		finally:
+			if self.traceMemory:
+				tracemalloc.stop()
+		return timer.elapsed, peak
+
+	def run(self, repeat):
+		times = []
+		peaks = []
+		for _ in range(repeat):
+			time, peak = self.runOnce()
+			times.append(time)
+			peaks.append(peak)
+		return OrderedDict([
+			("time", min(times)),
+			("peakMemory", min(peaks) if self.traceMemory else None),
+		])
+
+
+# command line tools, whose startup time is measured by running them with
+# arguments that make them exit right away
+STARTUP_COMMANDS = [
+	("startup-ttx", ["-m", "fontTools.ttx", "-h"]),
+	("startup-pyftsubset", ["-m", "fontTools.subset", "--help"]),
+	("startup-pyftmerge", ["-m", "fontTools.merge"]),
+	("startup-varLib", ["-m", "fontTools", "varLib", "-h"]),
+]
+
+
+def makeStartupBenchmark(name, args):
+	env = dict(os.environ)
+	env["PYTHONPATH"] = LIB_DIR
+	command = [sys.executable] + args
+
+	def run():
+		with open(os.devnull, "w") as devnull:
+			subprocess.call(command, env=env, stdout=devnull, stderr=devnull)
+
+	return Benchmark(name, run, traceMemory=False)
+
+
+def makeBenchmarks(directory, designspace, masters):
+	from fontTools import ttx, subset, merge, varLib
+	path = masters[0]
+	ttxPath = os.path.join(directory, "Benchmark.ttx")
+	ttx.main(["-q", "-o", ttxPath, path])
+	outPath = os.path.join(directory, "out.ttf")
+	subsetCodepoints = glyphCodepoints(TTFont(path)["maxp"].numGlyphs)[::2]
+
+	def loadFont():
+		font = TTFont(path)
+		for tag in font.keys():
+			font[tag]
+		return font
+
+	def load():
+		loadFont()
+
+	def save(font):
+		font.save(BytesIO())
+
+	def ttxDump():
+		ttx.main(["-q", "-o", os.path.join(directory, "dump.ttx"), path])
+
+	def ttxCompile():
+		ttx.main(["-q", "-o", outPath, ttxPath])
+
+	def pyftsubset():
+		subset.main([path, "--output-file=%s" % outPath,
+				"--layout-features=*",
+				"--unicodes=%s" % ",".join("%04X" % c for c in subsetCodepoints)])
+
+	def buildVariable():
+		vf, _, _ = varLib.build(designspace)
+		vf.save(BytesIO())
+
+	def mergeFonts():
+		merger = merge.Merger()
+		merger.merge(masters[:2]).save(BytesIO())
+
+	def woff(font):
+		font.flavor = "woff"
+		font.save(BytesIO())
+
+	def woff2(font):
+		font.flavor = "woff2"
+		font.save(BytesIO())
+
+	benchmarks = [
+		Benchmark("load", load),
+		Benchmark("save", save, loadFont),
+		Benchmark("ttx-dump", ttxDump),
+		Benchmark("ttx-compile", ttxCompile),
+		Benchmark("subset", pyftsubset),
+	]
+	if len(masters) > 1:
+		benchmarks.append(Benchmark("varLib-build", buildVariable))
+		benchmarks.append(Benchmark("merge", mergeFonts))
+	benchmarks.append(Benchmark("woff", woff, loadFont))
+	try:
+		import brotli
+	except ImportError:
+		print("brotli not installed, skipping the woff2 benchmark",
+				file=sys.stderr)
+	else:
+		benchmarks.append(Benchmark("woff2", woff2, loadFont))
+	for name, args in STARTUP_COMMANDS:
+		benchmarks.append(makeStartupBenchmark(name, args))
+	return benchmarks
+
+
+def compareResults(results, baseline, tolerance):
+	"""Print the results next to the baseline, and return the names of the
+	benchmarks that regressed by more than 'tolerance' (a fraction)."""
+	if baseline.get("config") != results["config"]:
+		print("warning: baseline was recorded with different settings: %s"
+				% baseline.get("config"), file=sys.stderr)
+	regressions = []
+	print("%-18s %12s %12s %8s %12s %12s %8s" % (
+		"benchmark", "time", "baseline", "ratio",
+		"peak KiB", "baseline", "ratio"))
+	for name, result in results["benchmarks"].items():
+		old = baseline.get("benchmarks", {}).get(name)
+		if old is None:
+			print("%-18s %12.4f %12s" % (name, result["time"], "-"))
+			continue
+		row = ["%-18s" % name]
+		regressed = False
+		for field, scale in (("time", 1), ("peakMemory", 1 / 1024)):
+			new, before = result[field], old.get(field)
+			if new is None or not before:
+				row.append("%12s %12s %8s" % ("-", "-", "-"))
+				continue
+			ratio = new / before
+			if ratio > 1 + tolerance:
+				regressed = True
+			row.append("%12.4f %12.4f %7.2fx" % (new * scale, before * scale, ratio))
+		if regressed:
+			regressions.append(name)
+			row.append("REGRESSED")
+		print(" ".join(row))
+	return regressions
+
+
+def main(args=None):
+	parser = argparse.ArgumentParser(
+		description="Benchmark fontTools on synthetic fonts.")
+	parser.add_argument("-g", "--glyphs", type=int, default=2000,
+		help="number of glyphs of the fonts (default: %(default)s)")
+	parser.add_argument("-k", "--kern-pairs", type=int, default=5000,
+		help="number of kerning pairs (default: %(default)s)")
+	parser.add_argument("-m", "--masters", type=int, default=3,
+		help="number of masters along the weight axis (default: %(default)s)")
+	parser.add_argument("-r", "--repeat", type=int, default=3,
+		help="runs of each benchmark; the best is kept (default: %(default)s)")
+	parser.add_argument("--seed", type=int, default=0,
+		help="seed of the kerning pairs generator (default: %(default)s)")
+	parser.add_argument("-b", "--benchmark", action="append",
+		help="only run the named benchmark (may be repeated)")
+	parser.add_argument("--save", metavar="JSON",
+		help="write the results to this file")
+	parser.add_argument("--compare", metavar="JSON",
+		help="compare the results against this baseline file")
+	parser.add_argument("--tolerance", type=float, default=0.1,
+		help="fraction above the baseline that counts as a regression "
+			"(default: %(default)s)")
+	options = parser.parse_args(args)
+
+	import logging
+	logging.getLogger("fontTools").setLevel(logging.ERROR)
+
+	config = OrderedDict([
+		("glyphs", options.glyphs),
+		("kernPairs", options.kern_pairs),
+		("masters", options.masters),
+		("seed", options.seed),
+	])
+	results = OrderedDict([
+		("config", config),
+		("python", platform.python_version()),
+		("platform", platform.platform()),
+		("benchmarks", OrderedDict()),
+	])
+
+	directory = tempfile.mkdtemp()
+	try:
+		designspace, masters = makeMasters(
+			directory, options.glyphs, options.kern_pairs, options.masters,
+			options.seed)
+		for benchmark in makeBenchmarks(directory, designspace, masters):
+			if options.benchmark and benchmark.name not in options.benchmark:
+				continue
+			result = benchmark.run(options.repeat)
+			results["benchmarks"][benchmark.name] = result
+			if not options.compare:
+				peak = result["peakMemory"]
+				print("%-18s %8.4fs %s" % (benchmark.name, result["time"],
+					"-" if peak is None else "%d KiB" % (peak // 1024)))
+	finally:
+		shutil.rmtree(directory)
+
+	if options.save:
+		with open(options.save, "w") as f:
+			json.dump(results, f, indent=2)
+			f.write("\n")
+
+	if options.compare:
+		with open(options.compare) as f:
+			baseline = json.load(f)
+		regressions = compareResults(results, baseline, options.tolerance)
+		if regressions:
+			print("regressions: %s" % ", ".join(regressions), file=sys.stderr)
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
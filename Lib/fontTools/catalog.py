@@ -0,0 +1,411 @@
+"""Persistent index of the fonts found in one or more directories.
+
+The catalog is a SQLite database recording, for each font (or each face of
+a font collection), its family and style names, weight and width classes,
+variation axes and Unicode coverage. It is built by reading only the sfnt
+table directory and the small 'name', 'OS/2', 'cmap' and 'fvar' tables, and
+it is updated incrementally: files whose size and modification time are
+unchanged are not opened again, and files whose table directory checksums
+are unchanged are not parsed again.
+
+Queries only touch the database:
+
+	>>> catalog = FontCatalog("fonts.db")  # doctest: +SKIP
+	>>> catalog.update(["/usr/share/fonts"])  # doctest: +SKIP
+	>>> catalog.query(unicodes=[0x0E01], variable=True)  # doctest: +SKIP
+	[('/usr/share/fonts/NotoSansThai[wdth,wght].ttf', -1)]
+
+From the command line:
+
+	$ fonttools catalog fonts.db update /usr/share/fonts
+	$ fonttools catalog fonts.db query --unicodes=U+0E01 --variable
+"""
+
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont, TTLibError, newTable
+from fontTools.ttLib.sfnt import SFNTReader
+import hashlib
+import sqlite3
+import struct
+import os
+import sys
+import logging
+
+
+log = logging.getLogger("fontTools.catalog")
+
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+	id INTEGER PRIMARY KEY,
+	path TEXT UNIQUE NOT NULL,
+	size INTEGER NOT NULL,
+	mtime REAL NOT NULL,
+	checksum TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fonts (
+	id INTEGER PRIMARY KEY,
+	fileId INTEGER NOT NULL REFERENCES files(id),
+	fontNumber INTEGER NOT NULL,
+	family TEXT,
+	subfamily TEXT,
+	fullName TEXT,
+	postscriptName TEXT,
+	weightClass INTEGER,
+	widthClass INTEGER,
+	isVariable INTEGER NOT NULL,
+	axes TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS coverage (
+	fontId INTEGER NOT NULL REFERENCES fonts(id),
+	block INTEGER NOT NULL,
+	bits INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fontsFileIndex ON fonts(fileId);
+CREATE INDEX IF NOT EXISTS fontsFamilyIndex ON fonts(family COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS coverageBlockIndex ON coverage(block, fontId);
+CREATE INDEX IF NOT EXISTS coverageFontIndex ON coverage(fontId);
+"""
+
+# The coverage of each font is stored as one bitmap per block of
+# BLOCK_SIZE code points that has any code point mapped. Bitmaps are
+# stored as (non-negative) SQLite integers.
+BLOCK_BITS = 5
+BLOCK_SIZE = 1 << BLOCK_BITS
+
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc', '.otc', '.woff', '.woff2')
+
+_glyphOrder = None
+
+
+def _getGlyphOrder():
+	# The cmap subtables map glyph IDs to names; any names will do since
+	# only the code points are recorded, so share one list large enough
+	# for all the glyph IDs.
+	global _glyphOrder
+	if _glyphOrder is None:
+		_glyphOrder = ['glyph%05d' % i for i in range(0x10000)]
+	return _glyphOrder
+
+
+def buildCoverage(unicodes):
+	"""Return a {block: bits} dict with the coverage bitmaps of the
+	'unicodes' code points."""
+	coverage = {}
+	for code in unicodes:
+		block = code >> BLOCK_BITS
+		coverage[block] = coverage.get(block, 0) | (1 << (code & (BLOCK_SIZE - 1)))
+	return coverage
+
+
+def directoryChecksum(reader):
+	"""Return a digest of the tags, checksums and lengths in the table
+	directory of 'reader'. It changes when any table data does, without
+	having to read them.
+
+	WOFF2 directories have no checksums, so for WOFF2 fonts the table data,
+	which the reader has already decompressed, is hashed instead.
+	"""
+	entries = sorted((tag, getattr(entry, "checkSum", 0), entry.length)
+			for tag, entry in reader.tables.items())
+	data = ";".join("%s:%d:%d" % entry for entry in entries)
+	digest = hashlib.sha1(tobytes(data, encoding="utf-8"))
+	if reader.flavor == "woff2":
+		digest.update(reader.transformBuffer.getvalue())
+	return digest.hexdigest()
+
+
+def readFontInfo(reader):
+	"""Read the catalog record of the font of an SFNTReader, decompiling
+	only the small tables needed."""
+	info = {
+		"family": None,
+		"subfamily": None,
+		"fullName": None,
+		"postscriptName": None,
+		"weightClass": None,
+		"widthClass": None,
+		"axes": [],
+		"unicodes": set(),
+	}
+	if "name" in reader:
+		name = newTable("name")
+		name.decompile(reader["name"], None)
+		info["family"] = name.getDebugName(16) or name.getDebugName(1)
+		info["subfamily"] = name.getDebugName(17) or name.getDebugName(2)
+		info["fullName"] = name.getDebugName(4)
+		info["postscriptName"] = name.getDebugName(6)
+	if "OS/2" in reader:
+		data = reader["OS/2"]
+		if len(data) >= 8:
+			info["weightClass"], info["widthClass"] = struct.unpack(">HH", data[4:8])
+	if "fvar" in reader:
+		fvar = newTable("fvar")
+		fvar.decompile(reader["fvar"], None)
+		info["axes"] = [axis.axisTag for axis in fvar.axes]
+	if "cmap" in reader:
+		font = TTFont()
+		font.setGlyphOrder(_getGlyphOrder())
+		cmap = newTable("cmap")
+		cmap.decompile(reader["cmap"], font)
+		for subtable in cmap.tables:
+			if subtable.isUnicode() and hasattr(subtable, "cmap"):
+				info["unicodes"].update(subtable.cmap.keys())
+	return info
+
+
+def readFontFile(file):
+	"""Read the table directories of all the fonts in an open font file.
+	Return a list of (fontNumber, SFNTReader) tuples; fontNumber is -1
+	unless the file is a font collection."""
+	header = file.read(4)
+	file.seek(0)
+	if header == b"ttcf":
+		reader = SFNTReader(file, checkChecksums=0, fontNumber=0)
+		readers = [(0, reader)]
+		for fontNumber in range(1, reader.numFonts):
+			file.seek(0)
+			readers.append((fontNumber, SFNTReader(file, checkChecksums=0, fontNumber=fontNumber)))
+		return readers
+	return [(-1, SFNTReader(file, checkChecksums=0))]
+
+
+class FontCatalog(object):
+
+	"""A font catalog stored in the SQLite database at 'path' (created if
+	it doesn't exist)."""
+
+	def __init__(self, path):
+		self.path = path
+		self.db = sqlite3.connect(path)
+		version = self.db.execute("PRAGMA user_version").fetchone()[0]
+		if version not in (0, SCHEMA_VERSION):
+			raise TTLibError("unsupported font catalog version %d: %s" % (version, path))
+		self.db.executescript(SCHEMA)
+		self.db.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+		self.db.commit()
+
+	def close(self):
+		self.db.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, type, value, traceback):
+		self.close()
+
+	def __len__(self):
+		return self.db.execute("SELECT COUNT(*) FROM fonts").fetchone()[0]
+
+	def update(self, paths):
+		"""Add or refresh the font files found in 'paths' (files or
+		directories, which are searched recursively), and forget indexed
+		files that no longer exist under them. Return the number of files
+		that were (re)indexed."""
+		found = set()
+		for path in paths:
+			path = os.path.abspath(path)
+			if os.path.isdir(path):
+				for root, dirs, files in os.walk(path):
+					dirs.sort()
+					for fileName in sorted(files):
+						if fileName.lower().endswith(FONT_EXTENSIONS):
+							found.add(os.path.join(root, fileName))
+			elif os.path.exists(path):
+				found.add(path)
+		count = 0
+		for path in sorted(found):
+			if self.updateFile(path):
+				count += 1
+		self._removeMissing(paths, found)
+		self.db.commit()
+		return count
+
+	def updateFile(self, path):
+		"""Index the font file at 'path', unless it hasn't changed since
+		it was last indexed. Return whether it was (re)indexed."""
+		path = os.path.abspath(path)
+		st = os.stat(path)
+		row = self.db.execute(
+			"SELECT id, size, mtime, checksum FROM files WHERE path = ?",
+			(path,)).fetchone()
+		if row is not None and row[1] == st.st_size and row[2] == st.st_mtime:
+			return False
+		try:
+			with open(path, "rb") as file:
+				readers = readFontFile(file)
+				checksum = hashlib.sha1(tobytes(";".join(
+					directoryChecksum(reader) for _, reader in readers))).hexdigest()
+				if row is not None and row[3] == checksum:
+					self.db.execute(
+						"UPDATE files SET size = ?, mtime = ? WHERE id = ?",
+						(st.st_size, st.st_mtime, row[0]))
+					return False
+				infos = [(fontNumber, readFontInfo(reader)) for fontNumber, reader in readers]
+		except Exception as e:
+			log.warning("Skipping '%s': %s", path, e)
+			if row is not None:
+				self._removeFile(row[0])
+			return False
+
+		if row is not None:
+			self._removeFile(row[0])
+		log.info("Indexing '%s'", path)
+		fileId = self.db.execute(
+			"INSERT INTO files (path, size, mtime, checksum) VALUES (?, ?, ?, ?)",
+			(path, st.st_size, st.st_mtime, checksum)).lastrowid
+		for fontNumber, info in infos:
+			fontId = self.db.execute(
+				"INSERT INTO fonts (fileId, fontNumber, family, subfamily, fullName, "
+				"postscriptName, weightClass, widthClass, isVariable, axes) "
+				"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+				(fileId, fontNumber, info["family"], info["subfamily"],
+				 info["fullName"], info["postscriptName"], info["weightClass"],
+				 info["widthClass"], bool(info["axes"]), " ".join(info["axes"]))).lastrowid
+			self.db.executemany(
+				"INSERT INTO coverage (fontId, block, bits) VALUES (?, ?, ?)",
+				[(fontId, block, bits)
+				 for block, bits in sorted(buildCoverage(info["unicodes"]).items())])
+		return True
+
+	def _removeFile(self, fileId):
+		self.db.execute(
+			"DELETE FROM coverage WHERE fontId IN (SELECT id FROM fonts WHERE fileId = ?)",
+			(fileId,))
+		self.db.execute("DELETE FROM fonts WHERE fileId = ?", (fileId,))
+		self.db.execute("DELETE FROM files WHERE id = ?", (fileId,))
+
+	def _removeMissing(self, paths, found):
+		roots = [os.path.abspath(path) for path in paths]
+		for fileId, path in self.db.execute("SELECT id, path FROM files").fetchall():
+			if path in found:
+				continue
+			for root in roots:
+				if path == root or path.startswith(os.path.join(root, "")):
+					log.info("Removing '%s'", path)
+					self._removeFile(fileId)
+					break
+
+	def query(self, unicodes=None, family=None, variable=None):
+		"""Return a sorted list of (path, fontNumber) tuples for the fonts
+		that map all the 'unicodes' code points, whose family name is
+		'family' (compared case-insensitively), and that are variable or
+		not, if 'variable' is not None. fontNumber is -1 for fonts that are
+		not in a collection."""
+		conditions = []
+		args = []
+		if family is not None:
+			conditions.append("fonts.family = ? COLLATE NOCASE")
+			args.append(family)
+		if variable is not None:
+			conditions.append("fonts.isVariable = ?")
+			args.append(bool(variable))
+		with self.db:
+			if unicodes:
+				# The blocks of the query go in a temporary table, which is
+				# joined to the coverage: the fonts that cover them all are
+				# those with a matching row for each of them. This keeps the
+				# SQL statement, and the number of its parameters, the same
+				# for any number of blocks.
+				coverage = buildCoverage(unicodes)
+				self.db.execute(
+					"CREATE TEMP TABLE IF NOT EXISTS queryCoverage ("
+					"block INTEGER PRIMARY KEY, bits INTEGER NOT NULL)")
+				self.db.execute("DELETE FROM queryCoverage")
+				self.db.executemany(
+					"INSERT INTO queryCoverage (block, bits) VALUES (?, ?)",
+					sorted(coverage.items()))
+				conditions.append(
+					"fonts.id IN (SELECT coverage.fontId FROM queryCoverage "
+					"JOIN coverage ON coverage.block = queryCoverage.block "
+					"AND (coverage.bits & queryCoverage.bits) = queryCoverage.bits "
+					"GROUP BY coverage.fontId HAVING COUNT(*) = ?)")
+				args.append(len(coverage))
+			sql = ("SELECT files.path, fonts.fontNumber FROM fonts "
+				"JOIN files ON files.id = fonts.fileId")
+			if conditions:
+				sql += " WHERE " + " AND ".join(conditions)
+			sql += " ORDER BY files.path, fonts.fontNumber"
+			return [tuple(row) for row in self.db.execute(sql, args)]
+
+	def getFontInfo(self, path, fontNumber=-1):
+		"""Return a dict with the catalog record of a font, or None if it
+		isn't indexed."""
+		row = self.db.execute(
+			"SELECT fonts.id, family, subfamily, fullName, postscriptName, "
+			"weightClass, widthClass, isVariable, axes FROM fonts "
+			"JOIN files ON files.id = fonts.fileId "
+			"WHERE files.path = ? AND fonts.fontNumber = ?",
+			(os.path.abspath(path), fontNumber)).fetchone()
+		if row is None:
+			return None
+		unicodes = set()
+		for block, bits in self.db.execute(
+				"SELECT block, bits FROM coverage WHERE fontId = ?", (row[0],)):
+			for i in range(BLOCK_SIZE):
+				if bits & (1 << i):
+					unicodes.add((block << BLOCK_BITS) + i)
+		return {
+			"family": row[1],
+			"subfamily": row[2],
+			"fullName": row[3],
+			"postscriptName": row[4],
+			"weightClass": row[5],
+			"widthClass": row[6],
+			"isVariable": bool(row[7]),
+			"axes": row[8].split(),
+			"unicodes": unicodes,
+		}
+
+
+def main(args=None):
+	from argparse import ArgumentParser
+	from fontTools import configLogger
+	from fontTools.subset import parse_unicodes
+
+	parser = ArgumentParser(prog="catalog",
+		description="Build and query an index of font files.")
+	parser.add_argument("index", metavar="INDEX", help="Path to the catalog database")
+	parser.add_argument(
+		"-v", "--verbose", action="store_true", help="Log the files indexed")
+	subparsers = parser.add_subparsers(dest="command")
+	updateParser = subparsers.add_parser("update",
+		help="Add or refresh the fonts in the given files and directories")
+	updateParser.add_argument("paths", metavar="PATH", nargs="+")
+	queryParser = subparsers.add_parser("query",
+		help="List the fonts matching all the given criteria")
+	queryParser.add_argument("-u", "--unicodes", default="",
+		help="Code points that must be mapped, eg. U+0041-005A,U+00E9")
+	queryParser.add_argument("-f", "--family", help="Family name")
+	group = queryParser.add_mutually_exclusive_group()
+	group.add_argument("--variable", dest="variable", action="store_true",
+		default=None, help="Only list variable fonts")
+	group.add_argument("--no-variable", dest="variable", action="store_false",
+		help="Only list non-variable fonts")
+	options = parser.parse_args(args)
+	if options.command is None:
+		parser.error("a command is required")
+
+	configLogger(level="INFO" if options.verbose else "WARNING")
+
+	with FontCatalog(options.index) as catalog:
+		if options.command == "update":
+			count = catalog.update(options.paths)
+			log.info("%d files indexed; %d fonts in catalog", count, len(catalog))
+		else:
+			results = catalog.query(
+				unicodes=parse_unicodes(options.unicodes),
+				family=options.family,
+				variable=options.variable)
+			for path, fontNumber in results:
+				if fontNumber < 0:
+					print(path)
+				else:
+					print("%s#%d" % (path, fontNumber))
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -3,6 +3,7 @@ from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
 import os
 import re
+import sys
 
 
 numberAddedRE = re.compile("#\d+$")
@@ -24,3 +25,125 @@ def makeOutputFileName(input, outputDir=None, extension=None, overWrite=False):
                 dirName, fileName + "#" + repr(n) + extension)
             n += 1
     return output
+
+
+def _captureOutput(func, args):
+    # Call func(*args) with sys.stdout, sys.stderr and the logging stream
+    # handlers writing to buffers; return (status, stdout, stderr), where
+    # status is 0, or 1 if func raised an exception.
+    import logging
+    out, err = StringIO(), StringIO()
+    streams = {id(sys.stdout): out, id(sys.__stdout__): out,
+               id(sys.stderr): err, id(sys.__stderr__): err}
+    handlers = []
+    for logger in (logging.getLogger(), logging.getLogger("fontTools")):
+        for handler in logger.handlers:
+            stream = getattr(handler, "stream", None)
+            if (isinstance(handler, logging.StreamHandler) and
+                    id(stream) in streams):
+                handlers.append((handler, stream))
+                handler.stream = streams[id(stream)]
+    savedStdout, savedStderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = out, err
+    try:
+        try:
+            func(*args)
+            status = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                status = e.code or 0
+            else:
+                err.write("%s\n" % e.code)
+                status = 1
+        except Exception:
+            logging.getLogger("fontTools").exception(
+                "Unhandled exception has occurred")
+            status = 1
+    finally:
+        sys.stdout, sys.stderr = savedStdout, savedStderr
+        for handler, stream in handlers:
+            handler.stream = stream
+    return status, out.getvalue(), err.getvalue()
+
+
+def _runJob(job):
+    func, args = job
+    return _captureOutput(func, args)
+
+
+def runJobs(func, argsList, jobs=1):
+    """Call func(*args) for each of the argument tuples in argsList, in a
+    pool of 'jobs' processes, and return the list of their exit statuses:
+    0 for calls that returned, 1 for those that raised an exception (which
+    is logged), or the code of SystemExit.
+
+    The output of each call to stdout, stderr and the logging stream
+    handlers is held back until the call is done, then written out in the
+    order of argsList, so that the output of different calls isn't
+    interleaved and doesn't depend on which finishes first. 'func' and the
+    arguments must be picklable.
+
+    With jobs=1 (or a single call), the calls are made one after another in
+    this process, and exceptions are propagated."""
+    argsList = list(argsList)
+    if jobs <= 1 or len(argsList) <= 1:
+        for args in argsList:
+            func(*args)
+        return [0] * len(argsList)
+
+    import multiprocessing
+    pool = multiprocessing.Pool(min(jobs, len(argsList)))
+    statuses = []
+    try:
+        results = pool.imap(_runJob, [(func, args) for args in argsList])
+        for status, out, err in results:
+            sys.stdout.write(out)
+            sys.stdout.flush()
+            sys.stderr.write(err)
+            sys.stderr.flush()
+            statuses.append(status)
+    finally:
+        pool.terminate()
+        pool.join()
+    return statuses
+
+
+def parseJobs(value):
+    """Parse the value of a -j/--jobs option: a positive number of
+    processes, or 0 for as many as there are CPUs."""
+    try:
+        jobs = int(value)
+    except ValueError:
+        jobs = -1
+    if jobs < 0:
+        raise ValueError("invalid number of jobs: %r" % value)
+    if jobs == 0:
+        import multiprocessing
+        jobs = multiprocessing.cpu_count()
+    return jobs
+
+
+def parseJobsOption(args):
+    """Take the -j/--jobs options ('-j N', '-jN', '--jobs N' or
+    '--jobs=N') out of the list of command-line 'args'. Return the number
+    of processes they ask for (see parseJobs), or None if there's none,
+    and the list of the other arguments. Raise ValueError if an option's
+    value is missing or invalid."""
+    jobs = None
+    rest = []
+    args = list(args)
+    while args:
+        arg = args.pop(0)
+        if arg in ("-j", "--jobs"):
+            if not args:
+                raise ValueError("option %s requires a value" % arg)
+            value = args.pop(0)
+        elif arg.startswith("-j"):
+            value = arg[len("-j"):]
+        elif arg.startswith("--jobs="):
+            value = arg[len("--jobs="):]
+        else:
+            rest.append(arg)
+            continue
+        jobs = parseJobs(value)
+    return jobs, rest
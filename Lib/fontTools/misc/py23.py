@@ -302,8 +302,6 @@ except AttributeError:
 		return result
 
 
-import decimal as _decimal
-
 if PY3:
 	def round2(number, ndigits=None):
 		"""
@@ -329,6 +327,8 @@ if PY3:
 				quotient += 1
 			return float(quotient * exponent)
 		else:
+			# imported here, as it's slow to import and rarely needed
+			import decimal as _decimal
 			exponent = _decimal.Decimal('10') ** (-ndigits)
 
 			d = _decimal.Decimal.from_float(number).quantize(
@@ -400,6 +400,7 @@ else:
 					quotient += 1
 				d = quotient * exponent
 			else:
+				import decimal as _decimal
 				exponent = _decimal.Decimal('10') ** (-ndigits) if ndigits != 0 else 1
 
 				d = _decimal.Decimal.from_float(number).quantize(
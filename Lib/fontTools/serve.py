@@ -0,0 +1,412 @@
+"""Serve font subsetting, conversion and instancing requests over a local
+(Unix domain) socket, keeping the fonts warm between requests.
+
+Starting Python, importing fontTools and loading a font usually take longer
+than subsetting it. The server keeps the data of the most recently used
+fonts in memory, together with a PreparedSubsetter for each set of
+subsetter options they were requested with, so that each request only
+pays for its own work. Requests are handled by a fixed number of worker
+threads.
+
+	$ fonttools serve --socket /tmp/fonttools.sock --workers 4 &
+	$ fonttools serve --socket /tmp/fonttools.sock --output-file hello.woff2 \\
+		--request '{"command": "subset", "font": "/path/to/font.ttf",
+		            "text": "Hello", "options": ["--flavor=woff2"]}'
+
+	>>> with FontClient("/tmp/fonttools.sock") as client:  # doctest: +SKIP
+	...     data = client.subset("font.ttf", text="Hello", options=["--flavor=woff2"])
+
+Each request is a JSON object on one line. Each response is a JSON object
+on one line: {"status": "ok", "size": N} followed by N bytes of font data,
+or {"status": "error", "message": "..."}. A connection can carry any number
+of requests, which are answered in order. The requests are:
+
+	{"command": "subset", "font": PATH, "unicodes": [...], "glyphs": [...],
+	 "gids": [...], "text": "...", "options": [...]}
+		Subset the font, like pyftsubset. The unicodes can also be a string,
+		as for pyftsubset --unicodes, and the options are a list of
+		pyftsubset options (such as "--flavor=woff2").
+	{"command": "convert", "font": PATH, "flavor": null | "woff" | "woff2"}
+		Save the font with another flavor.
+	{"command": "instance", "font": PATH, "location": {"wght": 700, ...},
+	 "flavor": null | "woff" | "woff2"}
+		Instantiate a variable font, like fontTools.varLib.mutator.
+	{"command": "ping"}
+		Return no data.
+
+Font paths are relative to the server's working directory; FontClient
+makes them absolute. Fonts are reloaded when their file's size or
+modification time changes.
+"""
+
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont
+from collections import OrderedDict
+import threading
+import socket
+import json
+import sys
+import os
+import logging
+try:
+	import socketserver
+	import queue
+except ImportError:
+	# Python 2
+	import SocketServer as socketserver
+	import Queue as queue
+
+
+log = logging.getLogger("fontTools.serve")
+
+
+FLAVORS = (None, "woff", "woff2")
+
+
+class FontServerError(Exception):
+	"""Raised by FontClient when the server answers a request with an
+	error."""
+
+
+class _WarmFont(object):
+
+	def __init__(self, path, stat):
+		self.stat = stat
+		with open(path, "rb") as f:
+			self.data = f.read()
+		# {tuple of pyftsubset options: PreparedSubsetter}, least recently
+		# used first
+		self.subsetters = OrderedDict()
+		self.lock = threading.Lock()
+
+	def getSubsetter(self, optionArgs, maxSubsetters):
+		from fontTools import subset
+		key = tuple(optionArgs)
+		with self.lock:
+			prepared = self.subsetters.pop(key, None)
+			if prepared is None:
+				options = subset.Options()
+				options.parse_opts(list(optionArgs))
+				# glyph names are always loaded: load_font() otherwise
+				# patches the 'post' table class while loading, which
+				# other threads would see
+				font = subset.load_font(BytesIO(self.data), options)
+				prepared = subset.PreparedSubsetter(font, options)
+				font.close()
+			self.subsetters[key] = prepared
+			while len(self.subsetters) > maxSubsetters:
+				self.subsetters.popitem(last=False)
+			return prepared
+
+	def load(self, **kwargs):
+		return TTFont(BytesIO(self.data), **kwargs)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+	def handle(self):
+		while True:
+			line = self.rfile.readline()
+			if not line:
+				break
+			if not line.strip():
+				continue
+			try:
+				request = json.loads(line.decode("utf-8"))
+				if not isinstance(request, dict):
+					raise ValueError("request is not a JSON object")
+				data = self.server.handleRequest(request)
+			except Exception as e:
+				log.info("Request failed: %s", line, exc_info=True)
+				response = {"status": "error",
+						"message": "%s: %s" % (type(e).__name__, e)}
+				data = b""
+			else:
+				response = {"status": "ok", "size": len(data)}
+			self.wfile.write(tobytes(json.dumps(response) + "\n"))
+			self.wfile.write(data)
+			self.wfile.flush()
+
+
+class FontServer(socketserver.UnixStreamServer):
+
+	"""Serves requests on the Unix domain socket at 'socketPath' (see the
+	module docstring), with 'workers' threads each handling one connection
+	at a time. While all of them are busy, up to 'workers' more
+	connections wait for one to be free, then new connections wait to be
+	accepted.
+
+	The data of up to 'maxFonts' fonts is kept in memory, with up to
+	'maxSubsetters' PreparedSubsetters each. With a 'cacheDir', subset
+	fonts are also kept in a subset.SubsetCache of up to 'cacheMaxSize'
+	bytes in that directory.
+
+	Call serve_forever() to start serving, and shutdown() from another
+	thread then server_close() to stop.
+	"""
+
+	def __init__(self, socketPath, workers=4, maxFonts=32, maxSubsetters=4,
+			cacheDir=None, cacheMaxSize=100*1024*1024):
+		# the subsetter is imported here, so that FontClient and the
+		# --request command start quickly
+		from fontTools import subset
+		self.maxFonts = maxFonts
+		self.maxSubsetters = maxSubsetters
+		self.cache = subset.SubsetCache(cacheDir, cacheMaxSize) if cacheDir else None
+		self._fonts = OrderedDict()  # least recently used first
+		self._lock = threading.Lock()
+		if workers < 1:
+			raise ValueError("invalid number of workers: %r" % workers)
+		self._connections = queue.Queue(workers)
+		self._active = set()
+		self._closing = False
+		socketserver.UnixStreamServer.__init__(self, socketPath, _RequestHandler)
+		self._workers = []
+		for i in range(workers):
+			thread = threading.Thread(target=self._work,
+					name="FontServer worker %d" % i)
+			thread.daemon = True
+			thread.start()
+			self._workers.append(thread)
+
+	def process_request(self, request, clientAddress):
+		# blocks the accept loop while the queue is full
+		self._connections.put((request, clientAddress))
+
+	def _work(self):
+		while True:
+			item = self._connections.get()
+			if item is None:
+				break
+			request, clientAddress = item
+			with self._lock:
+				if self._closing:
+					self.shutdown_request(request)
+					continue
+				self._active.add(request)
+			try:
+				self.finish_request(request, clientAddress)
+			except Exception:
+				self.handle_error(request, clientAddress)
+			finally:
+				with self._lock:
+					self._active.discard(request)
+				self.shutdown_request(request)
+
+	def handle_error(self, request, clientAddress):
+		log.exception("Error handling a connection")
+
+	def server_close(self):
+		socketserver.UnixStreamServer.server_close(self)
+		# end the connections that are waiting for a request, and those
+		# that are waiting for a worker
+		with self._lock:
+			self._closing = True
+			for request in self._active:
+				try:
+					request.shutdown(socket.SHUT_RD)
+				except socket.error:
+					pass
+		for thread in self._workers:
+			self._connections.put(None)
+		for thread in self._workers:
+			thread.join()
+		del self._workers[:]
+		if os.path.exists(self.server_address):
+			os.remove(self.server_address)
+
+	def getFont(self, path):
+		"""Return the _WarmFont of the font at 'path', reading it if it's
+		not in memory or has changed since."""
+		path = os.path.abspath(path)
+		st = os.stat(path)
+		stat = (st.st_size, st.st_mtime)
+		with self._lock:
+			font = self._fonts.pop(path, None)
+			if font is None or font.stat != stat:
+				log.info("Reading '%s'", path)
+				font = _WarmFont(path, stat)
+			self._fonts[path] = font
+			while len(self._fonts) > self.maxFonts:
+				self._fonts.popitem(last=False)
+			return font
+
+	def handleRequest(self, request):
+		"""Return the font data answering 'request', a dict."""
+		command = request.get("command")
+		if command == "ping":
+			return b""
+		handler = getattr(self, "_handle_%s" % command, None)
+		if handler is None:
+			raise ValueError("unknown command: %r" % command)
+		if "font" not in request:
+			raise ValueError("'%s' request without 'font'" % command)
+		return handler(self.getFont(request["font"]), request)
+
+	def _handle_subset(self, font, request):
+		from fontTools import subset
+		glyphs = request.get("glyphs", [])
+		gids = request.get("gids", [])
+		unicodes = request.get("unicodes", [])
+		if isinstance(unicodes, basestring):
+			unicodes = subset.parse_unicodes(unicodes)
+		text = request.get("text", "")
+		prepared = font.getSubsetter(request.get("options", []),
+				self.maxSubsetters)
+		options = prepared.options
+		if self.cache is not None:
+			key = subset.SubsetCache.make_key(font.data, options,
+					glyphs=glyphs, gids=gids, unicodes=unicodes, text=text)
+			data = self.cache.get(key)
+			if data is not None:
+				return data
+		subsetFont = prepared.subset(glyphs=glyphs, gids=gids,
+				unicodes=unicodes, text=text)
+		buf = BytesIO()
+		subset.save_font(subsetFont, buf, options)
+		subsetFont.close()
+		data = buf.getvalue()
+		if self.cache is not None:
+			self.cache.put(key, data)
+		return data
+
+	def _handle_convert(self, font, request):
+		ttFont = font.load(lazy=True)
+		return _saveFont(ttFont, request.get("flavor"))
+
+	def _handle_instance(self, font, request):
+		from fontTools.varLib.mutator import instantiateVariableFont
+		location = request.get("location", {})
+		if not isinstance(location, dict):
+			raise ValueError("'location' is not a JSON object")
+		loc = {}
+		for tag, value in location.items():
+			if len(tag) > 4:
+				raise ValueError("invalid axis tag: %r" % tag)
+			loc[tag.ljust(4)] = float(value)
+		ttFont = instantiateVariableFont(font.load(), loc)
+		return _saveFont(ttFont, request.get("flavor"))
+
+
+def _saveFont(font, flavor):
+	if flavor not in FLAVORS:
+		raise ValueError("invalid flavor: %r" % flavor)
+	font.flavor = flavor
+	buf = BytesIO()
+	font.save(buf)
+	font.close()
+	return buf.getvalue()
+
+
+class FontClient(object):
+
+	"""A connection to a FontServer listening on the Unix domain socket at
+	'socketPath'. Each method sends one request and returns the font data
+	of the response, or raises FontServerError."""
+
+	def __init__(self, socketPath, timeout=None):
+		self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.socket.settimeout(timeout)
+		self.socket.connect(socketPath)
+		self._file = self.socket.makefile("rb")
+
+	def close(self):
+		self._file.close()
+		self.socket.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, type, value, traceback):
+		self.close()
+
+	def request(self, request):
+		"""Send 'request', a dict, and return the data of the response."""
+		if "font" in request:
+			request = dict(request, font=os.path.abspath(request["font"]))
+		self.socket.sendall(tobytes(json.dumps(request) + "\n"))
+		line = self._file.readline()
+		if not line:
+			raise FontServerError("connection closed by the server")
+		response = json.loads(line.decode("utf-8"))
+		if response.get("status") != "ok":
+			raise FontServerError(response.get("message"))
+		size = response["size"]
+		data = self._file.read(size)
+		if len(data) != size:
+			raise FontServerError("connection closed by the server")
+		return data
+
+	def ping(self):
+		self.request({"command": "ping"})
+
+	def subset(self, font, unicodes=[], glyphs=[], gids=[], text="",
+			options=[]):
+		return self.request({"command": "subset", "font": font,
+				"unicodes": unicodes, "glyphs": glyphs, "gids": gids,
+				"text": text, "options": options})
+
+	def convert(self, font, flavor):
+		return self.request({"command": "convert", "font": font,
+				"flavor": flavor})
+
+	def instance(self, font, location, flavor=None):
+		return self.request({"command": "instance", "font": font,
+				"location": location, "flavor": flavor})
+
+
+def main(args=None):
+	from argparse import ArgumentParser
+	from fontTools import configLogger
+
+	parser = ArgumentParser(prog="serve",
+		description="Serve font subsetting, conversion and instancing "
+		"requests on a Unix domain socket, or send one request.")
+	parser.add_argument("--socket", required=True, metavar="PATH",
+		help="Path to the socket")
+	parser.add_argument("-w", "--workers", type=int, default=4,
+		help="Number of worker threads (default: 4)")
+	parser.add_argument("--max-fonts", type=int, default=32,
+		help="Number of fonts kept in memory (default: 32)")
+	parser.add_argument("--cache-dir",
+		help="Keep subset fonts in this directory, see pyftsubset --cache-dir")
+	parser.add_argument("--cache-max-size", type=int, default=100*1024*1024,
+		help="Size of the subset cache in bytes (default: 100MB)")
+	parser.add_argument("--request", metavar="JSON",
+		help="Send this request to the server, instead of starting one")
+	parser.add_argument("-o", "--output-file",
+		help="Where to write the font data of the --request")
+	parser.add_argument("-v", "--verbose", action="store_true",
+		help="Log the fonts read, the requests that fail and the subsetting steps")
+	options = parser.parse_args(args)
+
+	configLogger(level="INFO" if options.verbose else "WARNING")
+
+	if options.request is not None:
+		with FontClient(options.socket) as client:
+			try:
+				data = client.request(json.loads(options.request))
+			except FontServerError as e:
+				log.error("%s", e)
+				return 1
+		if options.output_file:
+			with open(options.output_file, "wb") as f:
+				f.write(data)
+		return 0
+
+	server = FontServer(options.socket, workers=options.workers,
+		maxFonts=options.max_fonts, cacheDir=options.cache_dir,
+		cacheMaxSize=options.cache_max_size)
+	log.info("Serving on %s", options.socket)
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
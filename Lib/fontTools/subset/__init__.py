@@ -4,19 +4,31 @@
 
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
-from fontTools import ttLib
+from fontTools import ttLib, version
 from fontTools.ttLib.tables import otTables
+from fontTools.ttLib.tables import _g_l_y_f
+from fontTools.ttLib.tables import _g_v_a_r
+from fontTools.ttLib.tables import _h_m_t_x
 from fontTools.misc import psCharStrings
 from fontTools.pens.basePen import NullPen
 from fontTools.misc.loggingTools import Timer
+from fontTools.misc.cliTools import parseJobsOption, runJobs
 import sys
+import os
 import struct
 import array
+import functools
+import hashlib
 import logging
-from collections import Counter
+import tempfile
+from collections import Counter, OrderedDict
+try:
+    from collections import UserList
+except ImportError:
+    from UserList import UserList
 from types import MethodType
 
-__usage__ = "pyftsubset font-file [glyph...] [--option=value]..."
+__usage__ = "pyftsubset font-file [font-file...] [glyph...] [--option=value]..."
 
 __doc__="""\
 pyftsubset -- OpenType font subsetter and optimizer
@@ -38,7 +50,8 @@ Usage:
 
 Arguments:
   font-file
-    The input font file.
+    The input font file. More .ttf, .otf, .woff or .woff2 font files may
+    follow, before any glyph; each is subset the same way (see --jobs).
   glyph
     Specify one or more glyph identifiers to include in the subset. Must be
     PS glyph names, or the special string '*' to keep the entire glyph set.
@@ -76,6 +89,15 @@ Initial glyph set specification:
   --unicodes-file=<path>
       Like --unicodes, but reads from a file. Anything after a '#' on any
       line in the file is ignored as comments.
+  --batch-file=<path>
+      Make one subset font per line of the file <path>, each line being a
+      name followed by Unicode codepoints and ranges in the --unicodes
+      syntax; anything after a '#' is ignored as comments. The font is
+      loaded and prepared once for all of them, and the glyphs, gids, text
+      and unicodes given by the other options are added to each. The
+      output files are named after --output-file, with '{name}' replaced
+      by the line's name; without '{name}', the name is inserted before
+      the file extension.
   --ignore-missing-glyphs
       Do not fail if some requested glyphs or gids are not available in
       the font.
@@ -312,6 +334,20 @@ Other font-specific options:
       Don't change the 'OS/2 xAvgCharWidth' field. [default]
 
 Application options:
+  -j <number>, --jobs=<number>
+      Subset in up to <number> processes (0 for one per CPU): several font
+      files given before the glyphs are subset in parallel, to their default
+      output files (font-file.subset), and the lines of a --batch-file are
+      divided among the processes. The messages about each font file are
+      written out together when it's done, in the order of the font files,
+      and the exit status is 1 if any of them failed. [default: 1]
+  --cache-dir=<path>
+      Keep subset fonts in the directory <path>, keyed by the input font's
+      data and the requested glyphs and options, and reuse them for the same
+      request without loading the font. [default: no cache]
+  --cache-max-size=<bytes>
+      Remove the least recently used subset fonts from the cache directory
+      when it holds more than <bytes> of them. [default: 104857600]
   --verbose
       Display verbose information of the subsetting process.
   --timing
@@ -375,6 +411,24 @@ def _set_update(s, *others):
 def _dict_subset(d, glyphs):
     return {g:d[g] for g in glyphs}
 
+def _metrics_subset(metrics, glyphs):
+    # Keep the hmtx/vmtx metrics arrays, in glyph order, so that compiling
+    # and getAdvances() don't go through a dict of tuples.
+    if not isinstance(metrics, _h_m_t_x.CompactMetrics):
+        return _dict_subset(metrics, glyphs)
+    indices = [i for i,g in enumerate(metrics.glyphOrder) if g in glyphs]
+    if len(indices) != len(glyphs):
+        missing = set(glyphs).difference(metrics.glyphOrder)
+        raise KeyError(sorted(missing)[0])
+    def take(values):
+        items = [values[i] for i in indices]
+        if isinstance(values, array.array):
+            return array.array(values.typecode, items)
+        return items
+    return _h_m_t_x.CompactMetrics([metrics.glyphOrder[i] for i in indices],
+                                   take(metrics.advances),
+                                   take(metrics.sideBearings))
+
 
 @_add_method(otTables.Coverage)
 def intersect(self, glyphs):
@@ -756,6 +810,27 @@ def may_have_non_1to1(self):
 def may_have_non_1to1(self):
     return True
 
+@_add_method(otTables.SingleSubst,
+             otTables.MultipleSubst,
+             otTables.AlternateSubst,
+             otTables.LigatureSubst,
+             otTables.ReverseChainSingleSubst)
+def may_match_any_glyph(self):
+    return False
+
+@_add_method(otTables.ContextSubst,
+             otTables.ChainContextSubst)
+def may_match_any_glyph(self):
+    """Returns whether rules match class 0, which is all the glyphs not
+    in the class definition, after the first glyph."""
+    if self.Format != 2:
+        return False
+    c = self.__subset_classify_context()
+    return any(0 in klist
+               for rs in getattr(self, c.RuleSet) if rs
+               for r in getattr(rs, c.Rule) if r
+               for klist in c.RuleData(r))
+
 @_add_method(otTables.ContextSubst,
              otTables.ChainContextSubst,
              otTables.ContextPos,
@@ -1112,6 +1187,13 @@ def may_have_non_1to1(self):
     else:
         assert 0, "unknown format: %s" % self.Format
 
+@_add_method(otTables.ExtensionSubst)
+def may_match_any_glyph(self):
+    if self.Format == 1:
+        return self.ExtSubTable.may_match_any_glyph()
+    else:
+        assert 0, "unknown format: %s" % self.Format
+
 @_add_method(otTables.ExtensionSubst,
              otTables.ExtensionPos)
 def subset_glyphs(self, s):
@@ -1190,6 +1272,10 @@ def collect_lookups(self):
 def may_have_non_1to1(self):
     return any(st.may_have_non_1to1() for st in self.SubTable if st)
 
+@_add_method(otTables.Lookup)
+def may_match_any_glyph(self):
+    return any(st.may_match_any_glyph() for st in self.SubTable if st)
+
 @_add_method(otTables.LookupList)
 def subset_glyphs(self, s):
     """Returns the indices of nonempty lookups."""
@@ -1376,20 +1462,113 @@ def subset_glyphs(self, s):
                      for strike in self.strikeData]
   return True
 
-@_add_method(ttLib.getTableClass('GSUB'))
-def closure_glyphs(self, s):
-    s.table = self.table
-    if self.table.ScriptList:
-        feature_indices = self.table.ScriptList.collect_features()
+def _collect_feature_lookups(table):
+    """Returns the sorted indices of the lookups used by the features of a
+    GSUB/GPOS table."""
+    if table.ScriptList:
+        feature_indices = table.ScriptList.collect_features()
     else:
         feature_indices = []
-    if self.table.FeatureList:
-        lookup_indices = self.table.FeatureList.collect_lookups(feature_indices)
+    if table.FeatureList:
+        lookup_indices = table.FeatureList.collect_lookups(feature_indices)
     else:
         lookup_indices = []
-    if getattr(self.table, 'FeatureVariations', None):
-        lookup_indices += self.table.FeatureVariations.collect_lookups(feature_indices)
-    lookup_indices = _uniq_sort(lookup_indices)
+    if getattr(table, 'FeatureVariations', None):
+        lookup_indices += table.FeatureVariations.collect_lookups(feature_indices)
+    return _uniq_sort(lookup_indices)
+
+def _collect_strings(table):
+    """Returns the set of all strings in an OpenType table and its
+    subtables; in layout lookups, these are the glyph names."""
+    strings = set()
+    stack = [table]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, basestring):
+            strings.add(obj)
+        elif isinstance(obj, (list, tuple, UserList)):
+            stack.extend(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, otTables.BaseTable):
+            obj.ensureDecompiled()
+            stack.extend(vars(obj).values())
+    return strings
+
+class _GSUBClosureIndex(object):
+    """Closes glyph sets over a 'GSUB' table with a worklist: after a first
+    pass over all the lookups of the features, only the lookups that refer
+    to the glyphs added since (or to nested lookups that do) run again."""
+
+    def __init__(self, gsub):
+        self.table = table = gsub.table
+        lookups = table.LookupList.Lookup if table.LookupList else []
+        self.lookup_indices = [i for i in _collect_feature_lookups(table)
+                               if i < len(lookups) and lookups[i]]
+
+        # Glyphs and nested lookups of each lookup; None for lookups that
+        # can match any glyph
+        own = {}
+        for i,lookup in enumerate(lookups):
+            if not lookup:
+                continue
+            glyphs = None if lookup.may_match_any_glyph() else _collect_strings(lookup)
+            nested = [j for j in lookup.collect_lookups()
+                      if j < len(lookups) and lookups[j]]
+            own[i] = (glyphs, nested)
+
+        self.lookups_by_glyph = {}
+        self.any_glyph_lookups = []
+        for i in self.lookup_indices:
+            glyphs = set()
+            seen = {i}
+            stack = [i]
+            while stack and glyphs is not None:
+                lookup_glyphs, nested = own[stack.pop()]
+                if lookup_glyphs is None:
+                    glyphs = None
+                    break
+                glyphs.update(lookup_glyphs)
+                for j in nested:
+                    if j not in seen:
+                        seen.add(j)
+                        stack.append(j)
+            if glyphs is None:
+                self.any_glyph_lookups.append(i)
+            else:
+                for g in glyphs:
+                    self.lookups_by_glyph.setdefault(g, []).append(i)
+
+    def closure_glyphs(self, s):
+        s.table = self.table
+        lookups = self.table.LookupList.Lookup if self.table.LookupList else []
+        pending = self.lookup_indices
+        while pending:
+            orig_glyphs = frozenset(s.glyphs)
+            s._activeLookups = []
+            s._doneLookups = set()
+            for i in pending:
+                lookups[i].closure_glyphs(s)
+            del s._activeLookups, s._doneLookups
+            new_glyphs = s.glyphs.difference(orig_glyphs)
+            if not new_glyphs:
+                break
+            triggered = set(self.any_glyph_lookups)
+            lookups_by_glyph = self.lookups_by_glyph
+            for g in new_glyphs:
+                if g in lookups_by_glyph:
+                    triggered.update(lookups_by_glyph[g])
+            pending = sorted(triggered)
+        del s.table
+
+@_add_method(ttLib.getTableClass('GSUB'))
+def closure_glyphs(self, s):
+    # Building the lookup index of _GSUBClosureIndex costs about as much as
+    # the passes it saves; it only pays off when closing many glyph sets
+    # over the same table, see PreparedSubsetter.
+    s.table = self.table
+    lookup_indices = _collect_feature_lookups(self.table)
     if self.table.LookupList:
         while True:
             orig_glyphs = frozenset(s.glyphs)
@@ -1662,12 +1841,12 @@ def subset_glyphs(self, s):
 
 @_add_method(ttLib.getTableClass('vmtx'))
 def subset_glyphs(self, s):
-    self.metrics = _dict_subset(self.metrics, s.glyphs)
+    self.metrics = _metrics_subset(self.metrics, s.glyphs)
     return bool(self.metrics)
 
 @_add_method(ttLib.getTableClass('hmtx'))
 def subset_glyphs(self, s):
-    self.metrics = _dict_subset(self.metrics, s.glyphs)
+    self.metrics = _metrics_subset(self.metrics, s.glyphs)
     return True # Required table
 
 @_add_method(ttLib.getTableClass('hdmx'))
@@ -1725,7 +1904,11 @@ def prune_pre_subset(self, font, options):
 
 @_add_method(ttLib.getTableClass('gvar'))
 def subset_glyphs(self, s):
-    self.variations = _dict_subset(self.variations, s.glyphs)
+    if isinstance(self.variations, _g_v_a_r._LazyVariationDict):
+        # Keep the variation data of the glyphs as is, without decoding
+        self.variations = self.variations.copyGlyphs(s.glyphs)
+    else:
+        self.variations = _dict_subset(self.variations, s.glyphs)
     self.glyphCount = len(self.variations)
     return bool(self.variations)
 
@@ -1890,41 +2073,31 @@ def subset_glyphs(self, s):
     self.table.MathVariants.subset_glyphs(s)
     return True
 
+def _loaded_glyphs(glyphs):
+    if isinstance(glyphs, _g_l_y_f._LazyGlyphDict):
+        return glyphs.loadedGlyphs()
+    return glyphs.values()
+
 @_add_method(ttLib.getTableModule('glyf').Glyph)
 def remapComponentsFast(self, indices):
     if not self.data or struct.unpack(">h", self.data[:2])[0] >= 0:
         return    # Not composite
-    data = array.array("B", self.data)
-    i = 10
-    more = 1
-    while more:
-        flags =(data[i] << 8) | data[i+1]
-        glyphID =(data[i+2] << 8) | data[i+3]
-        # Remap
-        glyphID = indices.index(glyphID)
-        data[i+2] = glyphID >> 8
-        data[i+3] = glyphID & 0xFF
-        i += 4
-        flags = int(flags)
-
-        if flags & 0x0001: i += 4    # ARG_1_AND_2_ARE_WORDS
-        else: i += 2
-        if flags & 0x0008: i += 2    # WE_HAVE_A_SCALE
-        elif flags & 0x0040: i += 4    # WE_HAVE_AN_X_AND_Y_SCALE
-        elif flags & 0x0080: i += 8    # WE_HAVE_A_TWO_BY_TWO
-        more = flags & 0x0020    # MORE_COMPONENTS
-
-    self.data = data.tostring()
+    glyph_id_map = {gid:i for i,gid in enumerate(indices)}
+    self.data = _g_l_y_f.remapComponentData(self.data, glyph_id_map)
 
 @_add_method(ttLib.getTableClass('glyf'))
 def closure_glyphs(self, s):
+    get_raw_data = getattr(self.glyphs, 'getRawData', None)
     decompose = s.glyphs
     while decompose:
         components = set()
         for g in decompose:
             if g not in self.glyphs:
                 continue
-            gl = self.glyphs[g]
+            data = get_raw_data(g) if get_raw_data is not None else None
+            # Read components of glyphs that aren't loaded off their data,
+            # without keeping a Glyph object around
+            gl = self.glyphs[g] if data is None else _g_l_y_f.Glyph(data)
             for c in gl.getComponentNames(self):
                 components.add(c)
         components -= s.glyphs
@@ -1942,21 +2115,34 @@ def prune_pre_subset(self, font, options):
 
 @_add_method(ttLib.getTableClass('glyf'))
 def subset_glyphs(self, s):
-    self.glyphs = _dict_subset(self.glyphs, s.glyphs)
+    glyph_order = [g for g in self.glyphOrder if g in s.glyphs]
     indices = [i for i,g in enumerate(self.glyphOrder) if g in s.glyphs]
-    for v in self.glyphs.values():
+    glyph_id_map = {gid:i for i,gid in enumerate(indices)}
+    remap = functools.partial(_g_l_y_f.remapComponentData,
+                              glyphIDMap=glyph_id_map)
+    if isinstance(self.glyphs, _g_l_y_f._LazyGlyphDict):
+        # Copy the bytes of glyphs that weren't loaded, remapping
+        # components on the fly; don't make Glyph objects for them
+        self.glyphs = self.glyphs.copyGlyphs(glyph_order, remap)
+    else:
+        self.glyphs = _dict_subset(self.glyphs, s.glyphs)
+    for v in _loaded_glyphs(self.glyphs):
         if hasattr(v, "data"):
-            v.remapComponentsFast(indices)
+            v.data = remap(v.data)
         else:
             pass    # No need
-    self.glyphOrder = [g for g in self.glyphOrder if g in s.glyphs]
+    self.glyphOrder = glyph_order
     # Don't drop empty 'glyf' tables, otherwise 'loca' doesn't get subset.
     return True
 
 @_add_method(ttLib.getTableClass('glyf'))
 def prune_post_subset(self, options):
     remove_hinting = not options.hinting
-    for v in self.glyphs.values():
+    if isinstance(self.glyphs, _g_l_y_f._LazyGlyphDict):
+        trim = functools.partial(_g_l_y_f.trimGlyphData,
+                                 removeHinting=remove_hinting)
+        self.glyphs = self.glyphs.copyGlyphs(self.glyphOrder, trim)
+    for v in _loaded_glyphs(self.glyphs):
         v.trim(remove_hinting=remove_hinting)
     return True
 
@@ -2611,6 +2797,9 @@ class Options(object):
         self.flavor = None  # May be 'woff' or 'woff2'
         self.with_zopfli = False  # use zopfli instead of zlib for WOFF 1.0
         self.desubroutinize = False # Desubroutinize CFF CharStrings
+        self.cache_dir = None  # Directory of the SubsetCache used by main()
+        self.cache_max_size = 100 * 1024 * 1024
+        self.jobs = 1  # Number of processes for several fonts or --batch-file
         self.verbose = False
         self.timing = False
         self.xml = False
@@ -2699,6 +2888,25 @@ class Options(object):
         return posargs + passthru_options
 
 
+def _ensure_decompiled(table):
+    """Loads all the lazily loaded subtables of an OpenType table, so that
+    they resolve glyph names with the glyph order they were compiled with,
+    not the subset one."""
+    from fontTools.ttLib.tables import otBase
+    if not isinstance(table, otBase.BaseTTXConverter):
+        return
+    stack = [table.table]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, otBase.BaseTable):
+            obj.ensureDecompiled()
+            stack.extend(obj.__dict__.values())
+        elif isinstance(obj, (list, tuple, UserList)):
+            stack.extend(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+
+
 class Subsetter(object):
 
     class SubsettingError(Exception): pass
@@ -2749,6 +2957,13 @@ class Subsetter(object):
                 else:
                     log.info("%s pruned", tag)
 
+    def _get_closure_table(self, font, tag):
+        # Returns the object whose closure_glyphs() closes the glyph set
+        # over table 'tag'; PreparedSubsetter uses precomputed indexes.
+        # The closure only reads the table: tables that are not subset
+        # afterwards stay clean, see TTFont.isDirty().
+        return font.getTableReadOnly(tag)
+
     def _closure_glyphs(self, font):
 
         realGlyphs = set(font.getGlyphOrder())
@@ -2774,7 +2989,7 @@ class Subsetter(object):
         self.unicodes_missing = set()
         if 'cmap' in font:
             with timer("close glyph list over 'cmap'"):
-                font['cmap'].closure_glyphs(self)
+                self._get_closure_table(font, 'cmap').closure_glyphs(self)
                 self.glyphs.intersection_update(realGlyphs)
         self.glyphs_cmaped = frozenset(self.glyphs)
         if self.unicodes_missing:
@@ -2802,7 +3017,7 @@ class Subsetter(object):
                 log.info("Closing glyph list over 'GSUB': %d glyphs before",
                          len(self.glyphs))
                 log.glyphs(self.glyphs, font=font)
-                font['GSUB'].closure_glyphs(self)
+                self._get_closure_table(font, 'GSUB').closure_glyphs(self)
                 self.glyphs.intersection_update(realGlyphs)
                 log.info("Closed glyph list over 'GSUB': %d glyphs after",
                          len(self.glyphs))
@@ -2814,7 +3029,7 @@ class Subsetter(object):
                 log.info("Closing glyph list over 'MATH': %d glyphs before",
                          len(self.glyphs))
                 log.glyphs(self.glyphs, font=font)
-                font['MATH'].closure_glyphs(self)
+                self._get_closure_table(font, 'MATH').closure_glyphs(self)
                 self.glyphs.intersection_update(realGlyphs)
                 log.info("Closed glyph list over 'MATH': %d glyphs after",
                          len(self.glyphs))
@@ -2827,7 +3042,7 @@ class Subsetter(object):
                     log.info("Closing glyph list over '%s': %d glyphs before",
                              table, len(self.glyphs))
                     log.glyphs(self.glyphs, font=font)
-                    font[table].closure_glyphs(self)
+                    self._get_closure_table(font, table).closure_glyphs(self)
                     self.glyphs.intersection_update(realGlyphs)
                     log.info("Closed glyph list over '%s': %d glyphs after",
                              table, len(self.glyphs))
@@ -2838,7 +3053,7 @@ class Subsetter(object):
                 log.info("Closing glyph list over 'glyf': %d glyphs before",
                          len(self.glyphs))
                 log.glyphs(self.glyphs, font=font)
-                font['glyf'].closure_glyphs(self)
+                self._get_closure_table(font, 'glyf').closure_glyphs(self)
                 self.glyphs.intersection_update(realGlyphs)
                 log.info("Closed glyph list over 'glyf': %d glyphs after",
                          len(self.glyphs))
@@ -2874,6 +3089,12 @@ class Subsetter(object):
                 log.info("%s NOT subset; don't know how to subset; dropped", tag)
                 del font[tag]
 
+        if font.lazy:
+            with timer("load remaining lazy subtables"):
+                for tag in font.keys():
+                    if font.isLoaded(tag):
+                        _ensure_decompiled(font[tag])
+
         with timer("subset GlyphOrder"):
             glyphOrder = font.getGlyphOrder()
             glyphOrder = [g for g in glyphOrder if g in self.glyphs_all]
@@ -2889,7 +3110,7 @@ class Subsetter(object):
                 if old_uniranges != new_uniranges:
                     log.info("%s Unicode ranges pruned: %s", tag, sorted(new_uniranges))
                 if self.options.recalc_average_width:
-                    widths = [m[0] for m in font["hmtx"].metrics.values() if m[0] > 0]
+                    widths = [w for w in font["hmtx"].getAdvances() if w > 0]
                     avg_width = int(round(sum(widths) / len(widths)))
                     if avg_width != font[tag].xAvgCharWidth:
                         font[tag].xAvgCharWidth = avg_width
@@ -2918,6 +3139,390 @@ class Subsetter(object):
         self._prune_post_subset(font)
 
 
+class _CmapClosureIndex(object):
+    """Closes glyph sets over a 'cmap' table like its closure_glyphs(),
+    from a precomputed mapping of each Unicode to its glyphs."""
+
+    def __init__(self, cmap):
+        self.glyphs_by_unicode = {}
+        self.unicodes = set()
+        for table in cmap.tables:
+            if not table.isUnicode():
+                continue
+            if table.format == 14:
+                for uvs in table.uvsDict.values():
+                    for u,g in uvs:
+                        if g is not None:
+                            self.glyphs_by_unicode.setdefault(u, set()).add(g)
+            else:
+                for u,g in table.cmap.items():
+                    self.glyphs_by_unicode.setdefault(u, set()).add(g)
+            self.unicodes.update(table.cmap)
+
+    def closure_glyphs(self, s):
+        glyphs_by_unicode = self.glyphs_by_unicode
+        for u in s.unicodes_requested:
+            if u in glyphs_by_unicode:
+                s.glyphs.update(glyphs_by_unicode[u])
+        s.unicodes_missing = s.unicodes_requested.difference(self.unicodes)
+
+class _GlyfClosureIndex(object):
+    """Closes glyph sets over a 'glyf' table like its closure_glyphs(),
+    from a precomputed mapping of each composite glyph to its components."""
+
+    def __init__(self, glyf):
+        self.components = {}
+        for g,glyph in glyf.glyphs.items():
+            components = glyph.getComponentNames(glyf)
+            if components:
+                self.components[g] = components
+
+    def closure_glyphs(self, s):
+        components_of = self.components
+        decompose = s.glyphs
+        while decompose:
+            components = set()
+            for g in decompose:
+                if g in components_of:
+                    components.update(components_of[g])
+            components -= s.glyphs
+            s.glyphs.update(components)
+            decompose = components
+
+class _PreparedClosureSubsetter(Subsetter):
+
+    def __init__(self, options, closure_tables):
+        Subsetter.__init__(self, options)
+        self._closure_tables = closure_tables
+
+    def _get_closure_table(self, font, tag):
+        table = self._closure_tables.get(tag)
+        return table if table is not None else font.getTableReadOnly(tag)
+
+class PreparedSubsetter(object):
+    """Subsets one font many times, with the same options.
+
+    The font is pruned once (tables and features dropped, names pruned,
+    etc.), the glyph closure over 'cmap', 'glyf' and 'GSUB' is indexed
+    (the GSUB lookups by the glyphs that can make them add glyphs, so that
+    only those run again when glyphs are added), and the 'GSUB', 'MATH',
+    'COLR' and 'bsln' tables used for the closure are decompiled once and
+    shared by all requests. Each call to subset()
+    then closes the requested glyphs over these, and subsets a fresh font
+    read from the pruned font's binary data, so the results don't share
+    any tables with each other or with the prepared font.
+
+    The font passed in is pruned in place, like Subsetter.subset() does.
+    """
+
+    def __init__(self, font, options=None):
+        if not options:
+            options = Options()
+        self.options = options
+        glyph_order = font.getGlyphOrder()
+        Subsetter(options)._prune_pre_subset(font)
+
+        # The pruned font is stored as plain sfnt data, without changing
+        # its bounding boxes or timestamp; those are recalculated, if the
+        # options ask for it, when saving each subset font.
+        saved = font.flavor, font.recalcBBoxes, font.recalcTimestamp
+        font.flavor, font.recalcBBoxes, font.recalcTimestamp = None, False, False
+        try:
+            buf = BytesIO()
+            font.save(buf)
+        finally:
+            font.flavor, font.recalcBBoxes, font.recalcTimestamp = saved
+        self.data = buf.getvalue()
+        # 'post' may have lost the glyph names when pruned; keep using them
+        self.glyph_order = glyph_order
+
+        self.font = self._load()
+        closure_tables = {}
+        with timer("index 'cmap', 'glyf' and 'GSUB' closure"):
+            if 'cmap' in self.font:
+                closure_tables['cmap'] = _CmapClosureIndex(
+                    self.font.getTableReadOnly('cmap'))
+            if 'glyf' in self.font:
+                closure_tables['glyf'] = _GlyfClosureIndex(
+                    self.font.getTableReadOnly('glyf'))
+            if 'GSUB' in self.font:
+                closure_tables['GSUB'] = _GSUBClosureIndex(
+                    self.font.getTableReadOnly('GSUB'))
+        self._closure_tables = closure_tables
+
+    def _load(self):
+        font = ttLib.TTFont(BytesIO(self.data),
+                            recalcBBoxes=self.options.recalc_bounds,
+                            recalcTimestamp=self.options.recalc_timestamp,
+                            lazy=True)
+        font.setGlyphOrder(list(self.glyph_order))
+        return font
+
+    def subset(self, glyphs=[], gids=[], unicodes=[], text=""):
+        """Returns a new TTFont subset to the requested glyphs, gids,
+        unicodes and text, like Subsetter.populate() and
+        Subsetter.subset() would."""
+        subsetter = _PreparedClosureSubsetter(self.options,
+                                              self._closure_tables)
+        subsetter.populate(glyphs=glyphs, gids=gids, unicodes=unicodes,
+                           text=text)
+        subsetter._closure_glyphs(self.font)
+        font = self._load()
+        subsetter._subset_glyphs(font)
+        subsetter._prune_post_subset(font)
+        return font
+
+
+# The PreparedSubsetter of a subset_batch() worker process
+_batch_subsetter = None
+
+def _init_batch_worker(font_data, options, dontLoadGlyphNames):
+    global _batch_subsetter
+    font = load_font(BytesIO(font_data), options,
+                     dontLoadGlyphNames=dontLoadGlyphNames)
+    _batch_subsetter = PreparedSubsetter(font, options)
+
+def _subset_batch_slice(args):
+    name, glyphs, gids, unicodes, text = args
+    with timer("subset slice '%s'" % name):
+        font = _batch_subsetter.subset(glyphs=glyphs, gids=gids,
+                                       unicodes=unicodes, text=text)
+        buf = BytesIO()
+        save_font(font, buf, _batch_subsetter.options)
+        font.close()
+    return name, buf.getvalue()
+
+def subset_batch(font_file, slices, options=None, glyphs=[], gids=[],
+                 unicodes=[], text="", jobs=1):
+    """Subsets one font to several named sets of unicodes, such as the
+    unicode-range slices of a web font, loading the font and preparing it
+    (see PreparedSubsetter) once for all of them.
+
+    'font_file' is a path or a file object. 'slices' maps names to lists
+    of unicodes; the glyphs, gids, unicodes and text are added to every
+    slice. Returns a dict mapping the names to the data of the subset fonts,
+    saved with save_font().
+
+    With jobs > 1, the slices are divided among that many processes, each
+    of which prepares the font once.
+    """
+    if not options:
+        options = Options()
+    if hasattr(font_file, 'read'):
+        font_data = font_file.read()
+    else:
+        with open(font_file, 'rb') as f:
+            font_data = f.read()
+    dontLoadGlyphNames = not options.glyph_names and not glyphs
+    requests = [(name, list(glyphs), list(gids),
+                 list(unicodes) + list(slice_unicodes), text)
+                for name, slice_unicodes in slices.items()]
+    jobs = min(jobs, len(requests))
+    if jobs > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(
+            jobs, _init_batch_worker,
+            (font_data, options, dontLoadGlyphNames))
+        try:
+            results = pool.map(_subset_batch_slice, requests, chunksize=1)
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        global _batch_subsetter
+        _init_batch_worker(font_data, options, dontLoadGlyphNames)
+        try:
+            results = [_subset_batch_slice(r) for r in requests]
+        finally:
+            _batch_subsetter = None
+    return dict(results)
+
+def parse_batch_file(path):
+    """Reads a --batch-file: returns an ordered dict mapping the name at
+    the start of each line to the unicodes that follow it."""
+    slices = OrderedDict()
+    with open(path) as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if not line:
+                continue
+            fields = line.split(None, 1)
+            name = fields[0]
+            if name in slices:
+                raise ValueError("duplicate name in batch file: %s" % name)
+            slices[name] = parse_unicodes(fields[1]) if len(fields) > 1 else []
+    return slices
+
+
+class SubsetCache(object):
+    """Caches the data of subset fonts in a directory.
+
+    Entries are keyed by a hash of the input font data and of the request:
+    the requested glyphs, gids and unicodes (text is counted as unicodes),
+    and the options that change the output. A cached subset is returned
+    without loading the input font. When the cached fonts take more than
+    max_size bytes, the least recently used ones are removed.
+
+    Several processes can share a cache directory: entries are written to
+    a temporary file first, and renamed into place when complete.
+    """
+
+    # options that don't change the subset font
+    _ignored_options = ('cache_dir', 'cache_max_size', 'jobs', 'verbose',
+                        'timing', 'xml')
+
+    _suffix = '.subset'
+
+    def __init__(self, cache_dir, max_size=100 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    @classmethod
+    def make_key(cls, font_data, options, glyphs=[], gids=[], unicodes=[],
+                 text=""):
+        """Returns the cache key of a request, as a hex string. The glyphs
+        and unicodes may include '*', for all of the font's glyphs or
+        all of its encoded characters."""
+        if isinstance(text, bytes):
+            text = text.decode("utf_8")
+        unicodes = set(unicodes)
+        text_utf32 = text.encode("utf-32-be")
+        unicodes.update(struct.unpack('>%dL' % (len(text_utf32)//4), text_utf32))
+        opts = {}
+        for k,v in sorted(vars(options).items()):
+            if k in cls._ignored_options:
+                continue
+            if isinstance(v, list) and k != 'layout_features':
+                v = sorted(v, key=repr)
+            opts[k] = v
+        request = repr((
+            sorted(set(glyphs), key=repr),
+            sorted(set(gids)),
+            sorted(unicodes, key=repr),
+            sorted(opts.items()),
+            version,
+        ))
+        h = hashlib.sha256(font_data)
+        h.update(tobytes(request, encoding="utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self._suffix)
+
+    def get(self, key):
+        """Returns the cached subset font data for 'key', or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            return None
+        try:
+            os.utime(path, None)    # most recently used
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        """Stores the subset font data for 'key', then removes the least
+        recently used entries beyond the cache size."""
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            _replace_file(tmp, self._path(key))
+        except:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self.prune()
+
+    def prune(self):
+        """Removes the least recently used entries until the cached fonts
+        take at most max_size bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self._suffix):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue    # removed by another process
+            entries.append((st.st_mtime, path, st.st_size))
+            total += st.st_size
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def subset(self, font_file, options, glyphs=[], gids=[], unicodes=[],
+               text=""):
+        """Returns the data of 'font_file' (a path or file object) subset
+        to the request, from the cache if possible. Otherwise the font is
+        subset with a Subsetter and saved with save_font(), and the result
+        is cached."""
+        if hasattr(font_file, 'read'):
+            font_data = font_file.read()
+        else:
+            with open(font_file, 'rb') as f:
+                font_data = f.read()
+        key = self.make_key(font_data, options, glyphs=glyphs, gids=gids,
+                            unicodes=unicodes, text=text)
+        data = self.get(key)
+        if data is not None:
+            log.info("Subset font found in cache: %s", key)
+            return data
+
+        wildcard_glyphs = '*' in glyphs
+        wildcard_unicodes = '*' in unicodes
+        glyphs = [g for g in glyphs if g != '*']
+        unicodes = [u for u in unicodes if u != '*']
+        dontLoadGlyphNames = not options.glyph_names and not glyphs
+        font = load_font(BytesIO(font_data), options,
+                         dontLoadGlyphNames=dontLoadGlyphNames)
+        if wildcard_glyphs:
+            glyphs.extend(font.getGlyphOrder())
+        if wildcard_unicodes:
+            for t in font['cmap'].tables:
+                if t.isUnicode():
+                    unicodes.extend(t.cmap.keys())
+        subsetter = Subsetter(options=options)
+        subsetter.populate(glyphs=glyphs, gids=gids, unicodes=unicodes,
+                           text=text)
+        subsetter.subset(font)
+        buf = BytesIO()
+        save_font(font, buf, options)
+        font.close()
+        data = buf.getvalue()
+        self.put(key, data)
+        return data
+
+
+if hasattr(os, 'replace'):
+    _replace_file = os.replace
+else:
+    # Python 2
+    def _replace_file(src, dst):
+        try:
+            os.rename(src, dst)
+        except OSError:
+            # Windows doesn't rename over existing files
+            if os.path.exists(dst):
+                os.remove(dst)
+            os.rename(src, dst)
+
+
 @timer("load font")
 def load_font(fontFile,
               options,
@@ -2996,7 +3601,6 @@ def usage():
 
 @timer("make one with everything (TOTAL TIME)")
 def main(args=None):
-    from os.path import splitext
     from fontTools import configLogger
 
     if args is None:
@@ -3006,14 +3610,24 @@ def main(args=None):
         print(__doc__)
         return 0
 
+    # -j N, or -jN, is short for --jobs=N
+    try:
+        jobs, args = parseJobsOption(args)
+    except ValueError as e:
+        usage()
+        print("ERROR:", e, file=sys.stderr)
+        return 2
+
     options = Options()
+    if jobs is not None:
+        options.jobs = jobs
     try:
         args = options.parse_opts(args,
             ignore_unknown=['gids', 'gids-file',
                             'glyphs', 'glyphs-file',
                             'text', 'text-file',
                             'unicodes', 'unicodes-file',
-                            'output-file'])
+                            'batch-file', 'output-file'])
     except options.OptionError as e:
         usage()
         print("ERROR:", e, file=sys.stderr)
@@ -3029,8 +3643,32 @@ def main(args=None):
     else:
         timer.logger.disabled = True
 
-    fontfile = args[0]
+    fontfiles = [args[0]]
     args = args[1:]
+    while args and _is_font_file(args[0]):
+        fontfiles.append(args.pop(0))
+    if len(fontfiles) > 1:
+        if any(a.startswith('--output-file=') for a in args):
+            usage()
+            print("ERROR: --output-file can't be used with several font files",
+                  file=sys.stderr)
+            return 2
+        statuses = runJobs(_main_font_file,
+                           [(fontfile, args, options) for fontfile in fontfiles],
+                           options.jobs)
+        return 1 if any(statuses) else 0
+
+    return _main_font_file(fontfiles[0], args, options)
+
+def _is_font_file(path):
+    # whether a positional argument is another font to subset, rather
+    # than a glyph name
+    extension = os.path.splitext(path)[1].lower()
+    return (extension in ('.ttf', '.otf', '.woff', '.woff2') and
+            os.path.isfile(path))
+
+def _main_font_file(fontfile, args, options):
+    from os.path import splitext
 
     subsetter = Subsetter(options=options)
     basename, extension = splitext(fontfile)
@@ -3041,6 +3679,7 @@ def main(args=None):
     wildcard_glyphs = False
     wildcard_unicodes = False
     text = ""
+    batch_file = None
     for g in args:
         if g == '*':
             wildcard_glyphs = True
@@ -3060,6 +3699,9 @@ def main(args=None):
             else:
                 unicodes.extend(parse_unicodes(g[11:]))
             continue
+        if g.startswith('--batch-file='):
+            batch_file = g[13:]
+            continue
         if g.startswith('--unicodes-file='):
             for line in open(g[16:]).readlines():
                 unicodes.extend(parse_unicodes(line.split('#')[0]))
@@ -3083,6 +3725,40 @@ def main(args=None):
             continue
         glyphs.append(g)
 
+    if batch_file is not None:
+        if wildcard_glyphs or wildcard_unicodes:
+            usage()
+            print("ERROR: '*' can't be used with --batch-file", file=sys.stderr)
+            return 2
+        if '{name}' not in outfile:
+            basename, extension = splitext(outfile)
+            outfile = basename + '.{name}' + extension
+        slices = parse_batch_file(batch_file)
+        results = subset_batch(fontfile, slices, options, glyphs=glyphs,
+                               gids=gids, unicodes=unicodes, text=text,
+                               jobs=options.jobs)
+        for name in slices:
+            path = outfile.replace('{name}', name)
+            with open(path, 'wb') as f:
+                f.write(results[name])
+            log.info("Subset font:% 7d bytes: %s" % (len(results[name]), path))
+        return
+
+    if options.cache_dir and not options.xml:
+        cache = SubsetCache(options.cache_dir, options.cache_max_size)
+        if wildcard_glyphs:
+            glyphs.append('*')
+        if wildcard_unicodes:
+            unicodes.append('*')
+        data = cache.subset(fontfile, options, glyphs=glyphs, gids=gids,
+                            unicodes=unicodes, text=text)
+        with open(outfile, 'wb') as f:
+            f.write(data)
+        if options.verbose:
+            log.info("Input font:% 7d bytes: %s" % (os.path.getsize(fontfile), fontfile))
+            log.info("Subset font:% 7d bytes: %s" % (len(data), outfile))
+        return
+
     dontLoadGlyphNames = not options.glyph_names and not glyphs
     font = load_font(fontfile, options, dontLoadGlyphNames=dontLoadGlyphNames)
 
@@ -3106,7 +3782,6 @@ def main(args=None):
     save_font(font, outfile, options)
 
     if options.verbose:
-        import os
         log.info("Input font:% 7d bytes: %s" % (os.path.getsize(fontfile), fontfile))
         log.info("Subset font:% 7d bytes: %s" % (os.path.getsize(outfile), outfile))
 
@@ -3119,11 +3794,15 @@ def main(args=None):
 __all__ = [
     'Options',
     'Subsetter',
+    'PreparedSubsetter',
+    'SubsetCache',
+    'subset_batch',
     'load_font',
     'save_font',
     'parse_gids',
     'parse_glyphs',
     'parse_unicodes',
+    'parse_batch_file',
     'main'
 ]
 
@@ -46,6 +46,8 @@ from fontTools.misc.py23 import *
 from fontTools.misc.loggingTools import deprecateArgument, deprecateFunction
 import os
 import sys
+import struct
+import threading
 import logging
 
 
@@ -54,6 +56,20 @@ log = logging.getLogger(__name__)
 class TTLibError(Exception): pass
 
 
+class _ThreadState(threading.local):
+
+	"""Per-thread state of a TTFont."""
+
+	def __init__(self):
+		# tables being decompiled by this thread, not yet published in
+		# TTFont.tables
+		self.loading = {}
+		# greater than zero while this thread is decompiling a table
+		self.decompiling = 0
+		# the glyph order being built by this thread, if any
+		self.glyphOrder = None
+
+
 class TTFont(object):
 
 	"""The main font object. It manages file input and output, and offers
@@ -65,7 +81,8 @@ class TTFont(object):
 	def __init__(self, file=None, res_name_or_index=None,
 			sfntVersion="\000\001\000\000", flavor=None, checkChecksums=False,
 			verbose=None, recalcBBoxes=True, allowVID=False, ignoreDecompileErrors=False,
-			recalcTimestamp=True, fontNumber=-1, lazy=None, quiet=None):
+			recalcTimestamp=True, fontNumber=-1, lazy=None, quiet=None,
+			mmap=False):
 
 		"""The constructor can be called with a few different arguments.
 		When reading a font from disk, 'file' should be either a pathname
@@ -122,6 +139,23 @@ class TTFont(object):
 		If lazy is set to True, many data structures are loaded lazily, upon
 		access only.  If it is set to False, many data structures are loaded
 		immediately.  The default is lazy=None which is somewhere in between.
+
+		If mmap is set to True, the input file is memory-mapped read-only
+		instead of being read into memory. Raw table data is then handed out
+		as memoryview slices of the mapping, and only copied when a table is
+		actually decompiled. The mapped pages are shared through the OS page
+		cache between all processes opening the same file. Like with lazy=True,
+		the font can't be saved over the file it was read from.
+
+		Tables (and, with lazy=True, their subtables) can be loaded by
+		several threads concurrently: each table is decompiled only once,
+		while holding a lock of its own, and is only made visible to the
+		other threads once fully decompiled. Modifying a font that other
+		threads read is not safe.
+
+		The 'profiler' attribute can be set to a TableProfiler (see
+		fontTools.ttLib.profiler) to record the time and memory spent
+		decompiling and compiling each table.
 		"""
 
 		from fontTools.ttLib import sfnt
@@ -133,9 +167,16 @@ class TTFont(object):
 			setattr(self, name, val)
 
 		self.lazy = lazy
+		self.mmap = mmap
 		self.recalcBBoxes = recalcBBoxes
 		self.recalcTimestamp = recalcTimestamp
 		self.tables = {}
+		# tags of the loaded tables that were only accessed for reading,
+		# and whose original data can be written back as is
+		self._cleanTables = set()
+		self._threadState = _ThreadState()
+		self._tableLocks = {}
+		self.profiler = None
 		self.reader = None
 
 		# Permit the user to reference glyphs that are not int the font.
@@ -170,7 +211,14 @@ class TTFont(object):
 		else:
 			# assume "file" is a readable file object
 			closeStream = False
-		if not self.lazy:
+		if self.mmap:
+			if not isinstance(file, sfnt.MappedFile):
+				mappedFile = sfnt.MappedFile(file)
+				if closeStream:
+					# the mapping holds its own reference to the file
+					file.close()
+				file = mappedFile
+		elif not self.lazy:
 			# read input file in memory and wrap a stream around it to allow overwriting
 			tmp = BytesIO(file.read())
 			if hasattr(file, 'name'):
@@ -184,45 +232,56 @@ class TTFont(object):
 		self.flavor = self.reader.flavor
 		self.flavorData = self.reader.flavorData
 
+	def __getstate__(self):
+		# the per-thread state and the locks can't be copied or pickled;
+		# the copy gets its own
+		state = self.__dict__.copy()
+		del state["_threadState"]
+		del state["_tableLocks"]
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._threadState = _ThreadState()
+		self._tableLocks = {}
+
 	def close(self):
 		"""If we still have a reader object, close it."""
 		if self.reader is not None:
 			self.reader.close()
 
-	def save(self, file, reorderTables=True):
+	def save(self, file, reorderTables=True, workers=None):
 		"""Save the font to disk. Similarly to the constructor,
 		the 'file' argument can be either a pathname or a writable
 		file object.
+
+		If 'workers' is greater than 1, the tables that need compiling and
+		don't depend on, nor are depended upon by, other tables in the font
+		(eg. 'GSUB', 'GPOS', 'name' or 'cmap') are compiled concurrently in
+		a pool of that many forked processes. The other tables are compiled
+		serially in the current process, respecting their dependencies.
+		This is only supported on platforms that can fork, and when the
+		font wasn't opened with lazy=True from a file on disk; otherwise
+		all the tables are compiled serially.
 		"""
 		from fontTools.ttLib import sfnt
 		if not hasattr(file, "write"):
-			if self.lazy and self.reader.file.name == file:
+			if ((self.lazy or self.mmap) and self.reader is not None and
+					getattr(self.reader.file, "name", None) == file):
 				raise TTLibError(
-					"Can't overwrite TTFont when 'lazy' attribute is True")
+					"Can't overwrite TTFont when '%s' attribute is True"
+					% ("lazy" if self.lazy else "mmap"))
 			closeStream = True
 			file = open(file, "wb")
 		else:
 			# assume "file" is a writable file object
 			closeStream = False
 
-		if self.recalcTimestamp and 'head' in self:
-			self['head']  # make sure 'head' is loaded so the recalculation is actually done
-
-		tags = list(self.keys())
-		if "GlyphOrder" in tags:
-			tags.remove("GlyphOrder")
-		numTables = len(tags)
 		# write to a temporary stream to allow saving to unseekable streams
 		tmp = BytesIO()
-		writer = sfnt.SFNTWriter(tmp, numTables, self.sfntVersion, self.flavor, self.flavorData)
-
-		done = []
-		for tag in tags:
-			self._writeTable(tag, writer, done)
-
-		writer.close()
+		writer_reordersTables = self._save(tmp, workers=workers)
 
-		if (reorderTables is None or writer.reordersTables() or
+		if (reorderTables is None or writer_reordersTables or
 				(reorderTables is False and self.reader is None)):
 			# don't reorder tables and save as is
 			file.write(tmp.getvalue())
@@ -245,6 +304,89 @@ class TTFont(object):
 		if closeStream:
 			file.close()
 
+	def _save(self, file, tableCache=None, workers=None):
+		"""Internal function, to be shared by save() and TTCollection.save().
+		Write the sfnt data at the current position of 'file', and return
+		whether the writer reorders the tables by itself.
+		"""
+		from fontTools.ttLib import sfnt
+
+		if self.recalcTimestamp and 'head' in self:
+			self['head']  # make sure 'head' is loaded so the recalculation is actually done
+
+		tags = list(self.keys())
+		if "GlyphOrder" in tags:
+			tags.remove("GlyphOrder")
+		numTables = len(tags)
+		writer = sfnt.SFNTWriter(file, numTables, self.sfntVersion, self.flavor, self.flavorData)
+
+		pool = None
+		compiling = {}
+		if workers is not None and workers > 1:
+			parallelTags = self._getIndependentTables(tags)
+			if len(parallelTags) > 1:
+				pool = self._createCompilePool(min(workers, len(parallelTags)))
+			if pool is not None:
+				for tag in parallelTags:
+					compiling[tag] = pool.apply_async(_compileTableInWorker, (tag,))
+
+		try:
+			done = []
+			for tag in tags:
+				self._writeTable(tag, writer, done, tableCache, compiling)
+		finally:
+			if pool is not None:
+				pool.terminate()
+				pool.join()
+
+		writer.close()
+
+		return writer.reordersTables()
+
+	def _getIndependentTables(self, tags):
+		"""Return the tags of the dirty tables that can be compiled in
+		isolation: no table in 'tags' depends on them, and they don't
+		depend on any table in the font.
+		"""
+		dependents = set()
+		for tag in tags:
+			dependents.update(getTableClass(tag).dependencies)
+		independent = []
+		for tag in tags:
+			if tag in dependents or not self.isDirty(tag):
+				continue
+			tableClass = getTableClass(tag)
+			if any(masterTable in self for masterTable in tableClass.dependencies):
+				continue
+			independent.append(tag)
+		return independent
+
+	def _createCompilePool(self, workers):
+		"""Return a pool of forked processes, each inheriting a copy of the
+		font, or None if the tables can't be compiled in other processes.
+		"""
+		from fontTools.ttLib import sfnt
+		if sys.platform == "win32":
+			log.debug("can't fork, compiling tables serially")
+			return None
+		if (self.reader is not None and self.lazy and
+				not isinstance(self.reader.file, sfnt.MappedFile)):
+			# the forked processes would share the position of the file
+			log.debug("font is read lazily from disk, compiling tables serially")
+			return None
+		import multiprocessing
+		try:
+			context = multiprocessing.get_context("fork")
+		except AttributeError:
+			# Python 2 always forks on POSIX
+			context = multiprocessing
+		# the glyph order is needed by most tables; load it once before forking
+		self.getGlyphOrder()
+		# with the 'fork' start method, the initializer arguments are inherited
+		# by the child processes rather than pickled
+		return context.Pool(workers, initializer=_initCompileWorker,
+				initargs=(self,))
+
 	def saveXML(self, fileOrPath, progress=None, quiet=None,
 			tables=None, skipTables=None, splitTables=False, disassembleInstructions=True,
 			bitmapGlyphDataFormat='raw', newlinestr=None):
@@ -328,7 +470,8 @@ class TTFont(object):
 		if quiet is not None:
 			deprecateArgument("quiet", "configure logging instead")
 		if tag in self:
-			table = self[tag]
+			# dumping doesn't modify the table, which stays clean
+			table = self.getTableReadOnly(tag)
 			report = "Dumping '%s' table..." % tag
 		else:
 			report = "No '%s' table found." % tag
@@ -378,6 +521,42 @@ class TTFont(object):
 		decompiled and loaded into memory."""
 		return tag in self.tables
 
+	def isDirty(self, tag):
+		"""Return true if the table identified by 'tag' has been loaded
+		and may have been modified since it was decompiled, ie. if it has to
+		be compiled again upon save.
+
+		A table is considered clean only if it was loaded from the input
+		file with getTableReadOnly() (or while decompiling another table),
+		and never returned by __getitem__ afterwards, and if none of the
+		tables it depends on is dirty.
+		"""
+		tag = Tag(tag)
+		if not self.isLoaded(tag):
+			return False
+		if (tag not in self._cleanTables or self.reader is None or
+				tag not in self.reader):
+			return True
+		tableClass = getTableClass(tag)
+		return any(self.isDirty(masterTable)
+				for masterTable in tableClass.dependencies)
+
+	def unload(self, tag):
+		"""Drop the decompiled table identified by 'tag', so that it is
+		decompiled again from the input file when next accessed. Only clean
+		tables (see isDirty()) are unloaded; return true if it was.
+
+		Objects already obtained from the table stay valid, but they are no
+		longer part of the font.
+		"""
+		tag = Tag(tag)
+		if not self.isLoaded(tag) or self.isDirty(tag):
+			return False
+		with self._getLock(tag):
+			self._cleanTables.discard(tag)
+			self.tables.pop(tag, None)
+		return True
+
 	def has_key(self, tag):
 		if self.isLoaded(tag):
 			return True
@@ -407,46 +586,114 @@ class TTFont(object):
 
 	def __getitem__(self, tag):
 		tag = Tag(tag)
+		if self._threadState.decompiling:
+			# decompilers only read the other tables they depend on
+			return self.getTableReadOnly(tag)
+		# the caller may modify the returned table
+		self._cleanTables.discard(tag)
+		return self._getTable(tag)
+
+	def _getTable(self, tag):
 		try:
 			return self.tables[tag]
 		except KeyError:
-			if tag == "GlyphOrder":
-				table = GlyphOrder(tag)
-				self.tables[tag] = table
-				return table
-			if self.reader is not None:
-				import traceback
-				log.debug("Reading '%s' table from disk", tag)
-				data = self.reader[tag]
-				tableClass = getTableClass(tag)
-				table = tableClass(tag)
+			pass
+		loading = self._threadState.loading
+		if tag in loading:
+			# needed again while this thread is decompiling it
+			return loading[tag]
+		if tag == "GlyphOrder":
+			return self.tables.setdefault(tag, GlyphOrder(tag))
+		if self.reader is None:
+			raise KeyError("'%s' table not found" % tag)
+		with self._getLock(tag):
+			# another thread may have loaded it while we were waiting
+			table = self.tables.get(tag)
+			if table is None:
+				table = self._readTable(tag)
 				self.tables[tag] = table
-				log.debug("Decompiling '%s' table", tag)
-				try:
-					table.decompile(data, self)
-				except:
-					if not self.ignoreDecompileErrors:
-						raise
-					# fall back to DefaultTable, retaining the binary table data
-					log.exception(
-						"An exception occurred during the decompilation of the '%s' table", tag)
-					from .tables.DefaultTable import DefaultTable
-					file = StringIO()
-					traceback.print_exc(file=file)
-					table = DefaultTable(tag)
-					table.ERROR = file.getvalue()
-					self.tables[tag] = table
-					table.decompile(data, self)
-				return table
+			return table
+
+	def _getLock(self, key):
+		try:
+			return self._tableLocks[key]
+		except KeyError:
+			return self._tableLocks.setdefault(key, threading.RLock())
+
+	def _readTable(self, tag):
+		"""Read and decompile the table identified by 'tag' from the reader,
+		and return it without adding it to self.tables."""
+		log.debug("Reading '%s' table from disk", tag)
+		data = self.reader[tag]
+		if isinstance(data, memoryview):
+			# memory-mapped table data is only copied when decompiled
+			data = data.tobytes()
+		tableClass = getTableClass(tag)
+		table = tableClass(tag)
+		state = self._threadState
+		previous = state.loading.get(tag)
+		state.loading[tag] = table
+		log.debug("Decompiling '%s' table", tag)
+		state.decompiling += 1
+		try:
+			if self.profiler is None:
+				table = self._decompileTable(tag, table, data)
+			else:
+				with self.profiler.record("decompile", tag, len(data)):
+					table = self._decompileTable(tag, table, data)
+		finally:
+			state.decompiling -= 1
+			if previous is None:
+				del state.loading[tag]
 			else:
-				raise KeyError("'%s' table not found" % tag)
+				state.loading[tag] = previous
+		return table
+
+	def _decompileTable(self, tag, table, data):
+		import traceback
+		try:
+			table.decompile(data, self)
+		except:
+			if not self.ignoreDecompileErrors:
+				raise
+			# fall back to DefaultTable, retaining the binary table data
+			log.exception(
+				"An exception occurred during the decompilation of the '%s' table", tag)
+			from .tables.DefaultTable import DefaultTable
+			file = StringIO()
+			traceback.print_exc(file=file)
+			table = DefaultTable(tag)
+			table.ERROR = file.getvalue()
+			self._threadState.loading[tag] = table
+			table.decompile(data, self)
+		return table
+
+	def getTableReadOnly(self, tag):
+		"""Return the table identified by 'tag', like __getitem__, with the
+		promise that the caller won't modify it.
+
+		A table read from the input file that is only ever accessed through
+		this method is not compiled again upon save: its original binary
+		data is written instead. Modifying it is an error, as the changes
+		would be silently lost.
+		"""
+		tag = Tag(tag)
+		if tag in self.tables:
+			return self.tables[tag]
+		table = self._getTable(tag)
+		if self.reader is not None and tag in self.reader:
+			self._cleanTables.add(tag)
+		return table
 
 	def __setitem__(self, tag, table):
-		self.tables[Tag(tag)] = table
+		tag = Tag(tag)
+		self._cleanTables.discard(tag)
+		self.tables[tag] = table
 
 	def __delitem__(self, tag):
 		if tag not in self:
 			raise KeyError("'%s' table not found" % tag)
+		self._cleanTables.discard(tag)
 		if tag in self.tables:
 			del self.tables[tag]
 		if self.reader and tag in self.reader:
@@ -460,30 +707,41 @@ class TTFont(object):
 
 	def setGlyphOrder(self, glyphOrder):
 		self.glyphOrder = glyphOrder
+		# the compiled data of any loaded table may depend on glyph names
+		self._cleanTables.clear()
 
 	def getGlyphOrder(self):
 		try:
 			return self.glyphOrder
 		except AttributeError:
 			pass
-		if 'CFF ' in self:
-			cff = self['CFF ']
-			self.glyphOrder = cff.getGlyphOrder()
-		elif 'post' in self:
-			# TrueType font
-			glyphOrder = self['post'].getGlyphOrder()
-			if glyphOrder is None:
-				#
-				# No names found in the 'post' table.
-				# Try to create glyph names from the unicode cmap (if available)
-				# in combination with the Adobe Glyph List (AGL).
-				#
-				self._getGlyphNamesFromCmap()
+		state = self._threadState
+		if state.glyphOrder is not None:
+			# the glyph order is being built from the cmap by this thread
+			return state.glyphOrder
+		with self._getLock("GlyphOrder"):
+			try:
+				# another thread may have built it while we were waiting
+				return self.glyphOrder
+			except AttributeError:
+				pass
+			if 'CFF ' in self:
+				cff = self.getTableReadOnly('CFF ')
+				glyphOrder = cff.getGlyphOrder()
+			elif 'post' in self:
+				# TrueType font
+				glyphOrder = self.getTableReadOnly('post').getGlyphOrder()
+				if glyphOrder is None:
+					#
+					# No names found in the 'post' table.
+					# Try to create glyph names from the unicode cmap (if available)
+					# in combination with the Adobe Glyph List (AGL).
+					#
+					glyphOrder = self._getGlyphNamesFromCmap()
 			else:
-				self.glyphOrder = glyphOrder
-		else:
-			self._getGlyphNamesFromCmap()
-		return self.glyphOrder
+				glyphOrder = self._getGlyphNamesFromCmap()
+			self.glyphOrder = glyphOrder
+			return glyphOrder
 
 	def _getGlyphNamesFromCmap(self):
 		#
@@ -498,35 +756,34 @@ class TTFont(object):
 		# - extract the unicode values, build the "real" glyph names
 		# - unload the temporary cmap table
 		#
-		if self.isLoaded("cmap"):
-			# Bootstrapping: we're getting called by the cmap parser
-			# itself. This means self.tables['cmap'] contains a partially
-			# loaded cmap, making it impossible to get at a unicode
-			# subtable here. We remove the partially loaded cmap and
-			# restore it later.
-			# This only happens if the cmap table is loaded before any
-			# other table that does f.getGlyphOrder()  or f.getGlyphName().
-			cmapLoading = self.tables['cmap']
-			del self.tables['cmap']
-		else:
-			cmapLoading = None
+		# The temporary glyph names and cmap table are only visible to the
+		# current thread, and never replace a cmap table that is already
+		# loaded: we may be getting called by its own subtable parser.
+		#
 		# Make up glyph names based on glyphID, which will be used by the
 		# temporary cmap and by the real cmap in case we don't find a unicode
 		# cmap.
-		numGlyphs = int(self['maxp'].numGlyphs)
+		numGlyphs = int(self.getTableReadOnly('maxp').numGlyphs)
 		glyphOrder = [None] * numGlyphs
 		glyphOrder[0] = ".notdef"
 		for i in range(1, numGlyphs):
 			glyphOrder[i] = "glyph%.5d" % i
 		# Set the glyph order, so the cmap parser has something
 		# to work with (so we don't get called recursively).
-		self.glyphOrder = glyphOrder
-
-		# Make up glyph names based on the reversed cmap table. Because some
-		# glyphs (eg. ligatures or alternates) may not be reachable via cmap,
-		# this naming table will usually not cover all glyphs in the font.
-		# If the font has no Unicode cmap table, reversecmap will be empty.
-		reversecmap = self['cmap'].buildReversed()
+		state = self._threadState
+		state.glyphOrder = glyphOrder
+		try:
+			# Make up glyph names based on the reversed cmap table. Because some
+			# glyphs (eg. ligatures or alternates) may not be reachable via cmap,
+			# this naming table will usually not cover all glyphs in the font.
+			# If the font has no Unicode cmap table, reversecmap will be empty.
+			if self.reader is not None and "cmap" in self.reader:
+				cmap = self._readTable("cmap")
+			else:
+				cmap = self._getTable("cmap")
+			reversecmap = cmap.buildReversed()
+		finally:
+			state.glyphOrder = None
 		useCount = {}
 		for i in range(numGlyphs):
 			tempName = glyphOrder[i]
@@ -539,15 +796,7 @@ class TTFont(object):
 				if numUses > 1:
 					glyphName = "%s.alt%d" % (glyphName, numUses - 1)
 				glyphOrder[i] = glyphName
-
-		# Delete the temporary cmap table from the cache, so it can
-		# be parsed again with the right names.
-		del self.tables['cmap']
-		self.glyphOrder = glyphOrder
-		if cmapLoading:
-			# restore partially loaded cmap, so it can continue loading
-			# using the proper names.
-			self.tables['cmap'] = cmapLoading
+		return glyphOrder
 
 	@staticmethod
 	def _makeGlyphName(codepoint):
@@ -639,14 +888,22 @@ class TTFont(object):
 		return self._reverseGlyphOrderDict
 
 	def _buildReverseGlyphOrderDict(self):
-		self._reverseGlyphOrderDict = d = {}
 		glyphOrder = self.getGlyphOrder()
+		d = {}
 		for glyphID in range(len(glyphOrder)):
 			d[glyphOrder[glyphID]] = glyphID
+		self._reverseGlyphOrderDict = d
 
-	def _writeTable(self, tag, writer, done):
+	def _writeTable(self, tag, writer, done, tableCache=None, compiling=None):
 		"""Internal helper function for self.save(). Keeps track of
 		inter-table dependencies.
+
+		If 'tableCache' is a dict, tables whose data is identical to one
+		already written to the same file are not written again, and the
+		directory entry of the first copy is reused instead.
+
+		The optional 'compiling' dict maps tags of tables being compiled by
+		a process pool to their pending results.
 		"""
 		if tag in done:
 			return
@@ -654,21 +911,44 @@ class TTFont(object):
 		for masterTable in tableClass.dependencies:
 			if masterTable not in done:
 				if masterTable in self:
-					self._writeTable(masterTable, writer, done)
+					self._writeTable(masterTable, writer, done, tableCache, compiling)
 				else:
 					done.append(masterTable)
-		tabledata = self.getTableData(tag)
+		if compiling and tag in compiling:
+			log.debug("waiting for '%s' table to be compiled", tag)
+			tabledata = compiling[tag].get()
+		else:
+			tabledata = self.getTableData(tag)
+		# 'head' is never shared, as its checkSumAdjustment is per-font
+		if tableCache is not None and tag != 'head':
+			entry = tableCache.get((Tag(tag), tabledata))
+			if entry is not None:
+				log.debug("reusing '%s' table", tag)
+				writer.setEntry(tag, entry)
+				done.append(tag)
+				return
 		log.debug("writing '%s' table to disk", tag)
 		writer[tag] = tabledata
+		if tableCache is not None and tag != 'head':
+			tableCache[(Tag(tag), tabledata)] = writer[tag]
 		done.append(tag)
 
 	def getTableData(self, tag):
 		"""Returns raw table data, whether compiled or directly read from disk.
+		Tables that were not loaded from a font opened with mmap=True are
+		returned as read-only memoryview objects.
+
+		Loaded tables are only compiled if they are dirty (see isDirty()).
 		"""
 		tag = Tag(tag)
-		if self.isLoaded(tag):
+		if self.isDirty(tag):
 			log.debug("compiling '%s' table", tag)
-			return self.tables[tag].compile(self)
+			if self.profiler is None:
+				return self.tables[tag].compile(self)
+			with self.profiler.record("compile", tag) as event:
+				data = self.tables[tag].compile(self)
+				event["bytesOut"] = len(data)
+			return data
 		elif self.reader and tag in self.reader:
 			log.debug("Reading '%s' table from disk", tag)
 			return self.reader[tag]
@@ -691,11 +971,12 @@ class TTFont(object):
 		if (preferCFF and any(tb in self for tb in ["CFF ", "CFF2"]) or
 		   ("glyf" not in self and any(tb in self for tb in ["CFF ", "CFF2"]))):
 			table_tag = "CFF2" if "CFF2" in self else "CFF "
+			cff = self.getTableReadOnly(table_tag).cff
 			glyphs = _TTGlyphSet(self,
-			    list(self[table_tag].cff.values())[0].CharStrings, _TTGlyphCFF)
+			    list(cff.values())[0].CharStrings, _TTGlyphCFF)
 
 		if glyphs is None and "glyf" in self:
-			glyphs = _TTGlyphSet(self, self["glyf"], _TTGlyphGlyf)
+			glyphs = _TTGlyphSet(self, self.getTableReadOnly("glyf"), _TTGlyphGlyf)
 
 		if glyphs is None:
 			raise TTLibError("Font contains no outlines")
@@ -703,6 +984,124 @@ class TTFont(object):
 		return glyphs
 
 
+# the font inherited by the table compiling processes; see TTFont.save()
+_workerFont = None
+
+def _initCompileWorker(font):
+	global _workerFont
+	_workerFont = font
+
+def _compileTableInWorker(tag):
+	return _workerFont.getTableData(tag)
+
+
+class TTCollection(object):
+
+	"""Object representing a TrueType or OpenType Collection (TTC/OTC).
+	The main API is self.fonts, a list of TTFont instances, one per face.
+
+	All the faces share the same input stream: with lazy=True the file is
+	read from disk on demand, with mmap=True it is memory-mapped, otherwise
+	it is read into memory once. Tables are still only decompiled when
+	accessed. Note that closing a single font also closes the shared stream.
+	"""
+
+	def __init__(self, file=None, lazy=None, mmap=False, **kwargs):
+		from fontTools.ttLib import sfnt
+
+		self.fonts = []
+		if file is None:
+			return
+
+		if "fontNumber" in kwargs:
+			raise TypeError("TTCollection loads all fonts; 'fontNumber' is not supported")
+
+		closeStream = False
+		if not hasattr(file, "read"):
+			file = open(file, "rb")
+			closeStream = True
+		if mmap:
+			mappedFile = sfnt.MappedFile(file)
+			if closeStream:
+				file.close()
+			file = mappedFile
+		elif not lazy:
+			tmp = BytesIO(file.read())
+			if hasattr(file, 'name'):
+				tmp.name = file.name
+			if closeStream:
+				file.close()
+			file = tmp
+
+		file.seek(0)
+		header = sfnt.readTTCHeader(file)
+		for i in range(header.numFonts):
+			file.seek(0)
+			# pass lazy=True so that TTFont doesn't make its own in-memory
+			# copy of the shared stream, then restore the requested laziness
+			font = TTFont(file, fontNumber=i, lazy=True, mmap=mmap, **kwargs)
+			font.lazy = lazy
+			self.fonts.append(font)
+
+	def save(self, file, shareTables=True):
+		"""Save the collection to disk. Similarly to the constructor,
+		the 'file' argument can be either a pathname or a writable
+		file object.
+
+		If 'shareTables' is true, tables whose compiled data is identical
+		in more than one font are only stored once. The fonts can't have a
+		'flavor': WOFF and WOFF2 fonts can't be part of a collection.
+		"""
+		from fontTools.ttLib import sfnt
+		for font in self.fonts:
+			if font.flavor:
+				raise TTLibError(
+					"Can't save %s font in TTCollection" % font.flavor.upper())
+			if font.reader is not None and (font.lazy or font.mmap) and \
+					getattr(font.reader.file, "name", None) == file:
+				raise TTLibError(
+					"Can't overwrite TTCollection when reading it lazily")
+
+		# write to a temporary stream to allow saving to unseekable streams
+		tmp = BytesIO()
+		tableCache = {} if shareTables else None
+
+		offsetsOffset = sfnt.writeTTCHeader(tmp, len(self.fonts))
+		offsets = []
+		for font in self.fonts:
+			tmp.seek(0, 2)
+			offsets.append(tmp.tell())
+			font._save(tmp, tableCache=tableCache)
+		tmp.seek(offsetsOffset)
+		tmp.write(struct.pack(">%dL" % len(self.fonts), *offsets))
+
+		if not hasattr(file, "write"):
+			with open(file, "wb") as f:
+				f.write(tmp.getvalue())
+		else:
+			file.write(tmp.getvalue())
+		tmp.close()
+
+	def close(self):
+		for font in self.fonts:
+			font.close()
+
+	def __getitem__(self, item):
+		return self.fonts[item]
+
+	def __setitem__(self, item, value):
+		self.fonts[item] = value
+
+	def __delitem__(self, item):
+		del self.fonts[item]
+
+	def __len__(self):
+		return len(self.fonts)
+
+	def __iter__(self):
+		return iter(self.fonts)
+
+
 class _TTGlyphSet(object):
 
 	"""Generic dict-like GlyphSet class that pulls metrics from hmtx and
@@ -711,8 +1110,8 @@ class _TTGlyphSet(object):
 
 	def __init__(self, ttFont, glyphs, glyphType):
 		self._glyphs = glyphs
-		self._hmtx = ttFont['hmtx']
-		self._vmtx = ttFont['vmtx'] if 'vmtx' in ttFont else None
+		self._hmtx = ttFont.getTableReadOnly('hmtx')
+		self._vmtx = ttFont.getTableReadOnly('vmtx') if 'vmtx' in ttFont else None
 		self._glyphType = glyphType
 
 	def keys(self):
@@ -824,16 +1223,25 @@ def getTableModule(tag):
 		return getattr(tables, pyTag)
 
 
+# table classes by tag, filled as the table modules are imported on demand
+_tableClasses = {}
+
 def getTableClass(tag):
 	"""Fetch the packer/unpacker class for a table.
 	Return None when no class is found.
 	"""
+	try:
+		return _tableClasses[tag]
+	except KeyError:
+		pass
 	module = getTableModule(tag)
 	if module is None:
 		from .tables.DefaultTable import DefaultTable
-		return DefaultTable
-	pyTag = tagToIdentifier(tag)
-	tableClass = getattr(module, "table_" + pyTag)
+		tableClass = DefaultTable
+	else:
+		pyTag = tagToIdentifier(tag)
+		tableClass = getattr(module, "table_" + pyTag)
+	_tableClasses[tag] = tableClass
 	return tableClass
 
 
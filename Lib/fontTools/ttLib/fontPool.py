@@ -0,0 +1,190 @@
+"""A cache of opened fonts with a memory budget.
+
+	>>> pool = FontPool(maxBytes=64 * 1024 * 1024)  # doctest: +SKIP
+	>>> font = pool.get("/path/to/font.ttf")  # doctest: +SKIP
+	>>> cmap = font.getTableReadOnly("cmap")  # doctest: +SKIP
+
+The memory used by the decompiled tables of the fonts in the pool is
+estimated after each get(). While it's over budget, clean tables are
+unloaded, starting from the least recently used fonts; if that's not
+enough, whole fonts are dropped from the pool, least recently used first.
+Dropped fonts aren't closed, as they may still be in use: their file (or
+memory map) is closed when the last reference to them goes away. Tables
+are only clean (and can thus be unloaded) if they were only ever accessed
+with TTFont.getTableReadOnly(); see TTFont.isDirty().
+
+Tables can keep growing after they are loaded, as the parts of them that
+are decompiled lazily (eg. glyphs, or lookups in lazy fonts) are used; so
+the tables of a font are measured again each time it's asked for again.
+"""
+
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.sfnt import MappedFile
+from collections import OrderedDict
+import types
+import threading
+import sys
+import os
+import logging
+
+
+log = logging.getLogger(__name__)
+
+
+# objects whose size isn't part of a table's
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType,
+		types.BuiltinFunctionType, types.MethodType, TTFont)
+
+
+def estimateSize(obj):
+	"""Return the approximate number of bytes used by 'obj' and all the
+	objects it references (except fonts, classes, modules and functions)."""
+	seen = set()
+	stack = [obj]
+	size = 0
+	while stack:
+		obj = stack.pop()
+		if id(obj) in seen or isinstance(obj, _SKIP_TYPES):
+			continue
+		seen.add(id(obj))
+		size += sys.getsizeof(obj)
+		if isinstance(obj, dict):
+			stack.extend(obj.keys())
+			stack.extend(obj.values())
+		elif isinstance(obj, (list, tuple, set, frozenset)):
+			stack.extend(obj)
+		elif isinstance(obj, (basestring, bytes)):
+			continue
+		else:
+			if hasattr(obj, "__dict__"):
+				stack.append(obj.__dict__)
+			for klass in type(obj).__mro__:
+				slots = getattr(klass, "__slots__", ())
+				if isinstance(slots, basestring):
+					slots = (slots,)
+				for name in slots:
+					value = getattr(obj, name, None)
+					if value is not None:
+						stack.append(value)
+	return size
+
+
+class _PoolEntry(object):
+
+	def __init__(self, font, baseSize):
+		self.font = font
+		# memory used by the font that unloading tables doesn't free
+		self.baseSize = baseSize
+		# {tag: (table, size)}
+		self.tableSizes = {}
+		# whether the font was handed out since its tables were measured
+		self.used = False
+
+	def getSize(self):
+		font = self.font
+		tableSizes = self.tableSizes
+		if self.used:
+			# lazily decompiled parts of the tables may have been loaded
+			tableSizes.clear()
+			self.used = False
+		for tag in list(tableSizes):
+			if not font.isLoaded(tag):
+				del tableSizes[tag]
+		size = self.baseSize
+		for tag in list(font.tables.keys()):
+			table = font.tables.get(tag)
+			if table is None:
+				continue
+			cached = tableSizes.get(tag)
+			if cached is None or cached[0] is not table:
+				cached = tableSizes[tag] = (table, estimateSize(table))
+			size += cached[1]
+		return size
+
+
+class FontPool(object):
+
+	"""A cache of TTFont objects by path, that keeps the estimated memory
+	used by their decompiled tables under 'maxBytes'.
+
+	Extra keyword arguments are passed to TTFont when opening fonts. By
+	default fonts are memory-mapped ('mmap=True'), so that their raw data
+	is not kept in memory either.
+	"""
+
+	def __init__(self, maxBytes=256*1024*1024, **kwargs):
+		self.maxBytes = maxBytes
+		kwargs.setdefault("mmap", True)
+		self.fontKwargs = kwargs
+		self._entries = OrderedDict()  # least recently used first
+		self._lock = threading.RLock()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, path):
+		return os.path.abspath(path) in self._entries
+
+	def get(self, path):
+		"""Return the font at 'path', opening it if it's not in the pool,
+		and trim the pool to its budget (without dropping this font)."""
+		path = os.path.abspath(path)
+		with self._lock:
+			entry = self._entries.pop(path, None)
+			if entry is None:
+				log.debug("Opening '%s'", path)
+				font = TTFont(path, **self.fontKwargs)
+				baseSize = 0
+				if not isinstance(font.reader.file, MappedFile):
+					baseSize = os.path.getsize(path)
+				entry = _PoolEntry(font, baseSize)
+			else:
+				entry.used = True
+			self._entries[path] = entry
+			self.trim(keep=path)
+			return entry.font
+
+	def getMemoryUsage(self):
+		"""Return the estimated number of bytes used by the fonts in the
+		pool."""
+		with self._lock:
+			return sum(entry.getSize() for entry in self._entries.values())
+
+	def trim(self, keep=None):
+		"""Unload tables, then drop fonts, least recently used first, until
+		the estimated memory usage is within budget. The font at path
+		'keep' is never dropped."""
+		with self._lock:
+			sizes = OrderedDict((path, entry.getSize())
+					for path, entry in self._entries.items())
+			total = sum(sizes.values())
+			if total <= self.maxBytes:
+				return
+			for path, entry in self._entries.items():
+				font = entry.font
+				for tag, (table, size) in sorted(entry.tableSizes.items(),
+						key=lambda item: -item[1][1]):
+					if font.unload(tag):
+						log.debug("Unloaded '%s' table of '%s'", tag, path)
+						del entry.tableSizes[tag]
+						total -= size
+						sizes[path] -= size
+						if total <= self.maxBytes:
+							return
+			for path in list(self._entries):
+				if path == keep:
+					continue
+				log.debug("Dropping '%s'", path)
+				del self._entries[path]
+				total -= sizes[path]
+				if total <= self.maxBytes:
+					return
+
+	def close(self):
+		"""Close all the fonts and empty the pool."""
+		with self._lock:
+			for entry in self._entries.values():
+				entry.font.close()
+			self._entries.clear()
@@ -0,0 +1,160 @@
+"""Record the time and memory spent decompiling and compiling the tables
+of a font.
+
+	>>> from fontTools.ttLib import TTFont
+	>>> font = TTFont("MyFont.ttf")  # doctest: +SKIP
+	>>> with TableProfiler(font, traceMemory=True) as profiler:  # doctest: +SKIP
+	...     font["glyf"]
+	...     font.save("MyFont-new.ttf")
+	>>> profiler.saveJSON("profile.json")  # doctest: +SKIP
+
+Each decompile (when a table is first accessed) and each compile (when a
+dirty table is saved, see TTFont.isDirty()) adds an event to the profiler:
+
+	operation: "decompile" or "compile"
+	tag: the table tag
+	time: the wall time spent, in seconds
+	bytesIn: the size of the binary data decompiled, or None
+	bytesOut: the size of the binary data compiled, or None
+	memory: the change in memory allocated by Python, in bytes, or None
+		if memory isn't being traced (see the tracemalloc module)
+	error: the name of the exception raised, or None
+
+The time and memory of a table include those of the other tables it
+loads while being decompiled or compiled, which are also recorded as events
+of their own. Memory is traced for the whole process, so allocations made
+by other threads at the same time are counted too. Tables compiled by
+worker processes (see TTFont.save()) are not recorded.
+"""
+
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.misc.loggingTools import Timer
+from contextlib import contextmanager
+import threading
+import json
+
+try:
+	import tracemalloc
+except ImportError:
+	# Python 2
+	tracemalloc = None
+
+
+class TableProfiler(object):
+
+	"""Collects decompile and compile events from the fonts it's attached
+	to; either set it as the 'profiler' attribute of a TTFont, or use it as
+	a context manager to attach it to 'fonts' for the duration of a
+	with-statement.
+
+	If 'traceMemory' is true, memory allocations are traced with tracemalloc
+	while used as a context manager (Python 3 only). If 'callback' is given,
+	it's called with each event dict as it's recorded.
+	"""
+
+	_time = Timer._time
+
+	def __init__(self, fonts=(), traceMemory=False, callback=None):
+		if not isinstance(fonts, (list, tuple)):
+			fonts = [fonts]
+		self.fonts = list(fonts)
+		self.traceMemory = traceMemory
+		self.callback = callback
+		self.events = []
+		self._lock = threading.Lock()
+		self._previous = []
+		self._startedTracing = False
+
+	def __enter__(self):
+		self._previous = [font.profiler for font in self.fonts]
+		for font in self.fonts:
+			font.profiler = self
+		if (self.traceMemory and tracemalloc is not None and
+				not tracemalloc.is_tracing()):
+			tracemalloc.start()
+			self._startedTracing = True
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		for font, previous in zip(self.fonts, self._previous):
+			font.profiler = previous
+		self._previous = []
+		if self._startedTracing:
+			tracemalloc.stop()
+			self._startedTracing = False
+
+	@staticmethod
+	def _getTracedMemory():
+		if tracemalloc is None or not tracemalloc.is_tracing():
+			return None
+		return tracemalloc.get_traced_memory()[0]
+
+	@contextmanager
+	def record(self, operation, tag, bytesIn=None):
+		"""Context manager timing 'operation' on table 'tag'. It yields the
+		event dict, where the caller can set 'bytesOut'."""
+		event = {
+			"operation": operation,
+			"tag": tag,
+			"time": None,
+			"bytesIn": bytesIn,
+			"bytesOut": None,
+			"memory": None,
+			"error": None,
+		}
+		memory = self._getTracedMemory()
+		start = self._time()
+		try:
+			yield event
+		except BaseException as e:
+			event["error"] = type(e).__name__
+			raise
+		finally:
+			event["time"] = self._time() - start
+			if memory is not None:
+				current = self._getTracedMemory()
+				if current is not None:
+					event["memory"] = current - memory
+			with self._lock:
+				self.events.append(event)
+			if self.callback is not None:
+				self.callback(event)
+
+	def summary(self):
+		"""Return a list of dicts with the number of events and the total
+		time, bytes and memory of each (operation, tag) pair, sorted by
+		decreasing time."""
+		totals = {}
+		for event in list(self.events):
+			key = (event["operation"], event["tag"])
+			total = totals.get(key)
+			if total is None:
+				total = totals[key] = {
+					"operation": event["operation"],
+					"tag": event["tag"],
+					"count": 0,
+					"time": 0.0,
+					"bytesIn": 0,
+					"bytesOut": 0,
+					"memory": 0,
+				}
+			total["count"] += 1
+			for field in ("time", "bytesIn", "bytesOut", "memory"):
+				if event[field] is not None:
+					total[field] += event[field]
+		return sorted(totals.values(), key=lambda total: -total["time"])
+
+	def toJSON(self, **kwargs):
+		"""Return the events and their summary as a JSON string. Keyword
+		arguments are passed to json.dumps."""
+		return json.dumps({
+			"events": list(self.events),
+			"summary": self.summary(),
+		}, **kwargs)
+
+	def saveJSON(self, path):
+		"""Write the JSON export of the profile to the file at 'path'."""
+		with open(path, "w") as f:
+			f.write(self.toJSON(indent=2, sort_keys=True))
+			f.write("\n")
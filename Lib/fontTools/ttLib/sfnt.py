@@ -14,15 +14,37 @@ a table's length chages you need to rewrite the whole file anyway.
 
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
+from fontTools.misc.py23 import SimpleNamespace
 from fontTools.misc import sstruct
 from fontTools.ttLib import getSearchRange
 import struct
 from collections import OrderedDict
+import threading
+import weakref
 import logging
 
 
 log = logging.getLogger(__name__)
 
+# a lock for each file object that table data is loaded from, serializing
+# the seek()/read() pairs of the threads loading tables from it; the
+# readers of the fonts in a collection share the file, and thus the lock
+_fileLocks = weakref.WeakKeyDictionary()
+_fileLocksLock = threading.Lock()
+# for the file objects that can't be weakly referenced
+_defaultFileLock = threading.Lock()
+
+
+def _getFileLock(file):
+	try:
+		with _fileLocksLock:
+			lock = _fileLocks.get(file)
+			if lock is None:
+				lock = _fileLocks[file] = threading.Lock()
+			return lock
+	except TypeError:
+		return _defaultFileLock
+
 
 class SFNTReader(object):
 
@@ -41,7 +63,9 @@ class SFNTReader(object):
 		# return default object
 		return object.__new__(cls)
 
-	def __init__(self, file, checkChecksums=1, fontNumber=-1):
+	def __init__(self, file, checkChecksums=1, fontNumber=-1, mmap=False):
+		if mmap and not isinstance(file, MappedFile):
+			file = MappedFile(file)
 		self.file = file
 		self.checkChecksums = checkChecksums
 
@@ -51,19 +75,14 @@ class SFNTReader(object):
 		self.sfntVersion = self.file.read(4)
 		self.file.seek(0)
 		if self.sfntVersion == b"ttcf":
-			data = self.file.read(ttcHeaderSize)
-			if len(data) != ttcHeaderSize:
-				from fontTools import ttLib
-				raise ttLib.TTLibError("Not a Font Collection (not enough data)")
-			sstruct.unpack(ttcHeaderFormat, data, self)
-			assert self.Version == 0x00010000 or self.Version == 0x00020000, "unrecognized TTC version 0x%08x" % self.Version
-			if not 0 <= fontNumber < self.numFonts:
+			header = readTTCHeader(self.file)
+			numFonts = header.numFonts
+			if not 0 <= fontNumber < numFonts:
 				from fontTools import ttLib
-				raise ttLib.TTLibError("specify a font number between 0 and %d (inclusive)" % (self.numFonts - 1))
-			offsetTable = struct.unpack(">%dL" % self.numFonts, self.file.read(self.numFonts * 4))
-			if self.Version == 0x00020000:
-				pass # ignoring version 2.0 signatures
-			self.file.seek(offsetTable[fontNumber])
+				raise ttLib.TTLibError("specify a font number between 0 and %d (inclusive)" % (numFonts - 1))
+			self.Version = header.Version
+			self.numFonts = numFonts
+			self.file.seek(header.offsetTable[fontNumber])
 			data = self.file.read(sfntDirectorySize)
 			if len(data) != sfntDirectorySize:
 				from fontTools import ttLib
@@ -109,13 +128,18 @@ class SFNTReader(object):
 		return self.tables.keys()
 
 	def __getitem__(self, tag):
-		"""Fetch the raw table data."""
+		"""Fetch the raw table data.
+
+		If the reader was created with mmap=True, uncompressed tables are
+		returned as read-only memoryview slices of the mapped file, rather
+		than as bytes copies.
+		"""
 		entry = self.tables[Tag(tag)]
 		data = entry.loadData (self.file)
 		if self.checkChecksums:
 			if tag == 'head':
 				# Beh: we have to special-case the 'head' table.
-				checksum = calcChecksum(data[:8] + b'\0\0\0\0' + data[12:])
+				checksum = calcChecksum(b"".join([data[:8], b'\0\0\0\0', data[12:]]))
 			else:
 				checksum = calcChecksum(data)
 			if self.checkChecksums > 1:
@@ -133,6 +157,67 @@ class SFNTReader(object):
 		self.file.close()
 
 
+class MappedFile(object):
+
+	"""Read-only file-like object wrapping a memory-mapped font file.
+
+	It supports the subset of the file API used by SFNTReader (read, seek,
+	tell and close), plus a 'view' method returning a zero-copy memoryview
+	slice of the mapped data. The pages are shared through the OS page cache
+	between all processes mapping the same file.
+	"""
+
+	def __init__(self, file):
+		import mmap
+		closeStream = False
+		if not hasattr(file, "read"):
+			file = open(file, "rb")
+			closeStream = True
+		try:
+			fileno = file.fileno()
+		except (AttributeError, IOError, ValueError):
+			from fontTools import ttLib
+			raise ttLib.TTLibError("mmap requires a file with a file descriptor")
+		self.name = getattr(file, "name", None)
+		self._mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+		if closeStream:
+			# the mapping keeps its own reference to the file
+			file.close()
+		try:
+			self._view = memoryview(self._mmap)
+		except TypeError:
+			# Python 2's mmap doesn't support the new buffer protocol
+			self._view = None
+
+	def read(self, size=-1):
+		if size is None or size < 0:
+			return self._mmap.read(len(self._mmap) - self._mmap.tell())
+		return self._mmap.read(size)
+
+	def seek(self, offset, whence=0):
+		self._mmap.seek(offset, whence)
+
+	def tell(self):
+		return self._mmap.tell()
+
+	def view(self, offset, length):
+		"""Return 'length' bytes starting at 'offset' without copying them."""
+		if self._view is None:
+			return self._mmap[offset:offset+length]
+		return self._view[offset:offset+length]
+
+	def close(self):
+		if self._view is not None:
+			self._view.release()
+			self._view = None
+		try:
+			self._mmap.close()
+		except BufferError:
+			# Some table data slices are still referenced: the mapping is
+			# released when the last of them is garbage-collected.
+			pass
+
+
 # default compression level for WOFF 1.0 tables and metadata
 ZLIB_COMPRESSION_LEVEL = 6
 
@@ -195,6 +280,9 @@ class SFNTWriter(object):
 	def __init__(self, file, numTables, sfntVersion="\000\001\000\000",
 			flavor=None, flavorData=None):
 		self.file = file
+		# the sfnt directory is written at the current stream position, so
+		# that several fonts can be stored in the same TrueType Collection
+		self.directoryOffset = self.file.tell()
 		self.numTables = numTables
 		self.sfntVersion = Tag(sfntVersion)
 		self.flavor = flavor
@@ -217,7 +305,7 @@ class SFNTWriter(object):
 
 			self.searchRange, self.entrySelector, self.rangeShift = getSearchRange(numTables, 16)
 
-		self.nextTableOffset = self.directorySize + numTables * self.DirectoryEntry.formatSize
+		self.nextTableOffset = self.directoryOffset + self.directorySize + numTables * self.DirectoryEntry.formatSize
 		# clear out directory area
 		self.file.seek(self.nextTableOffset)
 		# make sure we're actually where we want to be. (old cStringIO bug)
@@ -234,7 +322,7 @@ class SFNTWriter(object):
 		entry.tag = tag
 		entry.offset = self.nextTableOffset
 		if tag == 'head':
-			entry.checkSum = calcChecksum(data[:8] + b'\0\0\0\0' + data[12:])
+			entry.checkSum = calcChecksum(b"".join([data[:8], b'\0\0\0\0', data[12:]]))
 			self.headTable = data
 			entry.uncompressed = True
 		else:
@@ -255,6 +343,19 @@ class SFNTWriter(object):
 
 		self.tables[tag] = entry
 
+	def __getitem__(self, tag):
+		"""Return the directory entry of a table already written."""
+		return self.tables[tag]
+
+	def setEntry(self, tag, entry):
+		"""Add a directory entry pointing to table data that was already
+		written to the same file, eg. by another font of a collection.
+		"""
+		if tag in self.tables:
+			from fontTools import ttLib
+			raise ttLib.TTLibError("cannot rewrite '%s' table" % tag)
+		self.tables[tag] = entry
+
 	def close(self):
 		"""All tables must have been written to disk. Now write the
 		directory.
@@ -311,7 +412,6 @@ class SFNTWriter(object):
 
 		directory = sstruct.pack(self.directoryFormat, self)
 
-		self.file.seek(self.directorySize)
 		seenHead = 0
 		for tag, entry in tables:
 			if tag == "head":
@@ -319,7 +419,7 @@ class SFNTWriter(object):
 			directory = directory + entry.toString()
 		if seenHead:
 			self.writeMasterChecksum(directory)
-		self.file.seek(0)
+		self.file.seek(self.directoryOffset)
 		self.file.write(directory)
 
 	def _calcMasterChecksum(self, directory):
@@ -428,6 +528,45 @@ woffDirectoryEntryFormat = """
 woffDirectoryEntrySize = sstruct.calcsize(woffDirectoryEntryFormat)
 
 
+def readTTCHeader(file):
+	"""Read the header of a TrueType Collection from 'file', positioned at
+	its start. Return an object with 'TTCTag', 'Version', 'numFonts' and
+	'offsetTable' attributes.
+	"""
+	from fontTools import ttLib
+	self = SimpleNamespace()
+	data = file.read(ttcHeaderSize)
+	if len(data) != ttcHeaderSize:
+		raise ttLib.TTLibError("Not a Font Collection (not enough data)")
+	sstruct.unpack(ttcHeaderFormat, data, self)
+	if Tag(self.TTCTag) != "ttcf":
+		raise ttLib.TTLibError("Not a Font Collection")
+	assert self.Version == 0x00010000 or self.Version == 0x00020000, "unrecognized TTC version 0x%08x" % self.Version
+	data = file.read(self.numFonts * 4)
+	if len(data) != self.numFonts * 4:
+		raise ttLib.TTLibError("Not a Font Collection (not enough data)")
+	self.offsetTable = struct.unpack(">%dL" % self.numFonts, data)
+	if self.Version == 0x00020000:
+		pass # ignoring version 2.0 signatures
+	return self
+
+
+def writeTTCHeader(file, numFonts):
+	"""Write a version 1.0 TrueType Collection header for 'numFonts' fonts.
+	The offset table is zero-filled; return the position where it starts,
+	so it can be overwritten once the fonts have been written.
+	"""
+	self = SimpleNamespace()
+	self.TTCTag = b"ttcf"
+	self.Version = 0x00010000
+	self.numFonts = numFonts
+	file.seek(0)
+	file.write(sstruct.pack(ttcHeaderFormat, self))
+	offset = file.tell()
+	file.write(struct.pack(">%dL" % numFonts, *([0] * numFonts)))
+	return offset
+
+
 class DirectoryEntry(object):
 
 	def __init__(self):
@@ -449,8 +588,12 @@ class DirectoryEntry(object):
 			return "<%s at %x>" % (self.__class__.__name__, id(self))
 
 	def loadData(self, file):
-		file.seek(self.offset)
-		data = file.read(self.length)
+		if isinstance(file, MappedFile):
+			data = file.view(self.offset, self.length)
+		else:
+			with _getFileLock(file):
+				file.seek(self.offset)
+				data = file.read(self.length)
 		assert len(data) == self.length
 		if hasattr(self.__class__, 'decodeData'):
 			data = self.decodeData(data)
@@ -556,7 +699,7 @@ def calcChecksum(data):
 	"""
 	remainder = len(data) % 4
 	if remainder:
-		data += b"\0" * (4 - remainder)
+		data = b"".join([data, b"\0" * (4 - remainder)])
 	value = 0
 	blockSize = 4096
 	assert blockSize % 4 == 0
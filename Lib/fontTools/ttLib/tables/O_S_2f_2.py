@@ -103,7 +103,7 @@ class table_O_S_2f_2(DefaultTable.DefaultTable):
 
 	"""the OS/2 table"""
 
-	dependencies = ["head"]
+	dependencies = ["head", "cmap"]
 
 	def decompile(self, data, ttFont):
 		dummy, data = sstruct.unpack2(OS2_format_0, data, self)
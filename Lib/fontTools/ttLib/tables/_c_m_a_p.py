@@ -9,6 +9,7 @@ import sys
 import struct
 import array
 import operator
+import itertools
 import logging
 
 
@@ -17,8 +18,13 @@ log = logging.getLogger(__name__)
 
 def _make_map(font, chars, gids):
 	assert len(chars) == len(gids)
-	cmap = {}
 	glyphOrder = font.getGlyphOrder()
+	if not gids or max(gids) < len(glyphOrder):
+		# fast path: map all the (non-zero) glyph IDs to names in bulk
+		compress = itertools.compress
+		return dict(zip(compress(chars, gids),
+				map(glyphOrder.__getitem__, compress(gids, gids))))
+	cmap = {}
 	for char,gid in zip(chars,gids):
 		if gid is 0:
 			continue
@@ -589,39 +595,26 @@ cmap_format_4_format = ">7H"
 #uint16  glyphIndexArray[variable]  # Glyph index array
 
 def splitRange(startCode, endCode, cmap):
+	return _splitRange(startCode, [cmap[code] for code in range(startCode, endCode + 1)])
+
+
+def _splitRange(startCode, gids):
 	# Try to split a range of character codes into subranges with consecutive
 	# glyph IDs in such a way that the cmap4 subtable can be stored "most"
 	# efficiently. I can't prove I've got the optimal solution, but it seems
 	# to do well with the fonts I tested: none became bigger, many became smaller.
+	# 'gids' holds the glyph IDs of all the codes from startCode on.
+	endCode = startCode + len(gids) - 1
 	if startCode == endCode:
 		return [], [endCode]
 
-	lastID = cmap[startCode]
-	lastCode = startCode
-	inOrder = None
-	orderedBegin = None
-	subRanges = []
-
 	# Gather subranges in which the glyph IDs are consecutive.
-	for code in range(startCode + 1, endCode + 1):
-		glyphID = cmap[code]
-
-		if glyphID - 1 == lastID:
-			if inOrder is None or not inOrder:
-				inOrder = 1
-				orderedBegin = lastCode
-		else:
-			if inOrder:
-				inOrder = 0
-				subRanges.append((orderedBegin, lastCode))
-				orderedBegin = None
-
-		lastID = glyphID
-		lastCode = code
-
-	if inOrder:
-		subRanges.append((orderedBegin, lastCode))
-	assert lastCode == endCode
+	subRanges = []
+	begin = 0
+	for index in _findBreaks(gids, 1) + [len(gids)]:
+		if index - begin > 1:
+			subRanges.append((startCode + begin, startCode + index - 1))
+		begin = index
 
 	# Now filter out those new subranges that would only make the data bigger.
 	# A new segment cost 8 bytes, not using a new segment costs 2 bytes per
@@ -667,6 +660,13 @@ def splitRange(startCode, endCode, cmap):
 	return start, end
 
 
+def _findBreaks(values, step):
+	"""Return the indices of the items of 'values' that don't follow the
+	previous one by 'step'."""
+	return [i for i, (prev, value) in enumerate(zip(values, values[1:]), 1)
+			if value - prev != step]
+
+
 class cmap_format_4(CmapSubtable):
 
 	def decompile(self, data, ttFont):
@@ -708,22 +708,35 @@ class cmap_format_4(CmapSubtable):
 			start = startCode[i]
 			delta = idDelta[i]
 			rangeOffset = idRangeOffset[i]
-			# *someone* needs to get killed.
-			partial = rangeOffset // 2 - start + i - len(idRangeOffset)
-
-			rangeCharCodes = list(range(startCode[i], endCode[i] + 1))
-			charCodes.extend(rangeCharCodes)
+			end = endCode[i] + 1
+			if start >= end:
+				continue
+			charCodes.extend(range(start, end))
 			if rangeOffset == 0:
-				gids.extend([(charCode + delta) & 0xFFFF for charCode in rangeCharCodes])
+				# the glyph IDs are consecutive, modulo 0x10000
+				first = (start + delta) & 0xFFFF
+				last = first + end - start
+				if last <= 0x10000:
+					gids.extend(range(first, last))
+				else:
+					gids.extend(range(first, 0x10000))
+					gids.extend(range(0, last - 0x10000))
 			else:
-				for charCode in rangeCharCodes:
-					index = charCode + partial
-					assert (index < lenGIArray), "In format 4 cmap, range (%d), the calculated index (%d) into the glyph index array  is not less than the length of the array (%d) !" % (i, index, lenGIArray)
-					if glyphIndexArray[index] != 0:  # if not missing glyph
-						glyphID = glyphIndexArray[index] + delta
-					else:
-						glyphID = 0  # missing glyph
-					gids.append(glyphID & 0xFFFF)
+				# *someone* needs to get killed.
+				partial = rangeOffset // 2 - start + i - len(idRangeOffset)
+				index = start + partial
+				lastIndex = end - 1 + partial
+				assert (lastIndex < lenGIArray), "In format 4 cmap, range (%d), the calculated index (%d) into the glyph index array  is not less than the length of the array (%d) !" % (i, lastIndex, lenGIArray)
+				if index >= 0:
+					indices = glyphIndexArray[index:lastIndex + 1]
+				else:
+					indices = [glyphIndexArray[j] for j in range(index, lastIndex + 1)]
+				if delta:
+					# zero is the missing glyph, whatever the delta
+					gids.extend([(glyphID + delta) & 0xFFFF if glyphID else 0
+							for glyphID in indices])
+				else:
+					gids.extend(indices)
 
 		self.cmap = _make_map(self.ttFont, charCodes, gids)
 
@@ -736,6 +749,7 @@ class cmap_format_4(CmapSubtable):
 		if lenCharCodes == 0:
 			startCode = [0xffff]
 			endCode = [0xffff]
+			firstIndices = []
 		else:
 			charCodes.sort()
 			names = list(map(operator.getitem, [self.cmap]*lenCharCodes, charCodes))
@@ -762,28 +776,25 @@ class cmap_format_4(CmapSubtable):
 								raise KeyError(name)
 
 						gids.append(gid)
-			cmap = {}  # code:glyphID mapping
-			list(map(operator.setitem, [cmap]*len(charCodes), charCodes, gids))
 
 			# Build startCode and endCode lists.
 			# Split the char codes in ranges of consecutive char codes, then split
 			# each range in more ranges of consecutive/not consecutive glyph IDs.
 			# See splitRange().
-			lastCode = charCodes[0]
+			# firstIndices holds the index in charCodes/gids of each start code.
+			startCode = []
 			endCode = []
-			startCode = [lastCode]
-			for charCode in charCodes[1:]:  # skip the first code, it's the first start code
-				if charCode == lastCode + 1:
-					lastCode = charCode
-					continue
-				start, end = splitRange(startCode[-1], lastCode, cmap)
+			firstIndices = []
+			begin = 0
+			for index in _findBreaks(charCodes, 1) + [lenCharCodes]:
+				firstCode = charCodes[begin]
+				start, end = _splitRange(firstCode, gids[begin:index])
+				startCode.append(firstCode)
 				startCode.extend(start)
 				endCode.extend(end)
-				startCode.append(charCode)
-				lastCode = charCode
-			start, end = splitRange(startCode[-1], lastCode, cmap)
-			startCode.extend(start)
-			endCode.extend(end)
+				firstIndices.append(begin)
+				firstIndices.extend([begin + code - firstCode for code in start])
+				begin = index
 			startCode.append(0xffff)
 			endCode.append(0xffff)
 
@@ -792,9 +803,8 @@ class cmap_format_4(CmapSubtable):
 		idRangeOffset = []
 		glyphIndexArray = []
 		for i in range(len(endCode)-1):  # skip the closing codes (0xffff)
-			indices = []
-			for charCode in range(startCode[i], endCode[i] + 1):
-				indices.append(cmap[charCode])
+			first = firstIndices[i]
+			indices = gids[first:first + endCode[i] - startCode[i] + 1]
 			if  (indices == list(range(indices[0], indices[0] + len(indices)))):
 				idDelta.append((indices[0] - startCode[i]) % 0x10000)
 				idRangeOffset.append(0)
@@ -928,24 +938,26 @@ class cmap_format_12_or_13(CmapSubtable):
 			assert (data is None and ttFont is None), "Need both data and ttFont arguments"
 
 		data = self.data # decompileHeader assigns the data after the header to self.data
+		groups = struct.unpack(">%dL" % (3 * self.nGroups), data)
+		self.data = data = None
 		charCodes = []
 		gids = []
-		pos = 0
-		for i in range(self.nGroups):
-			startCharCode, endCharCode, glyphID = struct.unpack(">LLL",data[pos:pos+12] )
-			pos += 12
+		step = self._format_step
+		for startCharCode, endCharCode, glyphID in zip(groups[0::3], groups[1::3], groups[2::3]):
 			lenGroup = 1 + endCharCode - startCharCode
-			charCodes.extend(list(range(startCharCode, endCharCode +1)))
-			gids.extend(self._computeGIDs(glyphID, lenGroup))
-		self.data = data = None
+			charCodes.extend(range(startCharCode, endCharCode + 1))
+			if step:
+				gids.extend(range(glyphID, glyphID + lenGroup))
+			else:
+				gids.extend([glyphID] * lenGroup)
 		self.cmap = _make_map(self.ttFont, charCodes, gids)
 
 	def compile(self, ttFont):
 		if self.data:
 			return struct.pack(">HHLLL", self.format, self.reserved, self.length, self.language, self.nGroups) + self.data
-		charCodes = list(self.cmap.keys())
+		charCodes = sorted(self.cmap.keys())
 		lenCharCodes = len(charCodes)
-		names = list(self.cmap.values())
+		names = list(map(operator.getitem, [self.cmap]*lenCharCodes, charCodes))
 		nameMap = ttFont.getReverseGlyphMap()
 		try:
 			gids = list(map(operator.getitem, [nameMap]*lenCharCodes, names))
@@ -970,31 +982,18 @@ class cmap_format_12_or_13(CmapSubtable):
 
 					gids.append(gid)
 
-		cmap = {}  # code:glyphID mapping
-		list(map(operator.setitem, [cmap]*len(charCodes), charCodes, gids))
-
-		charCodes.sort()
-		index = 0
-		startCharCode = charCodes[0]
-		startGlyphID = cmap[startCharCode]
-		lastGlyphID = startGlyphID - self._format_step
-		lastCharCode = startCharCode - 1
-		nGroups = 0
-		dataList =  []
-		maxIndex = len(charCodes)
-		for index in range(maxIndex):
-			charCode = charCodes[index]
-			glyphID = cmap[charCode]
-			if not self._IsInSameRun(glyphID, lastGlyphID, charCode, lastCharCode):
-				dataList.append(struct.pack(">LLL", startCharCode, lastCharCode, startGlyphID))
-				startCharCode = charCode
-				startGlyphID = glyphID
-				nGroups = nGroups + 1
-			lastGlyphID = glyphID
-			lastCharCode = charCode
-		dataList.append(struct.pack(">LLL", startCharCode, lastCharCode, startGlyphID))
-		nGroups = nGroups + 1
-		data = bytesjoin(dataList)
+		# Split the char codes in runs of consecutive char codes mapped to glyph
+		# IDs that increase by _format_step; each run is stored as a group.
+		breaks = sorted(set(_findBreaks(charCodes, 1)).union(
+				_findBreaks(gids, self._format_step)))
+		firsts = [0] + breaks
+		lasts = [index - 1 for index in breaks] + [lenCharCodes - 1]
+		nGroups = len(firsts)
+		groups = [0] * (3 * nGroups)
+		groups[0::3] = [charCodes[index] for index in firsts]
+		groups[1::3] = [charCodes[index] for index in lasts]
+		groups[2::3] = [gids[index] for index in firsts]
+		data = struct.pack(">%dL" % len(groups), *groups)
 		lengthSubtable = len(data) +16
 		assert len(data) == (nGroups*12) == (lengthSubtable-16)
 		return struct.pack(">HHLLL", self.format, self.reserved, lengthSubtable, self.language, nGroups) + data
@@ -1041,12 +1040,6 @@ class cmap_format_12(cmap_format_12_or_13):
 	def __init__(self, format=12):
 		cmap_format_12_or_13.__init__(self, format)
 
-	def _computeGIDs(self, startingGlyph, numberOfGlyphs):
-		return list(range(startingGlyph, startingGlyph + numberOfGlyphs))
-
-	def _IsInSameRun(self, glyphID, lastGlyphID, charCode, lastCharCode):
-		return (glyphID == 1 + lastGlyphID) and (charCode == 1 + lastCharCode)
-
 
 class cmap_format_13(cmap_format_12_or_13):
 
@@ -1055,12 +1048,6 @@ class cmap_format_13(cmap_format_12_or_13):
 	def __init__(self, format=13):
 		cmap_format_12_or_13.__init__(self, format)
 
-	def _computeGIDs(self, startingGlyph, numberOfGlyphs):
-		return [startingGlyph] * numberOfGlyphs
-
-	def _IsInSameRun(self, glyphID, lastGlyphID, charCode, lastCharCode):
-		return (glyphID == lastGlyphID) and (charCode == 1 + lastCharCode)
-
 
 def  cvtToUVS(threeByteString):
 	data = b"\0" + threeByteString
@@ -16,6 +16,10 @@ import sys
 import struct
 import array
 import logging
+try:
+	from collections.abc import MutableMapping
+except ImportError:
+	from collections import MutableMapping
 
 
 log = logging.getLogger(__name__)
@@ -43,30 +47,26 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 
 	def decompile(self, data, ttFont):
 		loca = ttFont['loca']
-		last = int(loca[0])
-		noname = 0
-		self.glyphs = {}
 		self.glyphOrder = glyphOrder = ttFont.getGlyphOrder()
-		for i in range(0, len(loca)-1):
-			try:
-				glyphName = glyphOrder[i]
-			except IndexError:
-				noname = noname + 1
-				glyphName = 'ttxautoglyph%s' % i
-			next = int(loca[i+1])
-			glyphdata = data[last:next]
-			if len(glyphdata) != (next - last):
-				raise ttLib.TTLibError("not enough 'glyf' table data")
-			glyph = Glyph(glyphdata)
-			self.glyphs[glyphName] = glyph
-			last = next
+		numGlyphs = max(len(loca) - 1, 0)
+		glyphNames = list(glyphOrder[:numGlyphs])
+		noname = numGlyphs - len(glyphNames)
+		for i in range(len(glyphNames), numGlyphs):
+			glyphNames.append('ttxautoglyph%s' % i)
+		next = int(loca[numGlyphs]) if len(loca) else 0
+		if next > len(data):
+			raise ttLib.TTLibError("not enough 'glyf' table data")
 		if len(data) - next >= 4:
 			log.warning(
 				"too much 'glyf' table data: expected %d, received %d bytes",
 				next, len(data))
 		if noname:
 			log.warning('%s glyphs have no name', noname)
-		if ttFont.lazy is False: # Be lazy for None and True
+		# Be lazy for None and True: glyphs are only sliced from the table
+		# data when first accessed
+		self.glyphs = _LazyGlyphDict(data, loca.locations, glyphNames)
+		if ttFont.lazy is False:
+			self.glyphs = dict(self.glyphs)
 			for glyph in self.glyphs.values():
 				glyph.expand(self)
 
@@ -79,9 +79,15 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 		currentLocation = 0
 		dataList = []
 		recalcBBoxes = ttFont.recalcBBoxes
+		getRawData = None
+		if isinstance(self.glyphs, _LazyGlyphDict) and not recalcBBoxes:
+			# glyphs that were never loaded are written as they were read
+			getRawData = self.glyphs.getRawData
 		for glyphName in self.glyphOrder:
-			glyph = self.glyphs[glyphName]
-			glyphData = glyph.compile(self, recalcBBoxes)
+			glyphData = getRawData(glyphName) if getRawData is not None else None
+			if glyphData is None:
+				glyph = self.glyphs[glyphName]
+				glyphData = glyph.compile(self, recalcBBoxes)
 			if padding > 1:
 				glyphData = pad(glyphData, size=padding)
 			locations.append(currentLocation)
@@ -205,6 +211,126 @@ class table__g_l_y_f(DefaultTable.DefaultTable):
 		return len(self.glyphs)
 
 
+class _LazyGlyphDict(MutableMapping):
+
+	"""Dict-like mapping of glyph names to Glyph objects, which keeps the
+	raw 'glyf' table data and the 'loca' offsets, and only creates a Glyph
+	on first access. Keys are ordered like the glyph order.
+	"""
+
+	def __init__(self, data, locations, glyphNames):
+		self._data = data
+		self._locations = locations
+		self._glyphNames = glyphNames
+		self._glyphs = {}
+		self._indices = None
+		# whether glyphs were deleted from _indices but not _glyphNames
+		self._deleted = False
+
+	def _getIndices(self):
+		# map glyph names to their index in the original 'loca' offsets;
+		# None for glyphs added afterwards
+		if self._indices is None:
+			self._indices = dict(zip(self._glyphNames, range(len(self._glyphNames))))
+		return self._indices
+
+	def _getGlyphNames(self):
+		# deleted glyphs are only removed from the list of names when it's
+		# next used, so that deleting many glyphs rebuilds it once
+		if self._deleted:
+			indices = self._indices
+			self._glyphNames = [g for g in self._glyphNames if g in indices]
+			self._deleted = False
+		return self._glyphNames
+
+	def __len__(self):
+		if self._deleted:
+			return len(self._indices)
+		return len(self._glyphNames)
+
+	def __iter__(self):
+		return iter(self._getGlyphNames())
+
+	def __contains__(self, glyphName):
+		return glyphName in self._getIndices()
+
+	def has_key(self, glyphName):
+		return glyphName in self
+
+	def keys(self):
+		return list(self._getGlyphNames())
+
+	def _sliceGlyphData(self, glyphName):
+		i = self._getIndices()[glyphName]
+		last = int(self._locations[i])
+		next = int(self._locations[i+1])
+		glyphdata = self._data[last:next]
+		if len(glyphdata) != (next - last):
+			raise ttLib.TTLibError("not enough 'glyf' table data")
+		return glyphdata
+
+	def __getitem__(self, glyphName):
+		try:
+			return self._glyphs[glyphName]
+		except KeyError:
+			pass
+		glyphdata = self._sliceGlyphData(glyphName)
+		# another thread may have created it meanwhile
+		return self._glyphs.setdefault(glyphName, Glyph(glyphdata))
+
+	def getRawData(self, glyphName):
+		"""Return the table data of a glyph that was never loaded, or None
+		if it has a Glyph object."""
+		if glyphName in self._glyphs:
+			return None
+		return self._sliceGlyphData(glyphName)
+
+	def loadedGlyphs(self):
+		"""Return the list of Glyph objects made so far."""
+		return list(self._glyphs.values())
+
+	def copyGlyphs(self, glyphNames, transform=None):
+		"""Return a new mapping of 'glyphNames' only. The data of glyphs
+		that were never loaded is copied into the new table data, through
+		'transform(data)' if given, without making Glyph objects; loaded
+		glyphs are shared."""
+		glyphs = self._glyphs
+		dataList = []
+		locations = [0]
+		loaded = {}
+		currentLocation = 0
+		for glyphName in glyphNames:
+			glyph = glyphs.get(glyphName)
+			if glyph is not None:
+				loaded[glyphName] = glyph
+			else:
+				glyphData = self._sliceGlyphData(glyphName)
+				if transform is not None:
+					glyphData = transform(glyphData)
+				dataList.append(glyphData)
+				currentLocation += len(glyphData)
+			locations.append(currentLocation)
+		result = self.__class__(bytesjoin(dataList), locations, list(glyphNames))
+		result._glyphs = loaded
+		return result
+
+	def __setitem__(self, glyphName, glyph):
+		indices = self._getIndices()
+		if glyphName not in indices:
+			self._getGlyphNames().append(glyphName)
+			indices[glyphName] = None
+		self._glyphs[glyphName] = glyph
+
+	def __delitem__(self, glyphName):
+		del self._getIndices()[glyphName]
+		self._deleted = True
+		self._glyphs.pop(glyphName, None)
+
+	def __repr__(self):
+		return "<%s with %d glyphs, %d loaded>" % (
+			self.__class__.__name__, len(self), len(self._glyphs))
+
+
 glyphHeaderFormat = """
 		>	# big endian
 		numberOfContours:	h
@@ -305,6 +431,106 @@ UNSCALED_COMPONENT_OFFSET	= 0x1000  # composite designed not to have the compone
 CompositeMaxpValues = namedtuple('CompositeMaxpValues', ['nPoints', 'nContours', 'maxComponentDepth'])
 
 
+def _componentOffsets(data):
+	# return the offsets of the component records in composite glyph data,
+	# and the offset just past the last one
+	offsets = []
+	i = 10
+	more = 1
+	while more:
+		offsets.append(i)
+		flags = (data[i] << 8) | data[i+1]
+		i += 4
+		if flags & ARG_1_AND_2_ARE_WORDS: i += 4
+		else: i += 2
+		if flags & WE_HAVE_A_SCALE: i += 2
+		elif flags & WE_HAVE_AN_X_AND_Y_SCALE: i += 4
+		elif flags & WE_HAVE_A_TWO_BY_TWO: i += 8
+		more = flags & MORE_COMPONENTS
+	return offsets, i
+
+
+def remapComponentData(data, glyphIDMap):
+	"""Return compacted glyph data with the glyph IDs of its components
+	replaced by glyphIDMap[glyphID]; data of simple glyphs is returned as
+	is."""
+	if not data or struct.unpack(">h", data[:2])[0] >= 0:
+		return data  # Not composite
+	data = bytearray(data)
+	for i in _componentOffsets(data)[0]:
+		glyphID = glyphIDMap[(data[i+2] << 8) | data[i+3]]
+		data[i+2] = glyphID >> 8
+		data[i+3] = glyphID & 0xFF
+	return bytes(data)
+
+
+def trimGlyphData(data, removeHinting=False):
+	"""Return compacted glyph data without its padding and, if removeHinting
+	is true, without its instructions."""
+	if not data:
+		return data
+	numContours = struct.unpack(">h", data[:2])[0]
+	data = bytearray(data)
+	i = 10
+	if numContours >= 0:
+		i += 2 * numContours # endPtsOfContours
+		nCoordinates = ((data[i-2] << 8) | data[i-1]) + 1
+		instructionLen = (data[i] << 8) | data[i+1]
+		if removeHinting:
+			# Zero instruction length
+			data[i] = data [i+1] = 0
+			i += 2
+			if instructionLen:
+				# Splice it out
+				del data[i:i+instructionLen]
+			instructionLen = 0
+		else:
+			i += 2 + instructionLen
+
+		coordBytes = 0
+		j = 0
+		while True:
+			flag = data[i]
+			i = i + 1
+			repeat = 1
+			if flag & flagRepeat:
+				repeat = data[i] + 1
+				i = i + 1
+			xBytes = yBytes = 0
+			if flag & flagXShort:
+				xBytes = 1
+			elif not (flag & flagXsame):
+				xBytes = 2
+			if flag & flagYShort:
+				yBytes = 1
+			elif not (flag & flagYsame):
+				yBytes = 2
+			coordBytes += (xBytes + yBytes) * repeat
+			j += repeat
+			if j >= nCoordinates:
+				break
+		assert j == nCoordinates, "bad glyph flags"
+		i += coordBytes
+	else:
+		we_have_instructions = False
+		offsets, end = _componentOffsets(data)
+		for i in offsets:
+			flags = (data[i] << 8) | data[i+1]
+			if removeHinting:
+				flags &= ~WE_HAVE_INSTRUCTIONS
+			if flags & WE_HAVE_INSTRUCTIONS:
+				we_have_instructions = True
+			data[i+0] = flags >> 8
+			data[i+1] = flags & 0xFF
+		i = end
+		if we_have_instructions:
+			instructionLen = (data[i] << 8) | data[i+1]
+			i += 2 + instructionLen
+	# Remove padding
+	del data[i:]
+	return bytes(data)
+
+
 class Glyph(object):
 
 	def __init__(self, data=""):
@@ -320,16 +546,24 @@ class Glyph(object):
 		self.data = data
 
 	def expand(self, glyfTable):
-		if not hasattr(self, "data"):
+		data = self.__dict__.get("data")
+		if data is None:
 			# already unpacked
 			return
-		if not self.data:
+		# Unpack into a new glyph, and only then publish its attributes and
+		# drop the data, so that other threads never see a partially
+		# unpacked glyph.
+		glyph = Glyph()
+		glyph._expand(data, glyfTable)
+		self.__dict__.update(glyph.__dict__)
+		self.__dict__.pop("data", None)
+
+	def _expand(self, data, glyfTable):
+		if not data:
 			# empty char
-			del self.data
 			self.numberOfContours = 0
 			return
-		dummy, data = sstruct.unpack2(glyphHeaderFormat, self.data, self)
-		del self.data
+		dummy, data = sstruct.unpack2(glyphHeaderFormat, data, self)
 		# Some fonts (eg. Neirizi.ttf) have a 0 for numberOfContours in
 		# some glyphs; decompileCoordinates assumes that there's at least
 		# one, so short-circuit here.
@@ -870,79 +1104,7 @@ class Glyph(object):
 				self.program.fromBytecode([])
 			# No padding to trim.
 			return
-		if not self.data:
-			return
-		numContours = struct.unpack(">h", self.data[:2])[0]
-		data = array.array("B", self.data)
-		i = 10
-		if numContours >= 0:
-			i += 2 * numContours # endPtsOfContours
-			nCoordinates = ((data[i-2] << 8) | data[i-1]) + 1
-			instructionLen = (data[i] << 8) | data[i+1]
-			if remove_hinting:
-				# Zero instruction length
-				data[i] = data [i+1] = 0
-				i += 2
-				if instructionLen:
-					# Splice it out
-					data = data[:i] + data[i+instructionLen:]
-				instructionLen = 0
-			else:
-				i += 2 + instructionLen
-
-			coordBytes = 0
-			j = 0
-			while True:
-				flag = data[i]
-				i = i + 1
-				repeat = 1
-				if flag & flagRepeat:
-					repeat = data[i] + 1
-					i = i + 1
-				xBytes = yBytes = 0
-				if flag & flagXShort:
-					xBytes = 1
-				elif not (flag & flagXsame):
-					xBytes = 2
-				if flag & flagYShort:
-					yBytes = 1
-				elif not (flag & flagYsame):
-					yBytes = 2
-				coordBytes += (xBytes + yBytes) * repeat
-				j += repeat
-				if j >= nCoordinates:
-					break
-			assert j == nCoordinates, "bad glyph flags"
-			i += coordBytes
-			# Remove padding
-			data = data[:i]
-		else:
-			more = 1
-			we_have_instructions = False
-			while more:
-				flags =(data[i] << 8) | data[i+1]
-				if remove_hinting:
-					flags &= ~WE_HAVE_INSTRUCTIONS
-				if flags & WE_HAVE_INSTRUCTIONS:
-					we_have_instructions = True
-				data[i+0] = flags >> 8
-				data[i+1] = flags & 0xFF
-				i += 4
-				flags = int(flags)
-
-				if flags & ARG_1_AND_2_ARE_WORDS: i += 4
-				else: i += 2
-				if flags & WE_HAVE_A_SCALE: i += 2
-				elif flags & WE_HAVE_AN_X_AND_Y_SCALE: i += 4
-				elif flags & WE_HAVE_A_TWO_BY_TWO: i += 8
-				more = flags & MORE_COMPONENTS
-			if we_have_instructions:
-				instructionLen = (data[i] << 8) | data[i+1]
-				i += 2 + instructionLen
-			# Remove padding
-			data = data[:i]
-
-		self.data = data.tostring()
+		self.data = trimGlyphData(self.data, remove_hinting)
 
 	def removeHinting(self):
 		self.trim (remove_hinting=True)
@@ -11,6 +11,10 @@ import logging
 import struct
 import sys
 import fontTools.ttLib.tables.TupleVariation as tv
+try:
+	from collections.abc import MutableMapping
+except ImportError:
+	from collections import MutableMapping
 
 
 log = logging.getLogger(__name__)
@@ -51,8 +55,18 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 
 	def compile(self, ttFont):
 		axisTags = [axis.axisTag for axis in ttFont["fvar"].axes]
-		sharedTuples =  tv.compileSharedTuples(
-			axisTags, itertools.chain(*self.variations.values()))
+		variations = self.variations
+		if (isinstance(variations, _LazyVariationDict) and
+				variations.axisTags != axisTags):
+			variations = self.variations = dict(variations)
+		if isinstance(variations, _LazyVariationDict):
+			# Keep the shared tuples the table was read with, so that the
+			# data of glyphs whose variations were never decoded, which
+			# refers to them, can be copied as is.
+			sharedTuples = variations.getSharedTuples()
+		else:
+			sharedTuples = tv.compileSharedTuples(
+				axisTags, itertools.chain(*variations.values()))
 		sharedTupleIndices = {coord:i for i, coord in enumerate(sharedTuples)}
 		sharedTupleSize = sum([len(c) for c in sharedTuples])
 		compiledGlyphs = self.compileGlyphs_(
@@ -83,11 +97,19 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 
 	def compileGlyphs_(self, ttFont, axisTags, sharedCoordIndices):
 		result = []
+		variations = self.variations
+		getRawData = getattr(variations, "getRawData", None)
 		for glyphName in ttFont.getGlyphOrder():
+			data = getRawData(glyphName) if getRawData is not None else None
+			if data is not None:
+				if len(data) % 2 != 0:
+					data = data + b"\0"  # padding
+				result.append(data)
+				continue
 			glyph = ttFont["glyf"][glyphName]
 			pointCount = self.getNumPoints_(glyph)
-			variations = self.variations.get(glyphName, [])
-			result.append(compileGlyph_(variations, pointCount,
+			glyphVariations = variations.get(glyphName, [])
+			result.append(compileGlyph_(glyphVariations, pointCount,
 			                            axisTags, sharedCoordIndices))
 		return result
 
@@ -98,17 +120,17 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 		assert len(glyphs) == self.glyphCount
 		assert len(axisTags) == self.axisCount
 		offsets = self.decompileOffsets_(data[GVAR_HEADER_SIZE:], tableFormat=(self.flags & 1), glyphCount=self.glyphCount)
-		sharedCoords = tv.decompileSharedTuples(
-			axisTags, self.sharedTupleCount, data, self.offsetToSharedTuples)
-		self.variations = {}
 		offsetToData = self.offsetToGlyphVariationData
+		ranges = {}
 		for i in range(self.glyphCount):
-			glyphName = glyphs[i]
-			glyph = ttFont["glyf"][glyphName]
-			numPointsInGlyph = self.getNumPoints_(glyph)
-			gvarData = data[offsetToData + offsets[i] : offsetToData + offsets[i + 1]]
-			self.variations[glyphName] = decompileGlyph_(
-				numPointsInGlyph, sharedCoords, axisTags, gvarData)
+			ranges[glyphs[i]] = (offsetToData + offsets[i], offsetToData + offsets[i + 1])
+		# Be lazy for None and True, like 'glyf': the variations of a glyph
+		# are only decoded when first accessed
+		self.variations = _LazyVariationDict(
+			data, ranges, axisTags, self.sharedTupleCount,
+			self.offsetToSharedTuples, ttFont["glyf"])
+		if ttFont.lazy is False:
+			self.variations = dict(self.variations)
 
 	@staticmethod
 	def decompileOffsets_(data, tableFormat, glyphCount):
@@ -207,6 +229,104 @@ class table__g_v_a_r(DefaultTable.DefaultTable):
 			return len(getattr(glyph, "coordinates", [])) + NUM_PHANTOM_POINTS
 
 
+class _LazyVariationDict(MutableMapping):
+
+	"""Dict-like mapping of glyph names to lists of TupleVariation, which
+	keeps the raw 'gvar' table data and only decodes the variations of a
+	glyph on first access."""
+
+	def __init__(self, data, ranges, axisTags, sharedTupleCount,
+	             offsetToSharedTuples, glyf):
+		self._data = data
+		# the (start, end) of each glyph's variation data; None for
+		# glyphs added afterwards
+		self._ranges = ranges
+		self.axisTags = axisTags
+		self._sharedTupleCount = sharedTupleCount
+		self._offsetToSharedTuples = offsetToSharedTuples
+		self._sharedCoords = None
+		self._glyf = glyf
+		self._variations = {}
+
+	def getSharedTuples(self):
+		"""Return the list of compiled shared tuples of the table data."""
+		tupleSize = len(self.axisTags) * 2
+		pos = self._offsetToSharedTuples
+		return [self._data[pos + i * tupleSize : pos + (i + 1) * tupleSize]
+		        for i in range(self._sharedTupleCount)]
+
+	def _getSharedCoords(self):
+		if self._sharedCoords is None:
+			self._sharedCoords = tv.decompileSharedTuples(
+				self.axisTags, self._sharedTupleCount, self._data,
+				self._offsetToSharedTuples)
+		return self._sharedCoords
+
+	def __len__(self):
+		return len(self._ranges)
+
+	def __iter__(self):
+		return iter(self._ranges)
+
+	def __contains__(self, glyphName):
+		return glyphName in self._ranges
+
+	def has_key(self, glyphName):
+		return glyphName in self
+
+	def keys(self):
+		return list(self._ranges)
+
+	def __getitem__(self, glyphName):
+		try:
+			return self._variations[glyphName]
+		except KeyError:
+			pass
+		start, end = self._ranges[glyphName]
+		numPointsInGlyph = table__g_v_a_r.getNumPoints_(self._glyf[glyphName])
+		variations = decompileGlyph_(numPointsInGlyph, self._getSharedCoords(),
+		                             self.axisTags, self._data[start:end])
+		# another thread may have decoded them meanwhile
+		return self._variations.setdefault(glyphName, variations)
+
+	def __setitem__(self, glyphName, variations):
+		if glyphName not in self._ranges:
+			self._ranges[glyphName] = None
+		self._variations[glyphName] = variations
+
+	def __delitem__(self, glyphName):
+		del self._ranges[glyphName]
+		self._variations.pop(glyphName, None)
+
+	def getRawData(self, glyphName):
+		"""Return the table data of a glyph whose variations were never
+		decoded, or None if they were (or the glyph has no entry)."""
+		if glyphName in self._variations:
+			return None
+		glyphRange = self._ranges.get(glyphName)
+		if glyphRange is None:
+			return None
+		start, end = glyphRange
+		return self._data[start:end]
+
+	def copyGlyphs(self, glyphNames):
+		"""Return a new mapping of 'glyphNames' only, sharing the table data
+		and the variations decoded so far."""
+		ranges = self._ranges
+		result = self.__class__(
+			self._data, {g: ranges[g] for g in glyphNames}, self.axisTags,
+			self._sharedTupleCount, self._offsetToSharedTuples, self._glyf)
+		result._sharedCoords = self._sharedCoords
+		variations = self._variations
+		result._variations = {g: variations[g] for g in glyphNames
+		                      if g in variations}
+		return result
+
+	def __repr__(self):
+		return "<%s with %d glyphs, %d decoded>" % (
+			self.__class__.__name__, len(self), len(self._variations))
+
+
 def compileGlyph_(variations, pointCount, axisTags, sharedCoordIndices):
 	tupleVariationCount, tuples, data = tv.compileTupleVariationStore(
 		variations, pointCount, axisTags, sharedCoordIndices)
@@ -36,6 +36,8 @@ class _GlyphnamedList(Mapping):
 
 class table__h_d_m_x(DefaultTable.DefaultTable):
 
+	dependencies = ['maxp']
+
 	def decompile(self, data, ttFont):
 		numGlyphs = ttFont['maxp'].numGlyphs
 		glyphOrder = ttFont.getGlyphOrder()
@@ -7,6 +7,10 @@ import sys
 import struct
 import array
 import logging
+try:
+	from collections.abc import MutableMapping
+except ImportError:
+	from collections import MutableMapping
 
 
 log = logging.getLogger(__name__)
@@ -43,49 +47,63 @@ class table__h_m_t_x(DefaultTable.DefaultTable):
 			sideBearings.byteswap()
 		if data:
 			log.warning("too much '%s' table data" % self.tableTag)
-		self.metrics = {}
 		glyphOrder = ttFont.getGlyphOrder()
-		for i in range(numberOfMetrics):
-			glyphName = glyphOrder[i]
-			advanceWidth, lsb = metrics[i*2:i*2+2]
-			if advanceWidth > 32767:
-				log.warning(
-					"Glyph %r has a huge advance %s (%d); is it intentional or "
-					"an (invalid) negative value?", glyphName, self.advanceName,
-					advanceWidth)
-			self.metrics[glyphName] = (advanceWidth, lsb)
+		if len(glyphOrder) < numGlyphs:
+			raise ttLib.TTLibError("not enough glyph names for '%s' table" % self.tableTag)
+		glyphNames = glyphOrder[:numGlyphs]
+		advanceCode, sideBearingCode = self.longMetricFormat
+		advances = array.array(advanceCode, metrics[0::2])
+		if numberOfMetrics and max(advances) > 32767:
+			for i, advanceWidth in enumerate(advances):
+				if advanceWidth > 32767:
+					log.warning(
+						"Glyph %r has a huge advance %s (%d); is it intentional or "
+						"an (invalid) negative value?", glyphNames[i], self.advanceName,
+						advanceWidth)
 		lastAdvance = metrics[-2]
-		for i in range(numberOfSideBearings):
-			glyphName = glyphOrder[i + numberOfMetrics]
-			self.metrics[glyphName] = (lastAdvance, sideBearings[i])
+		advances.extend([lastAdvance] * numberOfSideBearings)
+		longSideBearings = array.array(sideBearingCode, metrics[1::2])
+		longSideBearings.extend(sideBearings)
+		self.metrics = CompactMetrics(glyphNames, advances, longSideBearings)
 
 	def compile(self, ttFont):
-		metrics = []
+		glyphOrder = ttFont.getGlyphOrder()
 		hasNegativeAdvances = False
-		for glyphName in ttFont.getGlyphOrder():
-			advanceWidth, sideBearing = self.metrics[glyphName]
-			if advanceWidth < 0:
-				log.error("Glyph %r has negative advance %s" % (
-					glyphName, self.advanceName))
-				hasNegativeAdvances = True
-			metrics.append([advanceWidth, sideBearing])
-		lastAdvance = metrics[-1][0]
-		lastIndex = len(metrics)
-		while metrics[lastIndex-2][0] == lastAdvance:
+		compact = self._isCompact(glyphOrder)
+		if compact:
+			# the arrays already hold integers of the right types
+			advances = self.metrics.advances
+			sideBearings = self.metrics.sideBearings
+		else:
+			advances = []
+			sideBearings = []
+			for glyphName in glyphOrder:
+				advanceWidth, sideBearing = self.metrics[glyphName]
+				if advanceWidth < 0:
+					log.error("Glyph %r has negative advance %s" % (
+						glyphName, self.advanceName))
+					hasNegativeAdvances = True
+				advances.append(advanceWidth)
+				sideBearings.append(sideBearing)
+		lastAdvance = advances[-1]
+		lastIndex = len(advances)
+		while advances[lastIndex-2] == lastAdvance:
 			lastIndex -= 1
 			if lastIndex <= 1:
 				# all advances are equal
 				lastIndex = 1
 				break
-		additionalMetrics = metrics[lastIndex:]
-		additionalMetrics = [int(round(sb)) for _, sb in additionalMetrics]
-		metrics = metrics[:lastIndex]
-		numberOfMetrics = len(metrics)
+		additionalMetrics = sideBearings[lastIndex:]
+		if not compact:
+			additionalMetrics = [int(round(sb)) for sb in additionalMetrics]
+		numberOfMetrics = lastIndex
 		setattr(ttFont[self.headerTag], self.numberOfMetricsName, numberOfMetrics)
 
-		allMetrics = []
-		for advance, sb in metrics:
-			allMetrics.extend([int(round(advance)), int(round(sb))])
+		allMetrics = [0] * (2 * numberOfMetrics)
+		allMetrics[0::2] = advances[:numberOfMetrics]
+		allMetrics[1::2] = sideBearings[:numberOfMetrics]
+		if not compact:
+			allMetrics = [int(round(v)) for v in allMetrics]
 		metricsFmt = ">" + self.longMetricFormat * numberOfMetrics
 		try:
 			data = struct.pack(metricsFmt, *allMetrics)
@@ -128,3 +146,96 @@ class table__h_m_t_x(DefaultTable.DefaultTable):
 
 	def __setitem__(self, glyphName, advance_sb_pair):
 		self.metrics[glyphName] = tuple(advance_sb_pair)
+
+	def _isCompact(self, glyphOrder):
+		metrics = self.metrics
+		return (isinstance(metrics, CompactMetrics) and
+				isinstance(metrics.advances, array.array) and
+				metrics.glyphOrder == glyphOrder)
+
+	def getAdvances(self, glyphOrder=None):
+		"""Return the advances of the glyphs in 'glyphOrder' (by default,
+		all the glyphs of the table) as a list or array."""
+		if glyphOrder is None:
+			glyphOrder = list(self.metrics.keys())
+		if isinstance(self.metrics, CompactMetrics) and \
+				self.metrics.glyphOrder == glyphOrder:
+			return self.metrics.advances
+		return [self.metrics[glyphName][0] for glyphName in glyphOrder]
+
+	def getSideBearings(self, glyphOrder=None):
+		"""Return the side bearings of the glyphs in 'glyphOrder' (by
+		default, all the glyphs of the table) as a list or array."""
+		if glyphOrder is None:
+			glyphOrder = list(self.metrics.keys())
+		if isinstance(self.metrics, CompactMetrics) and \
+				self.metrics.glyphOrder == glyphOrder:
+			return self.metrics.sideBearings
+		return [self.metrics[glyphName][1] for glyphName in glyphOrder]
+
+
+class CompactMetrics(MutableMapping):
+
+	"""Dict-like mapping of glyph names to (advance, sideBearing) tuples,
+	stored in two parallel arrays indexed by glyph ID ('advances' and
+	'sideBearings'), in the order of the 'glyphOrder' list.
+
+	If a value is set that doesn't fit in the arrays' item types (eg. a
+	float, or a negative advance), both arrays are turned into lists.
+	"""
+
+	def __init__(self, glyphOrder, advances, sideBearings):
+		assert len(glyphOrder) == len(advances) == len(sideBearings)
+		self.glyphOrder = glyphOrder
+		self.advances = advances
+		self.sideBearings = sideBearings
+		self._indices = None
+
+	def _getIndices(self):
+		if self._indices is None:
+			self._indices = dict(zip(self.glyphOrder, range(len(self.glyphOrder))))
+		return self._indices
+
+	def __len__(self):
+		return len(self.glyphOrder)
+
+	def __iter__(self):
+		return iter(self.glyphOrder)
+
+	def __contains__(self, glyphName):
+		return glyphName in self._getIndices()
+
+	def has_key(self, glyphName):
+		return glyphName in self
+
+	def keys(self):
+		return list(self.glyphOrder)
+
+	def __getitem__(self, glyphName):
+		i = self._getIndices()[glyphName]
+		return (self.advances[i], self.sideBearings[i])
+
+	def __setitem__(self, glyphName, advance_sb_pair):
+		advance, sideBearing = advance_sb_pair
+		indices = self._getIndices()
+		i = indices.get(glyphName)
+		if i is None:
+			i = indices[glyphName] = len(self.glyphOrder)
+			self.glyphOrder.append(glyphName)
+			self.advances.append(0)
+			self.sideBearings.append(0)
+		try:
+			self.advances[i] = advance
+			self.sideBearings[i] = sideBearing
+		except (TypeError, OverflowError):
+			self.advances = list(self.advances)
+			self.sideBearings = list(self.sideBearings)
+			self.advances[i] = advance
+			self.sideBearings[i] = sideBearing
+
+	def __delitem__(self, glyphName):
+		i = self._getIndices()[glyphName]
+		del self.glyphOrder[i]
+		del self.advances[i]
+		del self.sideBearings[i]
+		self._indices = None
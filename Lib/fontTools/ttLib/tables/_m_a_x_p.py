@@ -30,7 +30,7 @@ maxpFormat_1_0_add = """
 
 class table__m_a_x_p(DefaultTable.DefaultTable):
 
-	dependencies = ['glyf']
+	dependencies = ['glyf', 'hmtx']
 
 	def decompile(self, data, ttFont):
 		dummy, data = sstruct.unpack2(maxpFormat_0_5, data, self)
@@ -2,12 +2,17 @@ from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
 from .DefaultTable import DefaultTable
 import sys
+import copy
 import array
 import struct
+import threading
 import logging
 
 log = logging.getLogger(__name__)
 
+# guards the publishing of lazily decompiled (sub)tables
+_lazyLock = threading.Lock()
+
 class OverflowErrorRecord(object):
 	def __init__(self, overflowTuple):
 		self.tableType = overflowTuple[0]
@@ -60,34 +65,11 @@ class BaseTTXConverter(DefaultTable):
 				Traverse the flat list of tables again, calling getData each get the data in the table, now that
 				pos's and offset are known.
 
-				If a lookup subtable overflows an offset, we have to start all over.
+			If offsets overflow, the table is not compiled again from scratch:
+			see OTLayoutPacker.
 		"""
-		overflowRecord = None
-
-		while True:
-			try:
-				writer = OTTableWriter(tableTag=self.tableTag)
-				self.table.compile(writer, font)
-				return writer.getAllData()
-
-			except OTLOffsetOverflowError as e:
-
-				if overflowRecord == e.value:
-					raise # Oh well...
-
-				overflowRecord = e.value
-				log.info("Attempting to fix OTLOffsetOverflowError %s", e)
-				lastItem = overflowRecord
-
-				ok = 0
-				if overflowRecord.itemName is None:
-					from .otTables import fixLookupOverFlows
-					ok = fixLookupOverFlows(font, overflowRecord)
-				else:
-					from .otTables import fixSubTableOverFlows
-					ok = fixSubTableOverFlows(font, overflowRecord)
-				if not ok:
-					raise
+		packer = OTLayoutPacker(self.table, font, self.tableTag)
+		return packer.pack()
 
 	def toXML(self, writer, font):
 		self.table.toXML2(writer, font)
@@ -100,6 +82,248 @@ class BaseTTXConverter(DefaultTable):
 		self.table.fromXML(name, attrs, content, font)
 
 
+class OTLayoutPacker(object):
+
+	"""Compiles an OpenType layout table, resolving offset overflows.
+
+	The OTTableWriter graph of the table is built once. Each layout pass
+	finds all the offsets that overflow; for GSUB and GPOS, they are then
+	fixed together, by promoting as few lookups as possible to Extension
+	lookups (planned from the measured size of each lookup) and by splitting
+	the subtables that overflow internally. Only the lookups that changed are
+	compiled again and spliced into the graph before the next pass.
+	"""
+
+	def __init__(self, table, font, tableTag):
+		self.table = table
+		self.font = font
+		self.tableTag = tableTag
+
+	def pack(self):
+		writer = OTTableWriter(tableTag=self.tableTag)
+		self.table.compile(writer, self.font)
+		while True:
+			tables, extTables = writer._layOut()
+			overflows = self.getOverflows(tables + extTables)
+			if not overflows:
+				return writer._assemble(tables, extTables)
+
+			records = [parent.getOverflowErrorRecord(item)
+			           for parent, item in overflows]
+			log.info("Attempting to fix %d OTLOffsetOverflowErrors, first: %s",
+			         len(records), records[0])
+			lookupList = self.getLookupListWriter(writer)
+			changed, modified = self.fixOverflows(lookupList, records)
+			if not changed:
+				raise OTLOffsetOverflowError(records[0])  # Oh well...
+			self.recompileLookups(lookupList, changed, modified)
+
+	@staticmethod
+	def getOverflows(tables):
+		"""Return the (table, subtable) writer pairs whose 16-bit offset
+		doesn't fit, once positions are assigned."""
+		overflows = []
+		for table in tables:
+			pos = table.pos
+			for item in table.items:
+				if (hasattr(item, "getData") and not item.longOffset and
+						not 0 <= item.pos - pos < 0x10000):
+					overflows.append((table, item))
+		return overflows
+
+	@staticmethod
+	def getLookupListWriter(writer):
+		for item in writer.items:
+			if getattr(item, "name", None) == "LookupList":
+				return item
+		return None
+
+	@staticmethod
+	def getLookupWriters(lookupList):
+		return [item for item in lookupList.items if hasattr(item, "getData")]
+
+	def fixOverflows(self, lookupList, records):
+		"""Change the table so that the overflows of 'records' go away.
+		Return a dict of the lookups changed, by index, with the list of
+		their subtables before the change, and the set of the ids of the
+		subtables that were changed themselves. The dict is empty if the
+		overflows can't be fixed."""
+		from .otTables import fixSubTableOverFlows, promoteLookupToExtension
+		if self.tableTag not in ('GSUB', 'GPOS') or lookupList is None:
+			return {}, set()
+		lookups = self.table.LookupList.Lookup
+
+		toPromote = set()
+		toSplit = {}
+		lookupListOverflowed = False
+		for record in records:
+			if record.LookupListIndex is None:
+				return {}, set()
+			if record.itemName is not None:
+				key = (record.LookupListIndex, record.SubTableIndex)
+				toSplit.setdefault(key, record)
+			elif record.SubTableIndex is not None:
+				# the offset from a lookup to one of its subtables
+				toPromote.add(record.LookupListIndex)
+			else:
+				lookupListOverflowed = True
+		if lookupListOverflowed:
+			toPromote.update(self.planPromotions(lookupList, toPromote))
+
+		changed = {}
+		modified = set()
+		for lookupIndex, subTableIndex in toSplit:
+			subTables = lookups[lookupIndex].SubTable
+			changed.setdefault(lookupIndex, list(subTables))
+			subTable = subTables[subTableIndex]
+			# the first fix only stops sharing the subtable's subtables,
+			# which doesn't need compiling it again; next ones split it
+			if hasattr(subTable, 'DontShare'):
+				modified.add(id(getattr(subTable, 'ExtSubTable', subTable)))
+		for lookupIndex in toPromote:
+			changed.setdefault(lookupIndex, list(lookups[lookupIndex].SubTable))
+
+		# in reverse, so that inserting split subtables doesn't shift the
+		# indices of the subtables still to split
+		for key in sorted(toSplit, reverse=True):
+			if not fixSubTableOverFlows(self.font, toSplit[key]):
+				return {}, set()
+		splitLookups = set(lookupIndex for lookupIndex, _ in toSplit)
+		for lookupIndex in toPromote:
+			if (not promoteLookupToExtension(lookups[lookupIndex], self.tableTag)
+					and lookupIndex not in splitLookups):
+				del changed[lookupIndex]
+		return changed, modified
+
+	def planPromotions(self, lookupList, promoted):
+		"""Return the indices of the lookups to promote to Extension lookups
+		so that the offsets from the LookupList to all lookups fit. As
+		before, when the offset to a lookup overflows, the closest lookup
+		before it is promoted; its subtables then move to the end of the
+		table, and the lookups after it move back by as much."""
+		from .otTables import isExtensionLookup
+		lookups = self.table.LookupList.Lookup
+		writers = self.getLookupWriters(lookupList)
+		assert len(writers) == len(lookups)
+
+		savings = {}
+		def getSavings(index):
+			if index not in savings:
+				writer = writers[index]
+				if index + 1 < len(writers):
+					span = writers[index + 1].pos - writer.pos
+				else:
+					span = 0
+				# the lookup stays, and each subtable becomes an 8-byte
+				# Extension subtable
+				size = writer.getDataLength() + 8 * len(lookups[index].SubTable)
+				savings[index] = max(0, span - size)
+			return savings[index]
+
+		promoted = set(promoted)
+		result = set()
+		for i, writer in enumerate(writers):
+			shift = sum(getSavings(j) for j in promoted if j < i)
+			if writer.pos - shift - lookupList.pos < 0x10000:
+				continue
+			j = i - 1
+			while j >= 0 and (j in promoted or
+					isExtensionLookup(lookups[j], self.tableTag)):
+				j -= 1
+			if j < 0:
+				break
+			promoted.add(j)
+			result.add(j)
+		return result
+
+	def recompileLookups(self, lookupList, changed, modified):
+		"""Compile the 'changed' lookups again, replacing their writers in the
+		LookupList writer. The writers of their subtables that weren't
+		'modified' are reused."""
+		lookups = self.table.LookupList.Lookup
+		items = list(lookupList.items)
+		offsets = [i for i, item in enumerate(items) if hasattr(item, "getData")]
+		for index, oldSubTables in sorted(changed.items()):
+			oldWriter = items[offsets[index]]
+			subTableWriters = {}
+			oldSubTableWriters = [item for item in oldWriter.items
+			                      if hasattr(item, "getData")]
+			for subTable, subWriter in zip(oldSubTables, oldSubTableWriters):
+				if self.isExtensionSubTable(subTable):
+					subTable = subTable.ExtSubTable
+					subWriter = [item for item in subWriter.items
+					             if hasattr(item, "getData")][0]
+				if id(subTable) not in modified:
+					subTableWriters[id(subTable)] = subWriter
+
+			lookup = lookups[index]
+			lookup.ensureDecompiled()
+			newLookup = lookup.__class__()
+			newLookup.__dict__.update(lookup.__dict__)
+			newLookup.SubTable = [
+				self._reuseWriter(subTable, subTableWriters)
+				for subTable in lookup.SubTable]
+
+			writer = lookupList.getSubWriter()
+			writer.longOffset = oldWriter.longOffset
+			writer.name = oldWriter.name
+			writer.repeatIndex = index
+			newLookup.compile(writer, self.font)
+			items[offsets[index]] = writer
+		lookupList.items = tuple(items)
+
+	def isExtensionSubTable(self, subTable):
+		# without decompiling lazily loaded subtables
+		from .otTables import extensionLookupTypes
+		lookupType = getattr(subTable.__class__, 'LookupType', None)
+		return lookupType == extensionLookupTypes[self.tableTag]
+
+	def _reuseWriter(self, subTable, subTableWriters):
+		if self.isExtensionSubTable(subTable):
+			subWriter = subTableWriters.get(id(subTable.ExtSubTable))
+			if subWriter is not None:
+				extSubTable = subTable.__class__()
+				extSubTable.__dict__.update(subTable.__dict__)
+				extSubTable.ExtSubTable = _CompiledTable(
+					subTable.ExtSubTable, subWriter)
+				return extSubTable
+		else:
+			subWriter = subTableWriters.get(id(subTable))
+			if subWriter is not None:
+				return _CompiledTable(subTable, subWriter)
+		return subTable
+
+
+class _CompiledTable(object):
+
+	"""Stands for 'table' when compiling, copying the data of the writer
+	it was compiled to before."""
+
+	def __init__(self, table, writer):
+		self.table = table
+		self.writer = writer
+
+	def compile(self, writer, font):
+		if hasattr(self.table.__class__, 'LookupType'):
+			writer['LookupType'].setValue(self.table.__class__.LookupType)
+		if hasattr(self.writer, 'sortCoverageLast'):
+			writer.sortCoverageLast = self.writer.sortCoverageLast
+		dontShare = (hasattr(self.writer, 'DontShare') or
+		             'DontShare' in self.table.__dict__)
+		items = list(self.writer.items)
+		for i, item in enumerate(items):
+			if not hasattr(item, "getData"):
+				continue
+			if dontShare:
+				# the subtables were interned by the previous layout; copy
+				# them, so that they aren't shared with other tables anymore
+				item = items[i] = copy.copy(item)
+			item.parent = writer
+		writer.items = items
+		if dontShare:
+			writer.DontShare = True
+
+
 class OTTableReader(object):
 
 	"""Helper class to retrieve data from an OpenType table."""
@@ -304,7 +528,7 @@ class OTTableWriter(object):
 		if isExtension:
 			internedTables = {}
 
-		items = self.items
+		items = list(self.items)
 		for i in range(len(items)):
 			item = items[i]
 			if hasattr(item, "getCountData"):
@@ -373,6 +597,13 @@ class OTTableWriter(object):
 
 	def getAllData(self):
 		"""Assemble all data, including all subtables."""
+		tables, extTables = self._layOut()
+		return self._assemble(tables, extTables)
+
+	def _layOut(self):
+		# Return the list of tables and the list of extension subtables, in
+		# the order they are assembled, with their positions set. This can
+		# be done again after subtables were replaced.
 		internedTables = {}
 		self._doneWriting(internedTables)
 		tables = []
@@ -391,7 +622,9 @@ class OTTableWriter(object):
 		for table in extTables:
 			table.pos = pos
 			pos = pos + table.getDataLength()
+		return tables, extTables
 
+	def _assemble(self, tables, extTables):
 		data = []
 		for table in tables:
 			tableData = table.getData()
@@ -533,21 +766,26 @@ class BaseTable(object):
 	def __getattr__(self, attr):
 		reader = self.__dict__.get("reader")
 		if reader:
-			del self.reader
-			font = self.font
-			del self.font
-			self.decompile(reader, font)
+			self.ensureDecompiled()
 			return getattr(self, attr)
 
 		raise AttributeError(attr)
 
 	def ensureDecompiled(self):
 		reader = self.__dict__.get("reader")
-		if reader:
-			del self.reader
-			font = self.font
-			del self.font
-			self.decompile(reader, font)
+		font = self.__dict__.get("font")
+		if reader and font is not None:
+			# Decompile a copy, and only then publish its attributes and
+			# drop the reader, so that other threads never see a partially
+			# decompiled table. If several threads race here, the first
+			# one to finish wins.
+			table = self.__class__()
+			table.decompile(reader.copy(), font)
+			with _lazyLock:
+				if self.__dict__.get("reader") is reader:
+					self.__dict__.update(table.__dict__)
+					del self.reader
+					del self.font
 
 	@classmethod
 	def getRecordSize(cls, reader):
@@ -635,6 +873,9 @@ class BaseTable(object):
 		del self.__rawTable  # succeeded, get rid of debugging info
 
 	def compile(self, writer, font):
+		reader = self.__dict__.get("reader")
+		if reader is not None and self.compileRaw(reader, writer, font):
+			return
 		self.ensureDecompiled()
 		if hasattr(self, 'preWrite'):
 			table = self.preWrite(font)
@@ -705,6 +946,52 @@ class BaseTable(object):
 				if conv.isPropagated:
 					writer[conv.name] = value
 
+	def compileRaw(self, reader, writer, font):
+		"""Write the original data of a lazily loaded table that was never
+		decompiled, instead of decompiling and compiling it again. Its
+		subtables are written as subwriters of their own, so that offsets
+		are rebased when the data is assembled. Return False (and write
+		nothing) if the data can't be reused as is: if the values the table
+		inherits from its parents (eg. ValueFormat or ClassCount) changed,
+		or if it has offsets this doesn't know how to follow."""
+		pending = []
+		for name, value in (reader.localState or {}).items():
+			if not writer.localState or name not in writer.localState:
+				return False
+			current = writer[name]
+			if isinstance(current, CountReference):
+				count = current.table[current.name]
+				if count is None:
+					pending.append((current, value))
+				elif count != value:
+					return False
+			elif isinstance(current, ValueRecordFactory):
+				if current.format != value.format:
+					return False
+			elif current != value:
+				return False
+
+		rawWriter = writer.__class__(tableTag=writer.tableTag)
+		try:
+			_compileRawTable(self.__class__, _RawTableReader(reader.data,
+				reader.localState, reader.offset, reader.tableTag),
+				font, rawWriter)
+		except _NotRawError:
+			return False
+
+		for ref, value in pending:
+			ref.setValue(value)
+		if hasattr(self.__class__, 'LookupType'):
+			writer['LookupType'].setValue(self.__class__.LookupType)
+		for attr in ('Extension', 'DontShare'):
+			if hasattr(rawWriter, attr):
+				setattr(writer, attr, True)
+		writer.items = rawWriter.items
+		for item in writer.items:
+			if hasattr(item, "getData"):
+				item.parent = writer
+		return True
+
 	def readFormat(self, reader):
 		pass
 
@@ -823,6 +1110,147 @@ valueRecordFormat = [
 	(0x8000, "Reserved8",	0,	0),
 ]
 
+class _NotRawError(Exception):
+	pass
+
+
+class _RawTableReader(OTTableReader):
+
+	"""Reader for walking the original data of a table in compileRaw(),
+	which fails on the offsets that the walk doesn't follow itself."""
+
+	__slots__ = ()
+
+	def getSubReader(self, offset):
+		raise _NotRawError()
+
+	def getRawSubReader(self, offset):
+		return OTTableReader.getSubReader(self, offset)
+
+
+def _compileRawTable(tableClass, reader, font, writer):
+	# Fill 'writer' with the data of the table of 'tableClass' starting at
+	# 'reader', with a subwriter for each non-NULL offset
+	if getattr(tableClass, 'DontShare', False):
+		writer.DontShare = True
+	cursor = [reader.pos]
+	table = tableClass()
+	table.readFormat(reader)
+	_walkRawTable(table, reader, font, writer, cursor)
+	writer.items.append(reader.data[cursor[0]:reader.pos])
+
+
+def _writeRawOffset(reader, font, writer, cursor, tableClass, readOffset,
+		longOffset=False, name=None, repeatIndex=None):
+	start = reader.pos
+	offset = readOffset()
+	if not offset:
+		return
+	writer.items.append(reader.data[cursor[0]:start])
+	subWriter = writer.getSubWriter()
+	subWriter.longOffset = longOffset
+	if name is not None:
+		subWriter.name = name
+	if repeatIndex is not None:
+		subWriter.repeatIndex = repeatIndex
+	writer.items.append(subWriter)
+	_compileRawTable(tableClass, reader.getRawSubReader(offset), font, subWriter)
+	cursor[0] = reader.pos
+
+
+def _walkRawTable(table, reader, font, writer, cursor):
+	# Read the fields of 'table' like BaseTable.decompile() does, except that
+	# tables are followed as raw subwriters, and that arrays and records
+	# that don't contain offsets are skipped
+	from . import otTables
+	from .otConverters import (Table, ExtSubTable, Struct, StructWithLength,
+		ValueRecord)
+	tableDict = {}
+	for conv in table.getConverters():
+		if conv.name == "SubTable":
+			conv = conv.getConverter(reader.tableTag, tableDict["LookupType"])
+		if conv.name == "ExtSubTable":
+			conv = conv.getConverter(reader.tableTag,
+					tableDict["ExtensionLookupType"])
+		if conv.name == "FeatureParams":
+			conv = conv.getConverter(reader["FeatureTag"])
+		if conv.name == "SubStruct" or isinstance(conv, StructWithLength):
+			raise _NotRawError()
+		if conv.repeat:
+			if isinstance(conv.repeat, int):
+				count = conv.repeat
+			elif conv.repeat in tableDict:
+				count = tableDict[conv.repeat]
+			else:
+				count = reader[conv.repeat]
+			count += conv.aux
+		else:
+			if conv.aux and not eval(conv.aux, None, tableDict):
+				continue
+			count = None
+		value = None
+
+		if isinstance(conv, Table):
+			if isinstance(conv, ExtSubTable):
+				writer.Extension = True
+			for i in range(1 if count is None else count):
+				_writeRawOffset(reader, font, writer, cursor, conv.tableClass,
+					lambda: conv.readOffset(reader), conv.longOffset, conv.name,
+					None if count is None else i)
+		elif isinstance(conv, ValueRecord):
+			format = reader[conv.which].format
+			if any(isDevice for _, isDevice, _ in format):
+				for i in range(1 if count is None else count):
+					for name, isDevice, _ in format:
+						if isDevice:
+							_writeRawOffset(reader, font, writer, cursor,
+								getattr(otTables, name), reader.readUShort)
+						else:
+							reader.advance(2)
+			else:
+				reader.advance(2 * len(format) * (1 if count is None else count))
+		elif isinstance(conv, Struct):
+			size = _getRawRecordSize(conv.tableClass, reader)
+			if size is not None:
+				reader.advance(size * (1 if count is None else count))
+			else:
+				for i in range(1 if count is None else count):
+					record = conv.tableClass()
+					record.readFormat(reader)
+					_walkRawTable(record, reader, font, writer, cursor)
+		elif count is None:
+			value = conv.read(reader, font, tableDict)
+		else:
+			size = conv.getRecordSize(reader)
+			if size is NotImplemented:
+				value = conv.readArray(reader, font, tableDict, count)
+			else:
+				reader.advance(size * count)
+
+		tableDict[conv.name] = value
+		if conv.isPropagated:
+			reader[conv.name] = value
+
+
+def _getRawRecordSize(tableClass, reader):
+	# Return the size of a record of 'tableClass', or None if it has offsets
+	# or its size isn't known before reading it
+	from .otConverters import Table, Struct, ValueRecord
+	if issubclass(tableClass, FormatSwitchingBaseTable):
+		return None
+	for conv in tableClass.converters:
+		if isinstance(conv, Table):
+			return None
+		elif isinstance(conv, ValueRecord):
+			if any(isDevice for _, isDevice, _ in reader[conv.which].format):
+				return None
+		elif isinstance(conv, Struct):
+			if _getRawRecordSize(conv.tableClass, reader) is None:
+				return None
+	size = tableClass.getRecordSize(reader)
+	return None if size is NotImplemented else size
+
+
 def _buildDict():
 	d = {}
 	for mask, name, isDevice, signed in valueRecordFormat:
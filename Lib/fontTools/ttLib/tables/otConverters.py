@@ -5,12 +5,13 @@ from fontTools.misc.fixedTools import (
 	versionToFixed as ve2fi)
 from fontTools.misc.textTools import pad, safeEval
 from fontTools.ttLib import getSearchRange
-from .otBase import (CountReference, FormatSwitchingBaseTable,
+from .otBase import (BaseTable, CountReference, FormatSwitchingBaseTable,
                      OTTableWriter, ValueRecordFactory)
 from .otTables import (AATStateTable, AATState, AATAction,
                        ContextualMorphAction)
 from functools import partial
 import struct
+import threading
 import logging
 
 
@@ -89,6 +90,11 @@ except ImportError:
 
 class _LazyList(UserList):
 
+	def __init__(self, *args, **kwargs):
+		UserList.__init__(self, *args, **kwargs)
+		# guards the reader, which is shared by all the items
+		self.lock = threading.RLock()
+
 	def __getslice__(self, i, j):
 		return self.__getitem__(slice(i, j))
 
@@ -98,11 +104,23 @@ class _LazyList(UserList):
 			return [self[i] for i in indices]
 		item = self.data[k]
 		if isinstance(item, _MissingItem):
-			self.reader.seek(self.pos + item[0] * self.recordSize)
-			item = self.conv.read(self.reader, self.font, {})
-			self.data[k] = item
+			with self.lock:
+				item = self.data[k]
+				if isinstance(item, _MissingItem):
+					reader = self.reader
+					reader.seek(self.pos + item[0] * self.recordSize)
+					item = self.data[k] = self.conv.read(reader, self.font, {})
 		return item
 
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		del state["lock"]
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.lock = threading.RLock()
+
 	def __add__(self, other):
 		if isinstance(other, _LazyList):
 			other = list(other)
@@ -384,6 +402,20 @@ class Struct(BaseConverter):
 	def getRecordSize(self, reader):
 		return self.tableClass and self.tableClass.getRecordSize(reader)
 
+	def readArray(self, reader, font, tableDict, count):
+		if not (font.lazy and count > 8):
+			recordReader = self.getRecordReader(reader)
+			if recordReader is not None:
+				return recordReader.readArray(reader, font, count)
+		return BaseConverter.readArray(self, reader, font, tableDict, count)
+
+	def getRecordReader(self, reader):
+		"""Return a FixedRecordReader for arrays of this struct, or None if
+		its records don't have a fixed layout."""
+		if self.tableClass is None:
+			return None
+		return getFixedRecordReader(self.tableClass, reader)
+
 	def read(self, reader, font, tableDict):
 		table = self.tableClass()
 		table.decompile(reader, font)
@@ -452,6 +484,9 @@ class Struct(BaseConverter):
 
 
 class StructWithLength(Struct):
+	def getRecordReader(self, reader):
+		return None
+
 	def read(self, reader, font, tableDict):
 		pos = reader.pos
 		table = self.tableClass()
@@ -493,8 +528,15 @@ class Table(Struct):
 		else:
 			writer.writeUShort(0)
 
+	def getRecordReader(self, reader):
+		return None
+
 	def read(self, reader, font, tableDict):
-		offset = self.readOffset(reader)
+		return self.readSubTable(reader, font, self.readOffset(reader))
+
+	def readSubTable(self, reader, font, offset):
+		"""Return the table at 'offset' from the start of 'reader', or None
+		if 'offset' is 0."""
 		if offset == 0:
 			return None
 		table = self.tableClass()
@@ -1345,3 +1387,190 @@ converterMapping = {
 	"OffsetTo":	lambda C: partial(Table, tableClass=C),
 	"LOffsetTo":	lambda C: partial(LTable, tableClass=C),
 }
+
+
+# Arrays of records whose fields all have a fixed size (eg. RangeRecord,
+# MarkRecord, PairValueRecord) are read with a single struct.Struct per record
+# type instead of field by field. ValueRecords count as fixed for a given
+# ValueFormat, so the layouts are cached per (tableClass, valueFormats).
+
+def _readGlyphNames(conv, columns, reader, font, count):
+	glyphOrder = font.getGlyphOrder()
+	gids = columns[0]
+	try:
+		return [glyphOrder[gid] for gid in gids]
+	except IndexError:
+		# Slower, but will not throw an IndexError on an invalid glyph id.
+		return [font.getGlyphName(gid) for gid in gids]
+
+def _readTags(conv, columns, reader, font, count):
+	from fontTools.misc.py23 import Tag
+	return [Tag(value) for value in columns[0]]
+
+def _readFixed(conv, columns, reader, font, count):
+	return [fi2fl(value, 16) for value in columns[0]]
+
+def _readF2Dot14(conv, columns, reader, font, count):
+	return [fi2fl(value, 14) for value in columns[0]]
+
+def _readDeciPoints(conv, columns, reader, font, count):
+	return [value / 10 for value in columns[0]]
+
+def _readSubTables(conv, columns, reader, font, count):
+	return [conv.readSubTable(reader, font, offset) for offset in columns[0]]
+
+# converter class: (struct format, function converting the unpacked values,
+# or None if they're used as is)
+_fixedFields = {
+	Int8: ("b", None),
+	UInt8: ("B", None),
+	ComputedUInt8: ("B", None),
+	Short: ("h", None),
+	UShort: ("H", None),
+	ComputedUShort: ("H", None),
+	NameID: ("H", None),
+	Long: ("l", None),
+	ULong: ("L", None),
+	ComputedULong: ("L", None),
+	Flags32: ("L", None),
+	GlyphID: ("H", _readGlyphNames),
+	Tag: ("4s", _readTags),
+	Fixed: ("l", _readFixed),
+	F2Dot14: ("h", _readF2Dot14),
+	DeciPoints: ("H", _readDeciPoints),
+	Table: ("H", _readSubTables),
+	LTable: ("L", _readSubTables),
+}
+
+
+def _readValueRecords(format, columns, reader, font, count):
+	from .otBase import ValueRecord
+	if not format:
+		return [None] * count
+	names = [name for name, isDevice, signed in format]
+	devices = [i for i, (name, isDevice, signed) in enumerate(format) if isDevice]
+	records = []
+	for values in zip(*columns):
+		valueRecord = ValueRecord()
+		if devices:
+			values = list(values)
+			for i in devices:
+				offset = values[i]
+				if offset:
+					from . import otTables
+					device = getattr(otTables, names[i])()
+					device.decompile(reader.getSubReader(offset), font)
+					values[i] = device
+				else:
+					values[i] = None
+		valueRecord.__dict__.update(zip(names, values))
+		records.append(valueRecord)
+	return records
+
+
+class FixedRecordReader(object):
+
+	"""Reads arrays of records of 'tableClass', whose fields are all
+	read by the converters in _fixedFields, or are ValueRecords of the
+	given 'valueFormats' (ValueRecordFactory.format lists, in order)."""
+
+	def __init__(self, tableClass, valueFormats):
+		self.tableClass = tableClass
+		self.names = []
+		# [(converter or ValueRecord format, number of values, function)]
+		self.fields = []
+		structFormat = [">"]
+		valueFormats = list(valueFormats)
+		for conv in tableClass.converters:
+			self.names.append(conv.name)
+			if isinstance(conv, ValueRecord):
+				format = valueFormats.pop(0)
+				for name, isDevice, signed in format:
+					structFormat.append("h" if signed else "H")
+				self.fields.append((format, len(format), _readValueRecords))
+			else:
+				code, function = _fixedFields[type(conv)]
+				structFormat.append(code)
+				self.fields.append((conv, 1, function))
+		self.struct = struct.Struct("".join(structFormat))
+		self.numValues = sum(n for conv, n, function in self.fields)
+
+	def readArray(self, reader, font, count):
+		size = self.struct.size
+		pos = reader.pos
+		data = reader.data[pos:pos + size * count]
+		if len(data) != size * count:
+			raise struct.error("not enough data for %d %s records" % (
+				count, self.tableClass.__name__))
+		reader.advance(size * count)
+		if not count or not size:
+			columns = [()] * self.numValues
+		elif hasattr(self.struct, "iter_unpack"):
+			columns = list(zip(*self.struct.iter_unpack(data)))
+		else:
+			# Python 2
+			unpack_from = self.struct.unpack_from
+			columns = list(zip(*[unpack_from(data, i)
+					for i in range(0, len(data), size)]))
+		values = []
+		i = 0
+		for conv, n, function in self.fields:
+			if function is None:
+				values.append(columns[i])
+			else:
+				values.append(function(conv, columns[i:i + n], reader, font, count))
+			i += n
+		tableClass = self.tableClass
+		names = self.names
+		records = []
+		for recordValues in zip(*values):
+			record = tableClass()
+			record.__dict__.update(zip(names, recordValues))
+			records.append(record)
+		return records
+
+
+# {tableClass: whether its records have a fixed layout}
+_fixedRecordClasses = {}
+# {(tableClass, valueFormats): FixedRecordReader}
+_recordReaders = {}
+
+
+def getFixedRecordReader(tableClass, reader):
+	"""Return a FixedRecordReader for arrays of 'tableClass' records, read
+	with the ValueFormats currently set in 'reader', or None if they
+	can't be read as fixed-size records."""
+	isFixed = _fixedRecordClasses.get(tableClass)
+	if isFixed is None:
+		isFixed = _fixedRecordClasses[tableClass] = _isFixedRecord(tableClass)
+	if not isFixed:
+		return None
+	valueFormats = tuple(tuple(reader[conv.which].format)
+			for conv in tableClass.converters if isinstance(conv, ValueRecord))
+	key = (tableClass, valueFormats)
+	recordReader = _recordReaders.get(key)
+	if recordReader is None:
+		recordReader = _recordReaders[key] = FixedRecordReader(
+			tableClass, valueFormats)
+	return recordReader
+
+
+def _isFixedRecord(tableClass):
+	if (not issubclass(tableClass, BaseTable) or
+			issubclass(tableClass, FormatSwitchingBaseTable) or
+			hasattr(tableClass, "postRead")):
+		return False
+	# records with their own way of decompiling are read one by one
+	for name in ("decompile", "readFormat"):
+		method = getattr(tableClass, name)
+		baseMethod = getattr(BaseTable, name)
+		if getattr(method, "__func__", method) is not getattr(baseMethod, "__func__", baseMethod):
+			return False
+	if not tableClass.converters:
+		return False
+	for conv in tableClass.converters:
+		if conv.repeat or conv.aux or conv.isPropagated:
+			return False
+		if type(conv) not in _fixedFields and type(conv) is not ValueRecord:
+			return False
+	return True
@@ -3,13 +3,14 @@
 OpenType subtables.
 
 Most are constructed upon import from data in otData.py, all are populated with
-converter objects from otConverters.py.
+converter objects from otConverters.py when first used.
 """
 from __future__ import print_function, division, absolute_import, unicode_literals
 from fontTools.misc.py23 import *
 from fontTools.misc.textTools import safeEval
 from .otBase import BaseTable, FormatSwitchingBaseTable
 import operator
+import threading
 import logging
 
 
@@ -858,6 +859,8 @@ _equivalents = {
 # XXX This should probably move to otBase.py
 #
 
+extensionLookupTypes = {'GSUB': 7, 'GPOS': 9}
+
 def fixLookupOverFlows(ttf, overflowRecord):
 	""" Either the offset from the LookupList to a lookup overflowed, or
 	an offset from a lookup to a subtable overflowed.
@@ -888,30 +891,40 @@ def fixLookupOverFlows(ttf, overflowRecord):
 		lookupIndex = lookupIndex - 1
 	if lookupIndex < 0:
 		return ok
-	if overflowRecord.tableType == 'GSUB':
-		extType = 7
-	elif overflowRecord.tableType == 'GPOS':
-		extType = 9
 
 	lookups = ttf[overflowRecord.tableType].table.LookupList.Lookup
 	lookup = lookups[lookupIndex]
 	# If the previous lookup is an extType, look further back. Very unlikely, but possible.
-	while lookup.SubTable[0].__class__.LookupType == extType:
+	while isExtensionLookup(lookup, overflowRecord.tableType):
 		lookupIndex = lookupIndex -1
 		if lookupIndex < 0:
 			return ok
 		lookup = lookups[lookupIndex]
 
+	ok = promoteLookupToExtension(lookup, overflowRecord.tableType)
+	return ok
+
+def isExtensionLookup(lookup, tableType):
+	extType = extensionLookupTypes[tableType]
+	return bool(lookup.SubTable) and lookup.SubTable[0].__class__.LookupType == extType
+
+def promoteLookupToExtension(lookup, tableType):
+	""" Make 'lookup' an Extension lookup, wrapping each of its subtables
+	in an Extension subtable, so that they can be written anywhere past
+	the 64K reachable by 16-bit offsets. Return False if it already is one.
+	"""
+	if isExtensionLookup(lookup, tableType):
+		return False
+	extType = extensionLookupTypes[tableType]
 	lookup.LookupType = extType
 	for si in range(len(lookup.SubTable)):
 		subTable = lookup.SubTable[si]
-		extSubTableClass = lookupTypes[overflowRecord.tableType][extType]
+		extSubTableClass = lookupTypes[tableType][extType]
 		extSubTable = extSubTableClass()
 		extSubTable.Format = 1
 		extSubTable.ExtSubTable = subTable
 		lookup.SubTable[si] = extSubTable
-	ok = 1
-	return ok
+	return True
 
 def splitAlternateSubst(oldSubTable, newSubTable, overflowRecord):
 	ok = 1
@@ -1187,26 +1200,57 @@ def _buildClasses():
 	for i in range(1, 99+1):
 		featureParamTypes['cv%02d' % i] = FeatureParamsCharacterVariants
 
-	# add converters to classes
-	from .otConverters import buildConverters
+	# the converters of each class are only built when first accessed
+	specs = {}
 	for name, table in otData:
 		m = formatPat.match(name)
 		if m:
 			# XxxFormatN subtable, add converter to "base" table
 			name, format = m.groups()
-			format = int(format)
-			cls = namespace[name]
-			if not hasattr(cls, "converters"):
-				cls.converters = {}
-				cls.convertersByName = {}
-			converters, convertersByName = buildConverters(table[1:], namespace)
-			cls.converters[format] = converters
-			cls.convertersByName[format] = convertersByName
-			# XXX Add staticSize?
+			specs.setdefault(name, []).append((int(format), table[1:]))
 		else:
-			cls = namespace[name]
-			cls.converters, cls.convertersByName = buildConverters(table, namespace)
-			# XXX Add staticSize?
+			specs[name] = [(None, table)]
+	for name, tableSpecs in specs.items():
+		cls = namespace[name]
+		cls.converters = _LazyConverters(cls, "converters", tableSpecs)
+		cls.convertersByName = _LazyConverters(cls, "convertersByName", tableSpecs)
+
+
+_convertersLock = threading.RLock()
+
+
+class _LazyConverters(object):
+
+	"""Stands for the 'converters' or 'convertersByName' attribute of a
+	table class, until either is first accessed: the converters of the class
+	are then built from its otData specs, and replace both placeholders.
+	"""
+
+	def __init__(self, cls, attr, tableSpecs):
+		self.cls = cls
+		self.attr = attr
+		# [(format, spec)], with format None if the class has only one
+		self.tableSpecs = tableSpecs
+
+	def __get__(self, obj, objtype=None):
+		cls = self.cls
+		with _convertersLock:
+			if cls.__dict__[self.attr] is self:
+				from .otConverters import buildConverters
+				namespace = globals()
+				if self.tableSpecs[0][0] is None:
+					converters, convertersByName = buildConverters(
+						self.tableSpecs[0][1], namespace)
+				else:
+					converters = {}
+					convertersByName = {}
+					for format, spec in self.tableSpecs:
+						converters[format], convertersByName[format] = \
+							buildConverters(spec, namespace)
+					# XXX Add staticSize?
+				cls.converters = converters
+				cls.convertersByName = convertersByName
+		return cls.__dict__[self.attr]
 
 
 _buildClasses()
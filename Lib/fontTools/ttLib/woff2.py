@@ -11,7 +11,7 @@ from fontTools.ttLib import (TTFont, TTLibError, getTableModule, getTableClass,
 	getSearchRange)
 from fontTools.ttLib.sfnt import (SFNTReader, SFNTWriter, DirectoryEntry,
 	WOFFFlavorData, sfntDirectoryFormat, sfntDirectorySize, SFNTDirectoryEntry,
-	sfntDirectoryEntrySize, calcChecksum)
+	sfntDirectoryEntrySize, calcChecksum, MappedFile)
 from fontTools.ttLib.tables import ttProgram
 import logging
 
@@ -30,13 +30,15 @@ class WOFF2Reader(SFNTReader):
 
 	flavor = "woff2"
 
-	def __init__(self, file, checkChecksums=1, fontNumber=-1):
+	def __init__(self, file, checkChecksums=1, fontNumber=-1, mmap=False):
 		if not haveBrotli:
 			log.error(
 				'The WOFF2 decoder requires the Brotli Python extension, available at: '
 				'https://github.com/google/brotli')
 			raise ImportError("No module named brotli")
 
+		if mmap and not isinstance(file, MappedFile):
+			file = MappedFile(file)
 		self.file = file
 
 		signature = Tag(self.file.read(4))
@@ -176,6 +178,8 @@ class WOFF2Writer(SFNTWriter):
 		entry.flags = getKnownTagIndex(entry.tag)
 		# WOFF2 table data are written to disk only on close(), after all tags
 		# have been specified
+		if isinstance(data, memoryview):
+			data = data.tobytes()
 		entry.data = data
 
 		self.tables[tag] = entry
@@ -24,6 +24,10 @@ usage: ttx [options] inputfile1 [... inputfileN]
     -q Quiet: No messages will be written to stdout about what
        is being done.
     -a allow virtual glyphs ID's on compile or decompile.
+    -j <number>, --jobs <number> Process the input files in parallel, in
+       up to <number> processes (0 for one per CPU). The messages about
+       each file are written out together when it's done, in the order of
+       the input files, and all files are processed even if some fail.
 
     Dump options:
     -l List table info: instead of dumping to a TTX file, list some
@@ -88,7 +92,7 @@ from fontTools.misc.macCreatorType import getMacCreatorAndType
 from fontTools.unicode import setUnicodeData
 from fontTools.misc.timeTools import timestampSinceEpoch
 from fontTools.misc.loggingTools import Timer
-from fontTools.misc.cliTools import makeOutputFileName
+from fontTools.misc.cliTools import makeOutputFileName, parseJobs, runJobs
 import os
 import sys
 import getopt
@@ -121,6 +125,7 @@ class Options(object):
 	recalcTimestamp = False
 	flavor = None
 	useZopfli = False
+	processes = 1
 
 	def __init__(self, rawOptions, numFiles):
 		self.onlyTables = []
@@ -177,6 +182,11 @@ class Options(object):
 				self.recalcBBoxes = False
 			elif option == "-a":
 				self.allowVID = True
+			elif option in ("-j", "--jobs"):
+				try:
+					self.processes = parseJobs(value)
+				except ValueError as e:
+					raise getopt.GetoptError(str(e))
 			elif option == "-e":
 				self.ignoreDecompileErrors = False
 			elif option == "--unicodedata":
@@ -318,9 +328,9 @@ def guessFileType(fileName):
 
 
 def parseOptions(args):
-	rawOptions, files = getopt.getopt(args, "ld:o:fvqht:x:sim:z:baey:",
+	rawOptions, files = getopt.getopt(args, "ld:o:fvqht:x:sim:z:baey:j:",
 			['unicodedata=', "recalc-timestamp", 'flavor=', 'version',
-			 'with-zopfli', 'newline='])
+			 'with-zopfli', 'newline=', 'jobs='])
 
 	options = Options(rawOptions, len(files))
 	jobs = []
@@ -359,10 +369,27 @@ def parseOptions(args):
 
 
 def process(jobs, options):
+	if options.processes > 1 and len(jobs) > 1:
+		statuses = runJobs(_processJob,
+				[(action, input, output, options) for action, input, output in jobs],
+				options.processes)
+		failed = sum(1 for status in statuses if status)
+		if failed:
+			log.error("%d of %d files failed", failed, len(jobs))
+			sys.exit(1)
+		return
 	for action, input, output in jobs:
 		action(input, output, options)
 
 
+def _processJob(action, input, output, options):
+	try:
+		action(input, output, options)
+	except TTLibError as e:
+		log.error(e)
+		sys.exit(1)
+
+
 def waitForKeyPress():
 	"""Force the DOS Prompt window to stay open so the user gets
 	a chance to see what's wrong."""
@@ -183,7 +183,7 @@ def _GetCoordinates(font, glyphName):
 		control = (glyph.numberOfContours,)+allData[1:]
 
 	# Add phantom points for (left, right, top, bottom) positions.
-	horizontalAdvanceWidth, leftSideBearing = font["hmtx"].metrics[glyphName]
+	horizontalAdvanceWidth, leftSideBearing = font.getTableReadOnly("hmtx").metrics[glyphName]
 	if not hasattr(glyph, 'xMin'):
 		glyph.recalcBounds(glyf)
 	leftSideX = glyph.xMin - leftSideBearing
@@ -595,9 +595,10 @@ def _add_HVAR(font, model, master_ttfs, axisTags):
 	log.info("Generating HVAR")
 
 	hAdvanceDeltas = {}
-	metricses = [m["hmtx"].metrics for m in master_ttfs]
-	for glyph in font.getGlyphOrder():
-		hAdvances = [metrics[glyph][0] for metrics in metricses]
+	glyphOrder = font.getGlyphOrder()
+	advanceses = [m["hmtx"].getAdvances(glyphOrder) for m in master_ttfs]
+	for i, glyph in enumerate(glyphOrder):
+		hAdvances = [advances[i] for advances in advanceses]
 		# TODO move round somewhere else?
 		hAdvanceDeltas[glyph] = tuple(round(d) for d in model.getDeltas(hAdvances)[1:])
 
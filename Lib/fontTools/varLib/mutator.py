@@ -2,6 +2,9 @@
 Instantiate a variation font.  Run, eg:
 
 $ python mutator.py ./NotoSansArabic-VF.ttf wght=140 wdth=85
+
+Several variation fonts can be given, to instantiate them all at the same
+location; with -j N (0 for one per CPU), in up to N processes at a time.
 """
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
@@ -9,7 +12,13 @@ from fontTools.ttLib import TTFont
 from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
 from fontTools.varLib import _GetCoordinates, _SetCoordinates
 from fontTools.varLib.models import supportScalar, normalizeLocation
+from fontTools.misc.cliTools import parseJobsOption, runJobs
 import os.path
+import sys
+import logging
+
+
+log = logging.getLogger("fontTools.varLib.mutator")
 
 
 def _iup_segment(coords, rc1, rd1, rc2, rd2):
@@ -99,35 +108,18 @@ def _iup_delta(delta, coords, ends):
 	return out
 
 
-def main(args=None):
-
-	if args is None:
-		import sys
-		args = sys.argv[1:]
-
-	varfilename = args[0]
-	locargs = args[1:]
-	outfile = os.path.splitext(varfilename)[0] + '-instance.ttf'
-
-	loc = {}
-	for arg in locargs:
-		tag,val = arg.split('=')
-		assert len(tag) <= 4
-		loc[tag.ljust(4)] = float(val)
-	print("Location:", loc)
-
-	print("Loading variable font")
-	varfont = TTFont(varfilename)
-
-	fvar = varfont['fvar']
+def instantiateVariableFont(varfont, loc):
+	"""Instantiate the variable TTFont 'varfont' in place at the location
+	'loc', a dict mapping axis tags to user-space values, and return it."""
+	fvar = varfont.getTableReadOnly('fvar')
 	axes = {a.axisTag:(a.minValue,a.defaultValue,a.maxValue) for a in fvar.axes}
 	# TODO Apply avar
 	# TODO Round to F2Dot14?
 	loc = normalizeLocation(loc, axes)
 	# Location is normalized now
-	print("Normalized location:", loc)
+	log.info("Normalized location: %s", loc)
 
-	gvar = varfont['gvar']
+	gvar = varfont.getTableReadOnly('gvar')
 	glyf = varfont['glyf']
 	# get list of glyph names in gvar sorted by component depth
 	glyphnames = sorted(
@@ -155,7 +147,7 @@ def main(args=None):
 	# Interpolate cvt
 
 	if 'cvar' in varfont:
-		cvar = varfont['cvar']
+		cvar = varfont.getTableReadOnly('cvar')
 		cvt = varfont['cvt ']
 		deltas = {}
 		for var in cvar.variations:
@@ -167,17 +159,74 @@ def main(args=None):
 		for i, delta in deltas.items():
 			cvt[i] += int(round(delta))
 
-	print("Removing variable tables")
+	log.info("Removing variable tables")
 	for tag in ('avar','cvar','fvar','gvar','HVAR','MVAR','VVAR','STAT'):
 		if tag in varfont:
 			del varfont[tag]
 
-	print("Saving instance font", outfile)
+	return varfont
+
+
+def instantiateVariableFile(varfilename, loc, outfile=None):
+	"""Instantiate the variable font file 'varfilename' at the location
+	'loc', a dict mapping axis tags to user-space values, and save the
+	instance to 'outfile' (by default, varfilename-instance.ttf)."""
+	if outfile is None:
+		outfile = os.path.splitext(varfilename)[0] + '-instance.ttf'
+
+	log.info("Loading variable font")
+	varfont = TTFont(varfilename)
+
+	instantiateVariableFont(varfont, loc)
+
+	log.info("Saving instance font %s", outfile)
 	varfont.save(outfile)
 
 
+def main(args=None):
+	from fontTools import configLogger
+
+	if args is None:
+		args = sys.argv[1:]
+
+	# -j N instantiates the fonts in up to N processes
+	try:
+		jobs, args = parseJobsOption(args)
+	except ValueError as e:
+		print("%s\nERROR: %s" % (__doc__, e), file=sys.stderr)
+		return 2
+
+	configLogger(level="INFO")
+
+	# Arguments with a '=' are axis locations, the others are variable
+	# fonts, all instantiated at the same location.
+	varfilenames = []
+	locargs = []
+	for arg in args:
+		if '=' in arg:
+			locargs.append(arg)
+		else:
+			varfilenames.append(arg)
+
+	loc = {}
+	for arg in locargs:
+		tag,val = arg.split('=')
+		assert len(tag) <= 4
+		loc[tag.ljust(4)] = float(val)
+	log.info("Location: %s", loc)
+
+	if not varfilenames:
+		print(__doc__)
+		return 1
+	if len(varfilenames) == 1:
+		instantiateVariableFile(varfilenames[0], loc)
+		return
+	statuses = runJobs(instantiateVariableFile,
+			[(varfilename, loc) for varfilename in varfilenames], jobs or 1)
+	return 1 if any(statuses) else 0
+
+
 if __name__ == "__main__":
-	import sys
 	if len(sys.argv) > 1:
 		sys.exit(main())
 	import doctest
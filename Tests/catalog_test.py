@@ -0,0 +1,149 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables._f_v_a_r import Axis
+from fontTools.catalog import FontCatalog, buildCoverage, main
+import os
+import shutil
+import pytest
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "ttx", "data")
+UNICODES = {0x0000, 0x000D, 0x0020, 0x002E, 0x2026}
+
+
+@pytest.fixture
+def fontDir(tmpdir):
+	for fileName in ("TestTTF.ttf", "TestOTF.otf", "TestTTC.ttc"):
+		shutil.copy(os.path.join(DATA_DIR, fileName), str(tmpdir))
+	# a variable font, with one more character
+	font = TTFont(os.path.join(DATA_DIR, "TestTTF.ttf"))
+	fvar = font["fvar"] = newTable("fvar")
+	axis = Axis()
+	axis.axisTag = "wght"
+	axis.minValue, axis.defaultValue, axis.maxValue = 100, 400, 900
+	axis.axisNameID = 256
+	fvar.axes = [axis]
+	fvar.instances = []
+	name = font["name"]
+	name.names = [n for n in name.names if n.nameID != 1]
+	name.setName("Test Variable", 1, 3, 1, 0x409)
+	for subtable in font["cmap"].tables:
+		subtable.cmap[0x2E3A] = "ellipsis"
+	font.save(str(tmpdir.join("TestVariable.ttf")))
+	tmpdir.join("README.txt").write("not a font")
+	return tmpdir
+
+
+def test_buildCoverage():
+	assert buildCoverage([0, 1, 33, 0x10FFFF]) == {
+		0: 0b11, 1: 0b10, 0x10FFFF >> 5: 1 << 31}
+
+
+def test_update_and_query(fontDir):
+	path = str(fontDir)
+	ttf = os.path.join(path, "TestTTF.ttf")
+	otf = os.path.join(path, "TestOTF.otf")
+	ttc = os.path.join(path, "TestTTC.ttc")
+	variable = os.path.join(path, "TestVariable.ttf")
+	with FontCatalog(str(fontDir.join("index.db"))) as catalog:
+		assert catalog.update([path]) == 4
+		assert len(catalog) == 5
+
+		assert catalog.query(family="test ttf") == [
+			(ttc, 0), (ttc, 1), (ttf, -1)]
+		assert catalog.query(unicodes=[0x2026, 0x2E3A]) == [(variable, -1)]
+		assert catalog.query(unicodes=[0x2026], variable=False) == [
+			(otf, -1), (ttc, 0), (ttc, 1), (ttf, -1)]
+		assert catalog.query(variable=True) == [(variable, -1)]
+		assert catalog.query(unicodes=[0x41]) == []
+
+		info = catalog.getFontInfo(variable)
+		assert info["family"] == "Test Variable"
+		assert info["postscriptName"] == "TestTTF-Regular"
+		assert info["weightClass"] == 400
+		assert info["isVariable"]
+		assert info["axes"] == ["wght"]
+		assert info["unicodes"] == UNICODES | {0x2E3A}
+		assert catalog.getFontInfo(ttc, 1)["unicodes"] == UNICODES
+		assert catalog.getFontInfo(ttc) is None
+
+
+def test_update_incremental(fontDir):
+	path = str(fontDir)
+	ttf = os.path.join(path, "TestTTF.ttf")
+	index = str(fontDir.join("index.db"))
+	with FontCatalog(index) as catalog:
+		catalog.update([path])
+
+	with FontCatalog(index) as catalog:
+		# nothing changed
+		assert catalog.update([path]) == 0
+		# only the modification time changed
+		os.utime(ttf, (0, 0))
+		assert catalog.update([path]) == 0
+		# the data changed
+		shutil.copy(os.path.join(path, "TestVariable.ttf"), ttf)
+		assert catalog.update([path]) == 1
+		assert catalog.getFontInfo(ttf)["family"] == "Test Variable"
+		# removed files are forgotten
+		os.remove(ttf)
+		assert catalog.update([path]) == 0
+		assert catalog.getFontInfo(ttf) is None
+		assert len(catalog) == 4
+
+
+def test_update_woff2_same_lengths(tmpdir):
+	pytest.importorskip("brotli")
+	path = str(tmpdir.join("TestTTF.woff2"))
+	font = TTFont(os.path.join(DATA_DIR, "TestTTF.ttf"))
+	font.flavor = "woff2"
+	font.save(path)
+	with FontCatalog(str(tmpdir.join("index.db"))) as catalog:
+		catalog.update([path])
+		assert catalog.getFontInfo(path)["weightClass"] == 400
+		# an edit that keeps the length of all the tables
+		font = TTFont(path)
+		font["OS/2"].usWeightClass = 700
+		font.save(path)
+		os.utime(path, (0, 0))
+		assert TTFont(path).reader.tables["OS/2"].length == \
+			font.reader.tables["OS/2"].length
+		assert catalog.update([path]) == 1
+		assert catalog.getFontInfo(path)["weightClass"] == 700
+
+
+def test_main(fontDir, capsys):
+	path = str(fontDir)
+	index = str(fontDir.join("index.db"))
+	main([index, "update", path])
+	main([index, "query", "--unicodes=U+2E3A"])
+	main([index, "query", "-u", "2026", "--family", "Test TTF"])
+	out, err = capsys.readouterr()
+	assert out.splitlines() == [
+		os.path.join(path, "TestVariable.ttf"),
+		os.path.join(path, "TestTTC.ttc#0"),
+		os.path.join(path, "TestTTC.ttc#1"),
+		os.path.join(path, "TestTTF.ttf"),
+	]
+
+
+def test_query_large_range(fontDir):
+	# a font mapping all of CJK Unified Ideographs Extension B, which
+	# spans more blocks than SQLite allows parameters or nested expressions
+	from fontTools.ttLib.tables._c_m_a_p import CmapSubtable
+	path = str(fontDir.join("TestExtB.ttf"))
+	font = TTFont(os.path.join(DATA_DIR, "TestTTF.ttf"))
+	extB = range(0x20000, 0x2A6E0)
+	subtable = CmapSubtable.newSubtable(12)
+	subtable.platformID, subtable.platEncID, subtable.language = 3, 10, 0
+	subtable.cmap = {u: "ellipsis" for u in extB}
+	font["cmap"].tables.append(subtable)
+	font.save(path)
+
+	with FontCatalog(str(fontDir.join("index.db"))) as catalog:
+		catalog.update([str(fontDir)])
+		assert catalog.query(unicodes=extB) == [(path, -1)]
+		assert catalog.query(unicodes=list(extB) + [0x2026]) == [(path, -1)]
+		assert catalog.query(unicodes=list(extB) + [0x2A6E0]) == []
+		assert len(catalog.query(unicodes=[0x2026])) == 6
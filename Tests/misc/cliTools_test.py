@@ -0,0 +1,64 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.misc.cliTools import runJobs, parseJobs, parseJobsOption
+import logging
+import sys
+import pytest
+
+
+def _job(i, fail=False):
+    print("out %d" % i)
+    sys.stderr.write("err %d\n" % i)
+    if fail == "exit":
+        sys.exit(2)
+    if fail:
+        raise ValueError(i)
+
+
+def test_runJobs_sequential(capsys):
+    assert runJobs(_job, [(0,), (1,)]) == [0, 0]
+    out, err = capsys.readouterr()
+    assert out == "out 0\nout 1\n"
+    with pytest.raises(ValueError):
+        runJobs(_job, [(0, True)], jobs=2)
+
+
+@pytest.fixture
+def stderrLogger():
+    # log to sys.stderr like the console scripts do, and nowhere else
+    logger = logging.getLogger("fontTools")
+    handlers, propagate = logger.handlers[:], logger.propagate
+    logger.handlers[:] = [logging.StreamHandler(sys.stderr)]
+    logger.propagate = False
+    yield logger
+    logger.handlers[:], logger.propagate = handlers, propagate
+
+
+def test_runJobs_parallel(capfd, stderrLogger):
+    argsList = [(0,), (1, True), (2, "exit"), (3,)]
+    assert runJobs(_job, argsList, jobs=2) == [0, 1, 2, 0]
+    out, err = capfd.readouterr()
+    assert out == "out 0\nout 1\nout 2\nout 3\n"
+    assert err.startswith("err 0\nerr 1\n")
+    assert "ValueError: 1\n" in err
+    assert err.endswith("\nerr 2\nerr 3\n")
+
+
+def test_parseJobs():
+    assert parseJobs("3") == 3
+    assert parseJobs(1) == 1
+    assert parseJobs(0) >= 1
+    for value in ("-1", "x"):
+        with pytest.raises(ValueError):
+            parseJobs(value)
+
+
+def test_parseJobsOption():
+    assert parseJobsOption(["a", "b=1"]) == (None, ["a", "b=1"])
+    assert parseJobsOption(["-j", "2", "a"]) == (2, ["a"])
+    assert parseJobsOption(["a", "-j3"]) == (3, ["a"])
+    assert parseJobsOption(["--jobs", "4", "a"]) == (4, ["a"])
+    assert parseJobsOption(["--jobs=5", "a"]) == (5, ["a"])
+    for args in (["a", "-j"], ["--jobs"], ["-jx"], ["--jobs=-1"]):
+        with pytest.raises(ValueError):
+            parseJobsOption(args)
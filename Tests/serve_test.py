@@ -0,0 +1,151 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont
+from fontTools import subset
+from fontTools.serve import FontServer, FontClient, FontServerError
+from fontTools.varLib.mutator import instantiateVariableFont
+import threading
+import socket
+import json
+import os
+import pytest
+
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"),
+	reason="Unix domain sockets not supported")
+
+DATA_DIR = os.path.dirname(__file__)
+
+
+def compileTTX(path, outPath):
+	font = TTFont(recalcBBoxes=False, recalcTimestamp=False)
+	font.importXML(path)
+	font.save(outPath)
+	return outPath
+
+
+@pytest.fixture
+def fontPath(tmpdir):
+	return compileTTX(
+		os.path.join(DATA_DIR, "subset", "data", "TestTTF-Regular.ttx"),
+		str(tmpdir.join("TestTTF-Regular.ttf")))
+
+
+@pytest.fixture
+def varFontPath(tmpdir):
+	return compileTTX(
+		os.path.join(DATA_DIR, "varLib", "data", "master_ttx_varfont_ttf",
+			"Mutator_IUP.ttx"),
+		str(tmpdir.join("Mutator_IUP.ttf")))
+
+
+@pytest.fixture
+def server(tmpdir):
+	server = FontServer(str(tmpdir.join("fonttools.sock")), workers=2,
+		cacheDir=str(tmpdir.join("cache")))
+	thread = threading.Thread(target=server.serve_forever)
+	thread.start()
+	yield server
+	server.shutdown()
+	server.server_close()
+	thread.join()
+
+
+@pytest.fixture
+def client(server):
+	with FontClient(server.server_address) as client:
+		yield client
+
+
+def subsetData(path, unicodes, args):
+	options = subset.Options()
+	options.parse_opts(args)
+	font = subset.load_font(path, options)
+	subsetter = subset.Subsetter(options)
+	subsetter.populate(unicodes=unicodes)
+	subsetter.subset(font)
+	buf = BytesIO()
+	subset.save_font(font, buf, options)
+	return buf.getvalue()
+
+
+def test_subset(server, client, fontPath):
+	client.ping()
+	args = ["--notdef-outline", "--no-recalc-timestamp"]
+	expected = subsetData(fontPath, [0x41, 0x42], args)
+	assert client.subset(fontPath, unicodes=[0x41, 0x42], options=args) == expected
+	# the same request again, and a different one, are served from the
+	# same prepared font
+	assert client.subset(fontPath, text="AB", options=args) == expected
+	assert client.subset(fontPath, unicodes="U+0043", options=args) == \
+		subsetData(fontPath, [0x43], args)
+	assert len(server.getFont(fontPath).subsetters) == 1
+	assert len(os.listdir(server.cache.cache_dir)) == 2
+
+
+def test_subset_parallel(server, fontPath):
+	args = ["--flavor=woff", "--no-recalc-timestamp"]
+	requests = [[u] for u in range(0x20, 0x40)]
+	results = {}
+
+	def run(unicodes):
+		with FontClient(server.server_address) as client:
+			results[unicodes[0]] = client.subset(fontPath, unicodes=unicodes,
+				options=args)
+
+	threads = [threading.Thread(target=run, args=(unicodes,))
+		for unicodes in requests]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	for unicodes in requests:
+		assert results[unicodes[0]] == subsetData(fontPath, unicodes, args)
+
+
+def test_subset_changed_font(server, client, fontPath, tmpdir):
+	client.subset(fontPath, text="A")
+	font = TTFont(fontPath)
+	font["head"].unitsPerEm = 2000
+	font.save(fontPath)
+	os.utime(fontPath, (0, 0))
+	data = client.subset(fontPath, text="A")
+	assert TTFont(BytesIO(data))["head"].unitsPerEm == 2000
+
+
+def test_convert(client, fontPath):
+	for flavor in ("woff", "woff2", None):
+		font = TTFont(BytesIO(client.convert(fontPath, flavor)))
+		assert font.flavor == flavor
+		assert font.getGlyphOrder() == TTFont(fontPath).getGlyphOrder()
+
+
+def test_instance(client, varFontPath):
+	data = client.instance(varFontPath, {"wdth": 80, "ASCN": 628})
+	font = TTFont(BytesIO(data))
+	assert "fvar" not in font
+	expected = instantiateVariableFont(TTFont(varFontPath),
+		{"wdth": 80, "ASCN": 628})
+	glyf, expectedGlyf = font["glyf"], expected["glyf"]
+	for glyphName in expected.getGlyphOrder():
+		assert glyf[glyphName].getCoordinates(glyf)[0] == \
+			expectedGlyf[glyphName].getCoordinates(expectedGlyf)[0]
+
+
+def test_errors(client, fontPath, tmpdir):
+	with pytest.raises(FontServerError) as e:
+		client.request({"command": "nothing"})
+	assert "unknown command" in str(e.value)
+	with pytest.raises(FontServerError):
+		client.subset(str(tmpdir.join("missing.ttf")), text="A")
+	with pytest.raises(FontServerError) as e:
+		client.subset(fontPath, text="A", options=["--no-such-option"])
+	assert "UnknownOptionError" in str(e.value)
+	with pytest.raises(FontServerError):
+		client.convert(fontPath, "svg")
+	# the connection still works
+	client.ping()
+	client.socket.sendall(b"not json\n")
+	response = json.loads(client._file.readline().decode("utf-8"))
+	assert response["status"] == "error"
+	client.ping()
@@ -0,0 +1,58 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+import fontTools
+import subprocess
+import json
+import os
+import sys
+import pytest
+
+
+# generous, so that only gross regressions fail on slow machines; the
+# modules imported are checked exactly below
+IMPORT_TIME_BUDGET = 1.0
+
+# modules that are slow to import or set up, and that none of the command
+# line tools should need until they actually read or write a font
+NEVER_AT_STARTUP = [
+	"decimal",
+	"fontTools.agl",
+	"fontTools.ttLib.tables.otConverters",
+]
+
+SCRIPT = """\
+import sys, time, json
+start = time.time()
+import %s
+elapsed = time.time() - start
+print(json.dumps({"time": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def importInSubprocess(module):
+	env = dict(os.environ)
+	env["PYTHONPATH"] = os.path.dirname(os.path.dirname(
+		os.path.abspath(fontTools.__file__)))
+	output = subprocess.check_output(
+		[sys.executable, "-W", "ignore", "-c", SCRIPT % module], env=env)
+	return json.loads(output.decode("ascii"))
+
+
+@pytest.mark.parametrize("module", [
+	"fontTools.ttx",
+	"fontTools.subset",
+	"fontTools.merge",
+	"fontTools.varLib",
+	"fontTools.varLib.mutator",
+	"fontTools.serve",
+])
+def test_import_budget(module):
+	result = importInSubprocess(module)
+	assert result["time"] < IMPORT_TIME_BUDGET
+	for name in NEVER_AT_STARTUP:
+		assert name not in result["modules"]
+
+
+def test_ttx_imports_no_table_modules():
+	modules = importInSubprocess("fontTools.ttx")["modules"]
+	assert not [m for m in modules if m.startswith("fontTools.ttLib.tables")]
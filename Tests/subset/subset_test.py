@@ -2,7 +2,11 @@ from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
 from fontTools import subset
 from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables import otTables
+from fontTools.ttLib.tables._h_m_t_x import CompactMetrics
+from fontTools.otlLib.builder import buildLookup, buildSingleSubstSubtable
 from fontTools.misc.loggingTools import CapturingLogHandler
+import array
 import difflib
 import logging
 import os
@@ -207,6 +211,23 @@ class SubsetTest(unittest.TestCase):
         subsetfont = TTFont(subsetpath)
         self.expect_ttx(subsetfont, self.getpath("expect_keep_gvar_notdef_outline.ttx"), ["GlyphOrder", "avar", "fvar", "gvar", "name"])
 
+    def test_subset_gvar_undecoded(self):
+        _, fontpath = self.compile_font(self.getpath("TestGVAR.ttx"), ".ttf")
+        options = subset.Options()
+        options.notdef_outline = True
+        font = subset.load_font(fontpath, options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=[0x002B, 0x2212])
+        subsetter.subset(font)
+        # the variations of the kept glyphs are copied without decoding
+        self.assertEqual(font["gvar"].variations._variations, {})
+        subsetpath = self.temp_path(".ttf")
+        subset.save_font(font, subsetpath, options)
+        variations = TTFont(subsetpath, lazy=False)["gvar"].variations
+        expected = TTFont(fontpath, lazy=False)["gvar"].variations
+        self.assertEqual(variations, {g: expected[g] for g in variations})
+        self.assertEqual(len(variations), 3)
+
     def test_subset_lcar_remove(self):
         _, fontpath = self.compile_font(self.getpath("TestLCAR-0.ttx"), ".ttf")
         subsetpath = self.temp_path(".ttf")
@@ -478,5 +499,289 @@ class SubsetTest(unittest.TestCase):
         self.assertLess(modified, TTFont(subsetpath)['head'].modified)
 
 
+    def make_gsub_font(self, lookups, feature_lookups):
+        font, _ = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        gsub = otTables.GSUB()
+        gsub.Version = 0x00010000
+        langSys = otTables.DefaultLangSys()
+        langSys.LookupOrder = None
+        langSys.ReqFeatureIndex = 0xFFFF
+        langSys.FeatureIndex = [0]
+        langSys.FeatureCount = 1
+        script = otTables.Script()
+        script.DefaultLangSys = langSys
+        script.LangSysRecord = []
+        script.LangSysCount = 0
+        scriptRecord = otTables.ScriptRecord()
+        scriptRecord.ScriptTag = "DFLT"
+        scriptRecord.Script = script
+        gsub.ScriptList = otTables.ScriptList()
+        gsub.ScriptList.ScriptRecord = [scriptRecord]
+        gsub.ScriptList.ScriptCount = 1
+        feature = otTables.Feature()
+        feature.FeatureParams = None
+        feature.LookupListIndex = feature_lookups
+        feature.LookupCount = len(feature_lookups)
+        featureRecord = otTables.FeatureRecord()
+        featureRecord.FeatureTag = "ccmp"
+        featureRecord.Feature = feature
+        gsub.FeatureList = otTables.FeatureList()
+        gsub.FeatureList.FeatureRecord = [featureRecord]
+        gsub.FeatureList.FeatureCount = 1
+        gsub.LookupList = otTables.LookupList()
+        gsub.LookupList.Lookup = lookups
+        gsub.LookupList.LookupCount = len(lookups)
+        font["GSUB"] = newTable("GSUB")
+        font["GSUB"].table = gsub
+        path = self.temp_path(".ttf")
+        font.save(path)
+        return path
+
+    def check_gsub_closure(self, fontpath, unicodes, expected):
+        options = subset.Options()
+        font = subset.load_font(fontpath, options)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=unicodes)
+        subsetter.subset(font)
+        self.assertEqual(font.getGlyphOrder(), expected)
+        prepared = subset.PreparedSubsetter(
+            subset.load_font(fontpath, options), options)
+        self.assertEqual(
+            prepared.subset(unicodes=unicodes).getGlyphOrder(), expected)
+
+    def test_gsub_closure_chained_lookups(self):
+        # lookup 0 only applies to the glyph that lookup 1 adds
+        fontpath = self.make_gsub_font([
+            buildLookup([buildSingleSubstSubtable({"B": "C"})]),
+            buildLookup([buildSingleSubstSubtable({"A": "B"})]),
+        ], [0, 1])
+        self.check_gsub_closure(fontpath, [0x41], [".notdef", "A", "B", "C"])
+        self.check_gsub_closure(fontpath, [0x43], [".notdef", "C"])
+
+    def test_gsub_closure_class0_context(self):
+        # lookup 0 substitutes "A" followed by a class 0 glyph, that is not
+        # ".notdef" or "A"; that's "B", added by lookup 1
+        classDef = otTables.ClassDef()
+        classDef.classDefs = {".notdef": 2, "A": 1}
+        record = otTables.SubstLookupRecord()
+        record.SequenceIndex = 0
+        record.LookupListIndex = 2
+        rule = otTables.SubClassRule()
+        rule.Class = [0]
+        rule.GlyphCount = 2
+        rule.SubstLookupRecord = [record]
+        rule.SubstCount = 1
+        classSet = otTables.SubClassSet()
+        classSet.SubClassRule = [rule]
+        classSet.SubClassRuleCount = 1
+        context = otTables.ContextSubst()
+        context.Format = 2
+        context.Coverage = otTables.Coverage()
+        context.Coverage.glyphs = ["A"]
+        context.ClassDef = classDef
+        context.SubClassSet = [None, classSet]
+        context.SubClassSetCount = 2
+        contextLookup = buildLookup([context])
+        contextLookup.LookupType = 5
+        self.assertTrue(contextLookup.may_match_any_glyph())
+        fontpath = self.make_gsub_font([
+            contextLookup,
+            buildLookup([buildSingleSubstSubtable({"A": "B"})]),
+            buildLookup([buildSingleSubstSubtable({"A": "C"})]),
+        ], [0, 1])
+        self.check_gsub_closure(fontpath, [0x41], [".notdef", "A", "B", "C"])
+
+    def test_closure_keeps_tables_clean(self):
+        _, fontpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        font = TTFont(fontpath, lazy=True)
+        subsetter = subset.Subsetter()
+        subsetter.populate(text="e")
+        subsetter._closure_glyphs(font)
+        self.assertTrue(font.isLoaded("cmap"))
+        self.assertFalse(any(font.isDirty(tag) for tag in font.keys()))
+
+    def test_subset_keeps_compact_metrics(self):
+        _, fontpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        font = TTFont(fontpath)
+        widths = {g: font["hmtx"][g] for g in font.getGlyphOrder()}
+        subsetter = subset.Subsetter()
+        subsetter.populate(text="e")
+        subsetter.subset(font)
+        hmtx = font["hmtx"]
+        glyphOrder = font.getGlyphOrder()
+        self.assertIsInstance(hmtx.metrics, CompactMetrics)
+        self.assertIsInstance(hmtx.getAdvances(glyphOrder), array.array)
+        self.assertTrue(hmtx._isCompact(glyphOrder))
+        self.assertEqual({g: hmtx[g] for g in glyphOrder},
+                         {g: widths[g] for g in glyphOrder})
+
+
+    def test_prepared_subsetter(self):
+        _, fontpath = self.compile_font(self.getpath("TestMATH-Regular.ttx"), ".ttf")
+        options = subset.Options()
+        prepared = subset.PreparedSubsetter(
+            subset.load_font(fontpath, options), options)
+        unicodes = [0x41, 0x28, 0x302, 0x1D400, 0x1D435]
+        # an unrelated request first, to check requests don't share state
+        prepared.subset(unicodes=[0x42])
+        subsetpath = self.temp_path(".ttf")
+        subset.save_font(prepared.subset(unicodes=unicodes), subsetpath, options)
+        subsetfont = TTFont(subsetpath)
+        self.expect_ttx(subsetfont, self.getpath("expect_keep_math.ttx"), ["GlyphOrder", "CFF ", "MATH", "hmtx"])
+
+    def test_prepared_subsetter_glyf(self):
+        _, fontpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        options = subset.Options()
+        options.notdef_outline = True
+        prepared = subset.PreparedSubsetter(
+            subset.load_font(fontpath, options), options)
+        for text in ("e", "ee...", ""):
+            font = subset.load_font(fontpath, options)
+            subsetter = subset.Subsetter(options)
+            subsetter.populate(text=text)
+            subsetter.subset(font)
+            expected, actual = BytesIO(), BytesIO()
+            subset.save_font(font, expected, options)
+            subset.save_font(prepared.subset(text=text), actual, options)
+            self.assertEqual(expected.getvalue(), actual.getvalue())
+
+    def test_subset_glyf_raw(self):
+        fontpath = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                                "ttx", "data", "TestTTF.ttf")
+        for hinting in (True, False):
+            options = subset.Options()
+            options.notdef_outline = True
+            options.hinting = hinting
+            options.glyph_names = True
+            dumps = []
+            for lazy in (True, False):
+                font = TTFont(fontpath, lazy=lazy)
+                subsetter = subset.Subsetter(options)
+                subsetter.populate(unicodes=[0x2026])
+                subsetter.subset(font)
+                if lazy:
+                    # glyphs were copied as bytes, without Glyph objects
+                    self.assertEqual(font['glyf'].glyphs.loadedGlyphs(), [])
+                buf = BytesIO()
+                font.save(buf)
+                buf.seek(0)
+                font = TTFont(buf)
+                self.assertEqual(font.getGlyphOrder(),
+                                 [".notdef", "period", "ellipsis"])
+                dump = StringIO()
+                font.saveXML(dump, tables=["glyf"])
+                # expanded composites keep an empty program when unhinted
+                dumps.append([line for line in dump.getvalue().splitlines()
+                              if line.strip() != "<instructions/>"])
+            self.assertEqual(dumps[0], dumps[1])
+            self.assertEqual("<assembly>" in "".join(dumps[0]), hinting)
+
+    def test_subset_batch(self):
+        _, fontpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        batchpath = self.temp_path(".txt")
+        with open(batchpath, "w") as f:
+            f.write("# name unicodes\n"
+                    "a U+0041\n"
+                    "\n"
+                    "bc U+0042-0043  # B and C\n")
+        self.assertEqual(subset.parse_batch_file(batchpath),
+                         {"a": [0x41], "bc": [0x42, 0x43]})
+        outpath = os.path.join(self.tempdir, "out-{name}.ttf")
+        subset.main([fontpath, "--text=C", "--notdef-outline",
+                     "--batch-file=%s" % batchpath,
+                     "--output-file=%s" % outpath])
+        for name, unicodes in (("a", "41,43"), ("bc", "42,43")):
+            expectedpath = self.temp_path(".ttf")
+            subset.main([fontpath, "--unicodes=%s" % unicodes,
+                         "--notdef-outline",
+                         "--output-file=%s" % expectedpath])
+            with open(expectedpath, "rb") as expected, \
+                    open(outpath.replace("{name}", name), "rb") as actual:
+                self.assertEqual(expected.read(), actual.read())
+
+    def test_subset_batch_jobs(self):
+        _, fontpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        slices = {"a": [0x41], "b": [0x42], "c": [0x43]}
+        options = subset.Options()
+        self.assertEqual(
+            subset.subset_batch(fontpath, slices, options, jobs=2),
+            subset.subset_batch(fontpath, slices, options))
+
+    def test_subset_main_jobs(self):
+        _, fontpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        fontpaths = [fontpath]
+        for i in range(2):
+            fontpaths.append(self.temp_path(".ttf"))
+            shutil.copy(fontpath, fontpaths[-1])
+        self.assertEqual(subset.main(["-j", "2"] + fontpaths + ["--text=AB"]), 0)
+        for path in fontpaths:
+            subsetpath = os.path.splitext(path)[0] + ".subset.ttf"
+            self.assertEqual(len(TTFont(subsetpath).getGlyphOrder()), 3)
+
+        missing = self.temp_path(".ttf")
+        with open(missing, "wb") as f:
+            f.write(b"junk")
+        self.assertEqual(subset.main(["-j2", fontpath, missing, "--text=A"]), 1)
+        self.assertEqual(subset.main(fontpaths + ["--text=A",
+                         "--output-file=%s" % self.temp_path(".ttf")]), 2)
+        self.assertEqual(subset.main(fontpaths + ["--text=A", "-j"]), 2)
+        self.assertEqual(subset.main(fontpaths + ["--jobs=x"]), 2)
+
+    def test_subset_cache(self):
+        _, fontpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        cachedir = self.temp_path("")
+        subsetpath = self.temp_path(".ttf")
+        args = [fontpath, "--text=AB", "--cache-dir=%s" % cachedir,
+                "--output-file=%s" % subsetpath]
+        subset.main(args)
+        with open(subsetpath, "rb") as f:
+            expected = f.read()
+        self.assertEqual(len(os.listdir(cachedir)), 1)
+        os.remove(subsetpath)
+
+        # the same request, with unicodes instead of text, doesn't load
+        # the font
+        load_font = subset.load_font
+        def fail(*args, **kwargs):
+            raise AssertionError("font loaded")
+        subset.load_font = fail
+        try:
+            subset.main([fontpath, "--unicodes=42,41",
+                         "--cache-dir=%s" % cachedir,
+                         "--output-file=%s" % subsetpath])
+        finally:
+            subset.load_font = load_font
+        with open(subsetpath, "rb") as f:
+            self.assertEqual(f.read(), expected)
+
+        # other options make another entry
+        cache = subset.SubsetCache(cachedir)
+        options = subset.Options(hinting=False)
+        data = cache.subset(fontpath, options, text="AB")
+        self.assertNotEqual(data, expected)
+        self.assertEqual(len(os.listdir(cachedir)), 2)
+        self.assertEqual(cache.subset(fontpath, options, text="AB"), data)
+
+    def test_subset_cache_prune(self):
+        _, fontpath = self.compile_font(self.getpath("TestTTF-Regular.ttx"), ".ttf")
+        cachedir = self.temp_path("")
+        cache = subset.SubsetCache(cachedir)
+        options = subset.Options()
+        keys = [cache.make_key(b"font", options, unicodes=[u])
+                for u in range(3)]
+        self.assertEqual(len(set(keys)), 3)
+        self.assertEqual(cache.make_key(b"font", options, text="\0"),
+                         keys[0])
+        for i, key in enumerate(keys):
+            cache.put(key, b"x" * 10)
+            os.utime(cache._path(key), (i, i))
+        cache.get(keys[0])  # now the most recently used
+        cache.max_size = 20
+        cache.prune()
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[0]), b"x" * 10)
+        self.assertEqual(cache.get(keys[2]), b"x" * 10)
+
+
 if __name__ == "__main__":
     sys.exit(unittest.main())
@@ -0,0 +1,82 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.fontPool import FontPool, estimateSize
+import os
+
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "ttx", "data")
+TTF_PATH = os.path.join(DATA_DIR, "TestTTF.ttf")
+OTF_PATH = os.path.join(DATA_DIR, "TestOTF.otf")
+
+
+def test_estimateSize():
+    small = estimateSize([1, 2])
+    assert estimateSize([[1, 2], [1, 2]]) > small
+    # shared objects are counted once
+    items = [1, 2]
+    assert estimateSize([items, items]) < estimateSize([[1, 2], [3, 4]])
+
+
+def test_get():
+    pool = FontPool()
+    font = pool.get(TTF_PATH)
+    assert TTF_PATH in pool
+    assert pool.get(TTF_PATH) is font
+    assert pool.get(OTF_PATH) is not font
+    assert len(pool) == 2
+    pool.close()
+    assert len(pool) == 0
+
+
+def test_trim_unloads_clean_tables():
+    pool = FontPool()
+    font = pool.get(TTF_PATH)
+    font.getTableReadOnly('name')
+    font['cmap']
+    usage = pool.getMemoryUsage()
+    assert usage > 0
+
+    pool.maxBytes = 1
+    assert pool.get(TTF_PATH) is font
+    assert not font.isLoaded('name')
+    # dirty tables stay
+    assert font.isLoaded('cmap')
+    assert 0 < pool.getMemoryUsage() < usage
+    pool.close()
+
+
+def test_trim_drops_least_recently_used():
+    pool = FontPool()
+    ttf = pool.get(TTF_PATH)
+    ttf['name']
+    otf = pool.get(OTF_PATH)
+    otf['name']
+    pool.maxBytes = pool.getMemoryUsage() - 1
+    assert pool.get(OTF_PATH) is otf
+    assert OTF_PATH in pool
+    assert TTF_PATH not in pool
+    # dropped fonts can still be used by whoever holds them
+    assert ttf.getTableReadOnly('cmap').getcmap(3, 1).cmap == \
+        TTFont(TTF_PATH)['cmap'].getcmap(3, 1).cmap
+    # the font just asked for is kept, even if over budget
+    pool.maxBytes = 0
+    assert pool.get(TTF_PATH) is not ttf
+    assert OTF_PATH not in pool
+    assert len(pool) == 1
+    pool.close()
+
+
+def test_remeasure_used_fonts():
+    pool = FontPool()
+    font = pool.get(TTF_PATH)
+    glyf = font.getTableReadOnly('glyf')
+    usage = pool.getMemoryUsage()
+    # expanding the glyphs makes the table grow
+    for glyphName in font.getGlyphOrder():
+        glyf[glyphName].expand(glyf)
+    assert pool.getMemoryUsage() == usage
+    pool.get(TTF_PATH)
+    assert pool.getMemoryUsage() > usage
+    pool.close()
@@ -0,0 +1,77 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.profiler import TableProfiler, tracemalloc
+import os
+import json
+import pytest
+
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "ttx", "data")
+TTF_PATH = os.path.join(DATA_DIR, "TestTTF.ttf")
+
+
+def test_decompile_and_compile_events():
+    font = TTFont(TTF_PATH)
+    events = []
+    with TableProfiler(font, callback=events.append) as profiler:
+        assert font.profiler is profiler
+        font['name']
+        font.getTableReadOnly('post')
+        font.save(BytesIO())
+    assert font.profiler is None
+    assert events == profiler.events
+
+    decompiled = [e["tag"] for e in events if e["operation"] == "decompile"]
+    assert "name" in decompiled
+    assert "post" in decompiled
+    compiled = [e["tag"] for e in events if e["operation"] == "compile"]
+    assert "name" in compiled
+    # clean tables are copied, not compiled
+    assert "post" not in compiled
+
+    name = [e for e in events if e["tag"] == "name"]
+    assert name[0]["bytesIn"] == len(font.reader["name"])
+    assert name[0]["bytesOut"] is None
+    assert name[1]["bytesOut"] > 0
+    assert all(e["time"] >= 0 and e["error"] is None for e in events)
+    assert all(e["memory"] is None for e in events)
+
+
+def test_error_event():
+    font = TTFont(TTF_PATH)
+    font.profiler = profiler = TableProfiler()
+    font['name'].compile = None
+    with pytest.raises(TypeError):
+        font.getTableData('name')
+    assert profiler.events[-1]["operation"] == "compile"
+    assert profiler.events[-1]["error"] == "TypeError"
+
+
+@pytest.mark.skipif(tracemalloc is None, reason="tracemalloc not available")
+def test_traceMemory():
+    font = TTFont(TTF_PATH)
+    with TableProfiler([font], traceMemory=True) as profiler:
+        font['glyf']
+    assert not tracemalloc.is_tracing()
+    assert all(e["memory"] is not None for e in profiler.events)
+
+
+def test_json(tmpdir):
+    font = TTFont(TTF_PATH)
+    with TableProfiler(font) as profiler:
+        font['cmap']
+        font['cmap'].compile(font)
+        font.getTableData('cmap')
+    data = json.loads(profiler.toJSON())
+    assert len(data["events"]) == len(profiler.events)
+    summary = {(s["operation"], s["tag"]): s for s in data["summary"]}
+    assert summary["decompile", "cmap"]["count"] == 1
+    assert summary["compile", "cmap"]["count"] == 1
+    assert summary["compile", "cmap"]["bytesOut"] > 0
+
+    path = str(tmpdir.join("profile.json"))
+    profiler.saveJSON(path)
+    with open(path) as f:
+        assert json.load(f) == data
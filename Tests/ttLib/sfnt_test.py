@@ -1,8 +1,70 @@
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
-from fontTools.ttLib.sfnt import calcChecksum
+from fontTools.ttLib import TTFont, TTLibError
+from fontTools.ttLib.sfnt import SFNTReader, MappedFile, calcChecksum
+import os
+import pytest
 
 
 def test_calcChecksum():
     assert calcChecksum(b"abcd") == 1633837924
     assert calcChecksum(b"abcdxyz") == 3655064932
+
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "ttx", "data")
+
+
+def test_SFNTReader_mmap():
+    path = os.path.join(DATA_DIR, "TestTTF.ttf")
+    with open(path, "rb") as f:
+        reader = SFNTReader(f)
+        expected = {tag: reader[tag] for tag in reader.keys()}
+    with open(path, "rb") as f:
+        reader = SFNTReader(f, checkChecksums=2, mmap=True)
+    try:
+        assert isinstance(reader.file, MappedFile)
+        for tag in reader.keys():
+            data = reader[tag]
+            if not isinstance(data, bytes):
+                assert isinstance(data, memoryview)
+                assert data.readonly
+            assert data == expected[tag]
+    finally:
+        reader.close()
+
+
+def test_TTFont_mmap(tmpdir):
+    path = os.path.join(DATA_DIR, "TestTTF.ttf")
+    expected = BytesIO()
+    TTFont(path).save(expected)
+
+    font = TTFont(path, mmap=True)
+    assert font['head'].unitsPerEm == 1000
+    assert font['maxp'].numGlyphs == TTFont(path)['maxp'].numGlyphs
+    output = BytesIO()
+    font.save(output)
+    assert output.getvalue() == expected.getvalue()
+    with pytest.raises(TTLibError):
+        font.save(path)
+    font.close()
+
+    copyPath = str(tmpdir / "TestTTF.ttf")
+    with open(copyPath, "wb") as f:
+        f.write(expected.getvalue())
+    with open(copyPath, "rb") as f:
+        font = TTFont(f, mmap=True, lazy=True)
+        assert font['name'].getName(1, 3, 1).toUnicode() == "Test TTF"
+        font.close()
+
+
+def test_MappedFile_requires_fileno():
+    with pytest.raises(TTLibError):
+        MappedFile(BytesIO(b"\0\1\0\0"))
+
+
+def test_getFileLock():
+    from fontTools.ttLib.sfnt import _getFileLock
+    f1, f2 = BytesIO(), BytesIO()
+    assert _getFileLock(f1) is _getFileLock(f1)
+    assert _getFileLock(f1) is not _getFileLock(f2)
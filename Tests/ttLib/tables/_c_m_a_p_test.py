@@ -1,6 +1,7 @@
 from __future__ import print_function, division, absolute_import, unicode_literals
 from fontTools.misc.py23 import *
 from fontTools import ttLib
+from fontTools.misc.textTools import deHexStr
 import unittest
 from fontTools.ttLib.tables._c_m_a_p import CmapSubtable, table__c_m_a_p
 
@@ -49,6 +50,62 @@ class CmapSubtableTest(unittest.TestCase):
 		font.setGlyphOrder([])
 		subtable.decompile(b'\0' * 7 + b'\x10' + b'\0' * 8, font)
 
+	def test_compile_decompile_4(self):
+		font = ttLib.TTFont()
+		font.setGlyphOrder(['.notdef'] + ['glyph%d' % i for i in range(1, 30)])
+		cmap = {0x20: 'glyph1', 0x21: 'glyph2', 0x22: 'glyph3', 0x23: 'glyph4',
+				0x24: 'glyph5', 0x25: 'glyph6', 0x26: 'glyph9', 0x27: 'glyph7',
+				0x41: 'glyph20', 0xFFF0: 'glyph21', 0xFFF1: 'glyph22'}
+		subtable = self.makeSubtable(4, 3, 1, 0)
+		subtable.cmap = cmap
+		data = subtable.compile(font)
+
+		subtable = CmapSubtable.newSubtable(4)
+		subtable.decompile(data, font)
+		self.assertEqual(subtable.cmap, cmap)
+		# 0x20-0x25 is stored as a single segment with consecutive glyph IDs
+		self.assertEqual(subtable.compile(font), data)
+
+	def test_decompile_4_idDelta_wraps(self):
+		font = ttLib.TTFont()
+		font.setGlyphOrder(['.notdef', 'a', 'b', 'c'])
+		# segment 0xFFFE-0x10000 + 3 wraps around to glyph IDs 1 and 2;
+		# the closing segment maps 0xFFFF to glyph 0
+		data = deHexStr(
+			"0004 0020 0000"  # format, length, language
+			"0004 0004 0001 0000"  # segCountX2, searchRange, entrySelector, rangeShift
+			"FFFD FFFF"  # endCode
+			"0000"  # reservedPad
+			"FFFC FFFF"  # startCode
+			"0005 0001"  # idDelta
+			"0000 0000")  # idRangeOffset
+		subtable = CmapSubtable.newSubtable(4)
+		subtable.decompile(data, font)
+		self.assertEqual(subtable.cmap, {0xFFFC: 'a', 0xFFFD: 'b'})
+
+	def test_compile_decompile_12_and_13(self):
+		font = ttLib.TTFont()
+		font.setGlyphOrder(['.notdef'] + ['glyph%d' % i for i in range(1, 10)])
+		cmap = {0x41: 'glyph1', 0x42: 'glyph2', 0x43: 'glyph2',
+				0x10000: 'glyph3', 0x10001: 'glyph3', 0x10002: 'glyph4'}
+		for cmapFormat, nGroups in ((12, 4), (13, 4)):
+			subtable = self.makeSubtable(cmapFormat, 3, 10, 0)
+			subtable.cmap = cmap
+			data = subtable.compile(font)
+
+			subtable = CmapSubtable.newSubtable(cmapFormat)
+			subtable.decompile(data, font)
+			self.assertEqual(subtable.nGroups, nGroups)
+			self.assertEqual(subtable.cmap, cmap)
+
+	def test_decompile_glyph_index_out_of_range(self):
+		font = ttLib.TTFont()
+		font.setGlyphOrder(['.notdef', 'a'])
+		data = deHexStr("000C 0000 0000001C 00000000 00000001 00000041 00000042 00000001")
+		subtable = CmapSubtable.newSubtable(12)
+		subtable.decompile(data, font)
+		self.assertEqual(subtable.cmap, {0x41: 'a', 0x42: 'glyph00002'})
+
 	def test_buildReversed(self):
 		c4 = self.makeSubtable(4, 3, 1, 0)
 		c4.cmap = {0x0041:'A', 0x0391:'A'}
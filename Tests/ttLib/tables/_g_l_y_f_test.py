@@ -1,6 +1,10 @@
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
-from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import (
+    Glyph, GlyphCoordinates, _LazyGlyphDict, remapComponentData,
+    trimGlyphData)
+import os
 import sys
 import pytest
 
@@ -150,3 +154,129 @@ class GlyphCoordinatesTest(object):
         # since the Python float is truncated to a C float.
         # when using typecode 'd' it should return the correct value 243
         assert g[0][0] == round(afloat)
+
+
+TTF_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    "ttx", "data", "TestTTF.ttf")
+
+
+class LazyGlyphDictTest(object):
+
+    def test_decompile_lazy(self):
+        font = TTFont(TTF_PATH)
+        glyf = font['glyf']
+        glyphs = glyf.glyphs
+        assert isinstance(glyphs, _LazyGlyphDict)
+        assert list(glyphs.keys()) == font.getGlyphOrder()
+        assert len(glyf) == len(font.getGlyphOrder())
+        assert not glyphs._glyphs
+        assert "period" in glyf
+        assert "foobar" not in glyf
+        period = glyf["period"]
+        assert list(glyphs._glyphs) == ["period"]
+        assert glyphs["period"] is period
+        assert period.numberOfContours > 0
+
+    def test_decompile_not_lazy(self):
+        font = TTFont(TTF_PATH, lazy=False)
+        glyphs = font['glyf'].glyphs
+        assert type(glyphs) is dict
+        assert list(glyphs.keys()) == font.getGlyphOrder()
+        assert all(not hasattr(g, "data") for g in glyphs.values())
+
+    def test_compile_same_as_not_lazy(self):
+        expected = TTFont(TTF_PATH, lazy=False)['glyf'].compile(
+            TTFont(TTF_PATH, lazy=False))
+        font = TTFont(TTF_PATH)
+        assert font['glyf'].compile(font) == expected
+
+    def test_setitem_delitem(self):
+        font = TTFont(TTF_PATH)
+        glyf = font['glyf']
+        glyphs = glyf.glyphs
+        numGlyphs = len(glyphs)
+        glyf["newGlyph"] = Glyph()
+        assert len(glyphs) == numGlyphs + 1
+        assert list(glyphs)[-1] == "newGlyph"
+        assert glyf["newGlyph"].numberOfContours == 0
+        del glyf["space"]
+        assert "space" not in glyphs
+        assert len(glyphs) == numGlyphs
+        # the original offsets of the remaining glyphs are unaffected
+        expected = TTFont(TTF_PATH)['glyf'].glyphs
+        assert glyphs["ellipsis"].data == expected["ellipsis"].data
+        with pytest.raises(KeyError):
+            glyphs["space"]
+
+    def test_delitem_many(self):
+        font = TTFont(TTF_PATH)
+        glyphs = font['glyf'].glyphs
+        glyphOrder = font.getGlyphOrder()
+        deleted = glyphOrder[1::2]
+        for glyphName in deleted:
+            del glyphs[glyphName]
+        assert len(glyphs) == len(glyphOrder) - len(deleted)
+        assert list(glyphs) == glyphOrder[0::2]
+        # a deleted glyph added again goes at the end
+        glyphs[deleted[0]] = Glyph()
+        del glyphs[glyphOrder[0]]
+        assert list(glyphs) == glyphOrder[2::2] + [deleted[0]]
+        expected = TTFont(TTF_PATH)['glyf'].glyphs
+        for glyphName in glyphOrder[2::2]:
+            assert glyphs.getRawData(glyphName) == \
+                expected.getRawData(glyphName)
+
+    def test_copyGlyphs(self):
+        font = TTFont(TTF_PATH)
+        glyphs = font['glyf'].glyphs
+        period = glyphs["period"]
+        copy = glyphs.copyGlyphs(["space", "period", "ellipsis"],
+                                 lambda data: data + b"\0")
+        assert list(copy) == ["space", "period", "ellipsis"]
+        # loaded glyphs are shared, the others copied without a Glyph
+        assert copy.loadedGlyphs() == [period]
+        assert copy.getRawData("period") is None
+        assert copy.getRawData("space") == b"\0"
+        data = copy.getRawData("ellipsis")
+        assert data == glyphs.getRawData("ellipsis") + b"\0"
+        assert copy["ellipsis"].data == data
+        assert "ellipsis" not in glyphs._glyphs
+
+
+class RawGlyphDataTest(object):
+
+    def test_remapComponentData(self):
+        font = TTFont(TTF_PATH)
+        glyf = font['glyf']
+        data = glyf.glyphs.getRawData("ellipsis")
+        periodID = font.getGlyphID("period")
+        data = remapComponentData(data, {periodID: 2})
+        glyph = Glyph(data)
+        glyph.expand(glyf)
+        assert [c.glyphName for c in glyph.components] == ["CR"] * 3
+        # data of simple glyphs isn't touched
+        data = glyf.glyphs.getRawData("period")
+        assert remapComponentData(data, {}) is data
+
+    @pytest.mark.parametrize("glyphName", ["period", "ellipsis"])
+    def test_trimGlyphData(self, glyphName):
+        font = TTFont(TTF_PATH)
+        glyf = font['glyf']
+        data = glyf.glyphs.getRawData(glyphName)
+        expected = TTFont(TTF_PATH)['glyf'][glyphName]
+        assert expected.program.getBytecode()
+
+        # padding is removed
+        assert trimGlyphData(data + b"\0\0\0") == trimGlyphData(data)
+
+        glyph = Glyph(trimGlyphData(data, removeHinting=True))
+        glyph.expand(glyf)
+        if glyph.isComposite():
+            assert not hasattr(glyph, "program")
+            assert glyph.components == expected.components
+        else:
+            assert not glyph.program.getBytecode()
+            assert glyph.coordinates == expected.coordinates
+            assert glyph.flags == expected.flags
+        assert trimGlyphData(b"") == b""
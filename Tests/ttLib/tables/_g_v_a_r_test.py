@@ -5,6 +5,7 @@ from fontTools.misc.textTools import deHexStr, hexStr
 from fontTools.ttLib import TTLibError, getTableClass, getTableModule, newTable
 import unittest
 from fontTools.ttLib.tables.TupleVariation import TupleVariation
+from fontTools.ttLib.tables._g_v_a_r import _LazyVariationDict
 
 
 gvarClass = getTableClass("gvar")
@@ -173,6 +174,42 @@ class GVARTableTest(unittest.TestCase):
 		self.assertEqual(gvar.variations,
 		                 {".notdef": [], "space": [], "I": []})
 
+	def test_decompile_lazy(self):
+		font, gvar = self.makeFont({})
+		font.lazy = True
+		gvar.decompile(GVAR_DATA, font)
+		variations = gvar.variations
+		self.assertIsInstance(variations, _LazyVariationDict)
+		self.assertEqual(sorted(variations.keys()), [".notdef", "I", "space"])
+		self.assertEqual(variations._variations, {})
+		self.assertEqual(variations["I"], GVAR_VARIATIONS["I"])
+		self.assertEqual(list(variations._variations), ["I"])
+		self.assertIsNone(variations.getRawData("I"))
+		self.assertEqual(variations.getRawData("space"), GVAR_DATA[28:52])
+
+	def test_compile_lazy(self):
+		font, gvar = self.makeFont({})
+		font.lazy = True
+		gvar.decompile(GVAR_DATA, font)
+		self.assertEqual(hexStr(gvar.compile(font)), hexStr(GVAR_DATA))
+		gvar.variations["space"]
+		self.assertEqual(hexStr(gvar.compile(font)), hexStr(GVAR_DATA))
+
+	def test_copyGlyphs(self):
+		font, gvar = self.makeFont({})
+		font.lazy = True
+		gvar.decompile(GVAR_DATA, font)
+		gvar.variations = gvar.variations.copyGlyphs([".notdef", "I"])
+		self.assertEqual(sorted(gvar.variations.keys()), [".notdef", "I"])
+		self.assertEqual(gvar.variations._variations, {})
+		font.glyphOrder_ = [".notdef", "I"]
+		data = gvar.compile(font)
+		font, gvar = self.makeFont({})
+		font.glyphOrder_ = [".notdef", "I"]
+		gvar.decompile(data, font)
+		self.assertEqual(dict(gvar.variations),
+		                 {".notdef": [], "I": GVAR_VARIATIONS["I"]})
+
 	def test_fromXML(self):
 		font, gvar = self.makeFont({})
 		for name, attrs, content in parseXML(GVAR_XML):
@@ -5,7 +5,8 @@ from fontTools.misc.testTools import parseXML, getXML
 from fontTools.misc.textTools import deHexStr
 from fontTools.ttLib import TTFont, newTable, TTLibError
 from fontTools.misc.loggingTools import CapturingLogHandler
-from fontTools.ttLib.tables._h_m_t_x import table__h_m_t_x, log
+from fontTools.ttLib.tables._h_m_t_x import table__h_m_t_x, CompactMetrics, log
+import array
 import struct
 import unittest
 
@@ -213,6 +214,59 @@ class HmtxTableTest(unittest.TestCase):
 
         self.assertEqual(mtxTable.metrics, {'A': (674, -11), 'B': (0, 0)})
 
+    def test_decompile_compact(self):
+        font = self.makeFont(numGlyphs=4, numberOfMetrics=2)
+        data = deHexStr("02A2 FFF5 0278 004F 0036 FFFC")
+
+        mtxTable = newTable(self.tag)
+        mtxTable.decompile(data, font)
+
+        self.assertIsInstance(mtxTable.metrics, CompactMetrics)
+        self.assertIsInstance(mtxTable.metrics.advances, array.array)
+        self.assertEqual(list(mtxTable.getAdvances()), [674, 632, 632, 632])
+        self.assertEqual(list(mtxTable.getSideBearings()), [-11, 79, 54, -4])
+        self.assertEqual(mtxTable.getAdvances(['C', 'A']), [632, 674])
+        self.assertEqual(mtxTable.compile(font), data)
+
+    def test_compact_setitem_delitem(self):
+        font = self.makeFont(numGlyphs=3, numberOfMetrics=3)
+        data = deHexStr("02A2 FFF5 0278 004F 02C6 0036")
+        mtxTable = newTable(self.tag)
+        mtxTable.decompile(data, font)
+        metrics = mtxTable.metrics
+
+        mtxTable['D'] = (100, 10)
+        self.assertEqual(metrics.keys(), ['A', 'B', 'C', 'D'])
+        self.assertEqual(metrics['D'], (100, 10))
+        self.assertIsInstance(metrics.advances, array.array)
+
+        # values that don't fit in the arrays turn them into lists
+        mtxTable['B'] = (-1.5, 20)
+        self.assertEqual(metrics.advances, [674, -1.5, 710, 100])
+        self.assertEqual(metrics['A'], (674, -11))
+
+        del mtxTable['A']
+        self.assertTrue('A' not in metrics)
+        self.assertEqual(
+            dict(metrics), {'B': (-1.5, 20), 'C': (710, 54), 'D': (100, 10)})
+
+    def test_compile_compact_modified(self):
+        font = self.makeFont(numGlyphs=3, numberOfMetrics=3)
+        data = deHexStr("02A2 FFF5 0278 004F 02C6 0036")
+        mtxTable = newTable(self.tag)
+        mtxTable.decompile(data, font)
+
+        mtxTable['C'] = (632, 1)
+        self.assertEqual(
+            mtxTable.compile(font), deHexStr("02A2 FFF5 0278 004F 0001"))
+        self.assertEqual(getattr(
+            font[self.tableClass.headerTag],
+            self.tableClass.numberOfMetricsName), 2)
+
+        mtxTable['C'] = (632.4, 1.6)
+        self.assertEqual(
+            mtxTable.compile(font), deHexStr("02A2 FFF5 0278 004F 0278 0002"))
+
 
 if __name__ == "__main__":
     import sys
@@ -1,7 +1,12 @@
 from __future__ import print_function, division, absolute_import
 from fontTools.misc.py23 import *
 from fontTools.misc.textTools import deHexStr
-from fontTools.ttLib.tables.otBase import OTTableReader, OTTableWriter
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables.otBase import (
+    OTTableReader, OTTableWriter, OTLayoutPacker)
+from fontTools.ttLib.tables import otTables
+from fontTools.otlLib import builder
+import random
 import unittest
 
 
@@ -91,6 +96,163 @@ class OTTableWriterTest(unittest.TestCase):
         self.assertEqual(writer.getData(), deHexStr("BE EF CA FE"))
 
 
+class OTLayoutPackerTest(unittest.TestCase):
+
+    @staticmethod
+    def makeFont(tableTag, lookups):
+        font = TTFont()
+        font.setGlyphOrder([".notdef"] + ["g%d" % i for i in range(1500)])
+        table = getattr(otTables, tableTag)()
+        table.Version = 0x00010000
+        table.ScriptList = otTables.ScriptList()
+        table.ScriptList.ScriptRecord = []
+        table.FeatureList = otTables.FeatureList()
+        table.FeatureList.FeatureRecord = []
+        table.LookupList = otTables.LookupList()
+        table.LookupList.Lookup = lookups
+        font[tableTag] = newTable(tableTag)
+        font[tableTag].table = table
+        return font
+
+    @staticmethod
+    def roundTrip(font, tableTag):
+        data = font[tableTag].compile(font)
+        table = newTable(tableTag)
+        table.decompile(data, font)
+        return table.table
+
+    def test_promote_lookups(self):
+        rng = random.Random(0)
+        glyphs = ["g%d" % i for i in range(1500)]
+        mappings = [dict(zip(rng.sample(glyphs, 1000), rng.sample(glyphs, 1000)))
+                    for i in range(40)]
+        font = self.makeFont("GSUB", [
+            builder.buildLookup([builder.buildSingleSubstSubtable(mapping)])
+            for mapping in mappings])
+
+        table = self.roundTrip(font, "GSUB")
+
+        lookups = table.LookupList.Lookup
+        self.assertEqual(len(lookups), 40)
+        extensions = [i for i, lookup in enumerate(lookups)
+                      if lookup.LookupType == 7]
+        # only as many as needed, and never the last lookups, that fit
+        self.assertTrue(0 < len(extensions) < 40)
+        self.assertNotIn(39, extensions)
+        for lookup, mapping in zip(lookups, mappings):
+            subtable = lookup.SubTable[0]
+            if lookup.LookupType == 7:
+                subtable = subtable.ExtSubTable
+            self.assertEqual(subtable.mapping, mapping)
+
+    def test_split_subtable(self):
+        rng = random.Random(0)
+        glyphs = ["g%d" % i for i in range(1500)]
+        glyphMap = {glyph: i + 1 for i, glyph in enumerate(glyphs)}
+        pairs = {}
+        for first in glyphs[:1000]:
+            for second in rng.sample(glyphs, 20):
+                pairs[(first, second)] = (
+                    builder.buildValue({"XAdvance": rng.randint(-100, 100)}),
+                    None)
+        font = self.makeFont("GPOS", [builder.buildLookup(
+            builder.buildPairPosGlyphs(pairs, glyphMap))])
+
+        table = self.roundTrip(font, "GPOS")
+
+        lookup, = table.LookupList.Lookup
+        self.assertGreater(len(lookup.SubTable), 1)
+        result = {}
+        for subtable in lookup.SubTable:
+            subtable = getattr(subtable, "ExtSubTable", subtable)
+            for first, pairSet in zip(subtable.Coverage.glyphs,
+                                      subtable.PairSet):
+                for record in pairSet.PairValueRecord:
+                    result[(first, record.SecondGlyph)] = record.Value1.XAdvance
+        self.assertEqual(result, {key: value[0].XAdvance
+                                  for key, value in pairs.items()})
+
+    def test_no_overflow(self):
+        font = self.makeFont("GSUB", [builder.buildLookup([
+            builder.buildSingleSubstSubtable({"g1": "g2"})])])
+        writer = OTTableWriter(tableTag="GSUB")
+        font["GSUB"].table.compile(writer, font)
+        packer = OTLayoutPacker(font["GSUB"].table, font, "GSUB")
+        self.assertEqual(packer.pack(), writer.getAllData())
+
+
+class CompileRawTest(unittest.TestCase):
+
+    def setUp(self):
+        glyphs = ["g%d" % i for i in range(20)]
+        glyphMap = {glyph: i + 1 for i, glyph in enumerate(glyphs)}
+        pairs = {}
+        for i, first in enumerate(glyphs[:10]):
+            for second in glyphs[i:i + 5]:
+                pairs[(first, second)] = (
+                    builder.buildValue({"XAdvance": i * 10 - 50}), None)
+        device = builder.buildValue(
+            {"XAdvance": 5, "XAdvDevice": builder.buildDevice({12: -1})})
+        font = OTLayoutPackerTest.makeFont("GPOS", [
+            builder.buildLookup(builder.buildPairPosGlyphs(pairs, glyphMap)),
+            builder.buildLookup([builder.buildSinglePosSubtable(
+                {"g1": device, "g2": device}, glyphMap)]),
+        ])
+        self.glyphOrder = font.getGlyphOrder()
+        self.data = font["GPOS"].compile(font)
+        self.expected = self.decompile(self.data, lazy=False)[0].table
+
+    def decompile(self, data, lazy):
+        font = TTFont(lazy=lazy)
+        font.setGlyphOrder(self.glyphOrder)
+        table = newTable("GPOS")
+        table.decompile(data, font)
+        return table, font
+
+    def test_untouched(self):
+        table, font = self.decompile(self.data, lazy=True)
+        lookup = table.table.LookupList.Lookup[1]
+        self.assertIn("reader", lookup.__dict__)
+
+        data = table.compile(font)
+
+        self.assertIn("reader", lookup.__dict__)
+        self.assertEqual(data, self.data)
+
+    def test_partly_decompiled(self):
+        table, font = self.decompile(self.data, lazy=True)
+        lookups = table.table.LookupList.Lookup
+        lookups[0].SubTable[0].Coverage.glyphs  # the PairSets stay lazy
+        lookups.append(lookups.pop(0))
+
+        data = table.compile(font)
+
+        self.assertIn("reader", lookups[1].SubTable[0].PairSet[0].__dict__)
+        new = self.decompile(data, lazy=False)[0].table
+        newLookups = new.LookupList.Lookup
+        self.assertEqual(newLookups, lookups)
+        self.assertEqual(newLookups[1], self.expected.LookupList.Lookup[0])
+
+    def test_inherited_value_changed(self):
+        table, font = self.decompile(self.data, lazy=True)
+        pairPos = table.table.LookupList.Lookup[0].SubTable[0]
+        pairPos.ValueFormat1 |= 0x0001  # XPlacement
+
+        data = table.compile(font)
+
+        # the PairSets were read with the old ValueFormat, and written with
+        # the new one
+        self.assertNotIn("reader", pairPos.PairSet[0].__dict__)
+        pairPos = self.decompile(data, lazy=False)[0].table.LookupList.Lookup[0].SubTable[0]
+        expected = self.expected.LookupList.Lookup[0].SubTable[0]
+        for pairSet, expectedPairSet in zip(pairPos.PairSet, expected.PairSet):
+            for record, expectedRecord in zip(pairSet.PairValueRecord,
+                                              expectedPairSet.PairValueRecord):
+                self.assertEqual(record.Value1.XPlacement, 0)
+                self.assertEqual(record.Value1.XAdvance,
+                                 expectedRecord.Value1.XAdvance)
+
+
 if __name__ == "__main__":
     import sys
     sys.exit(unittest.main())
@@ -7,7 +7,13 @@ from fontTools.misc.testTools import FakeFont, makeXMLWriter
 from fontTools.misc.textTools import deHexStr
 import fontTools.ttLib.tables.otConverters as otConverters
 from fontTools.ttLib import newTable
-from fontTools.ttLib.tables.otBase import OTTableReader, OTTableWriter
+from fontTools.ttLib.tables.otBase import (
+    OTTableReader, OTTableWriter, ValueRecordFactory)
+from fontTools.ttLib.tables import otTables
+import copy
+import pickle
+import struct
+import threading
 import unittest
 
 
@@ -379,6 +385,41 @@ class LazyListTest(unittest.TestCase):
         self.assertEqual(l[0], 254)
         self.assertEqual(l[1], 255)
 
+    def readLazyArray(self, count):
+        reader = OTTableReader(bytesjoin(struct.pack(">H", i)
+                                         for i in range(count)))
+        font = FakeFont([])
+        font.lazy = True
+        converter = otConverters.UShort("UShort", 0, None, None)
+        l = converter.readArray(reader, font, {}, count)
+        self.assertIsInstance(l, otConverters._LazyList)
+        return l
+
+    def test_getitem_threads(self):
+        l = self.readLazyArray(1000)
+        reader = l.reader
+        results = []
+
+        def read():
+            results.append([l[i] for i in range(len(l))])
+
+        threads = [threading.Thread(target=read) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [list(range(1000))] * 8)
+        # the items were all read with the list's own reader
+        self.assertIs(l.reader, reader)
+
+    def test_copy(self):
+        l = self.readLazyArray(10)
+        self.assertEqual(l[1], 1)
+        for copied in (copy.deepcopy(l),
+                       pickle.loads(pickle.dumps(l, protocol=2))):
+            self.assertIsNot(copied.lock, l.lock)
+            self.assertEqual(list(copied), list(range(10)))
+
     def test_add_both_LazyList(self):
         ll1 = otConverters._LazyList([1])
         ll2 = otConverters._LazyList([2])
@@ -419,6 +460,58 @@ class LazyListTest(unittest.TestCase):
             tuple() + otConverters._LazyList()
 
 
+class FixedRecordReaderTest(unittest.TestCase):
+    font = FakeFont(".notdef A B C D E".split())
+
+    def readRecords(self, name, data, count, **localState):
+        tableClass = getattr(otTables, name)
+        conv = otConverters.Struct(name, "Count", 0, tableClass=tableClass)
+        reader = OTTableReader(deHexStr(data), localState=localState)
+        self.assertIsNotNone(conv.getRecordReader(reader))
+        records = conv.readArray(reader, self.font, {}, count)
+        # same as reading the records one by one
+        slowReader = OTTableReader(deHexStr(data), localState=localState)
+        self.assertEqual(records, [conv.read(slowReader, self.font, {})
+                                   for i in range(count)])
+        self.assertEqual(reader.pos, slowReader.pos)
+        return records
+
+    def test_RangeRecord(self):
+        records = self.readRecords(
+            "RangeRecord", "0001 0003 0000  0004 0005 0003", 2)
+        self.assertEqual(
+            [(r.Start, r.End, r.StartCoverageIndex) for r in records],
+            [("A", "C", 0), ("D", "E", 3)])
+
+    def test_PairValueRecord(self):
+        records = self.readRecords(
+            "PairValueRecord", "0002 FFCE  0003 0014", 2,
+            ValueFormat1=ValueRecordFactory(0x0004),
+            ValueFormat2=ValueRecordFactory(0))
+        self.assertEqual([r.SecondGlyph for r in records], ["B", "C"])
+        self.assertEqual([r.Value1.XAdvance for r in records], [-50, 20])
+        self.assertEqual([r.Value2 for r in records], [None, None])
+
+    def test_empty(self):
+        self.assertEqual(self.readRecords("RangeRecord", "", 0), [])
+
+    def test_truncated(self):
+        conv = otConverters.Struct("RangeRecord", "Count", 0,
+                                   tableClass=otTables.RangeRecord)
+        reader = OTTableReader(deHexStr("0001 0003 0000  0004"))
+        with self.assertRaises(struct.error):
+            conv.readArray(reader, self.font, {}, 2)
+
+    def test_not_fixed(self):
+        reader = OTTableReader(b"")
+        conv = otConverters.Struct("Class1Record", "Count", 0,
+                                   tableClass=otTables.Class1Record)
+        self.assertIsNone(conv.getRecordReader(reader))
+        conv = otConverters.Table("Coverage", "Count", 0,
+                                  tableClass=otTables.Coverage)
+        self.assertIsNone(conv.getRecordReader(reader))
+
+
 if __name__ == "__main__":
     import sys
     sys.exit(unittest.main())
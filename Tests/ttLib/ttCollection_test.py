@@ -0,0 +1,79 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont, TTCollection, TTLibError
+from fontTools.ttLib.sfnt import readTTCHeader
+import os
+import pytest
+
+
+TTC_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "ttx", "data", "TestTTC.ttc")
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"lazy": True}, {"mmap": True}])
+def test_load_all_fonts(kwargs):
+    collection = TTCollection(TTC_PATH, **kwargs)
+    assert len(collection) == 2
+    for i, font in enumerate(collection):
+        expected = TTFont(TTC_PATH, fontNumber=i)
+        assert font.keys() == expected.keys()
+        assert font['maxp'].numGlyphs == expected['maxp'].numGlyphs
+        assert font.getGlyphOrder() == expected.getGlyphOrder()
+    # all faces read from the same stream
+    assert collection[0].reader.file is collection[1].reader.file
+    collection.close()
+
+
+def test_save_shares_identical_tables():
+    collection = TTCollection(TTC_PATH)
+    shared = BytesIO()
+    collection.save(shared)
+    unshared = BytesIO()
+    collection.save(unshared, shareTables=False)
+    assert len(shared.getvalue()) < len(unshared.getvalue())
+
+    shared.seek(0)
+    header = readTTCHeader(shared)
+    assert header.numFonts == 2
+    shared.seek(0)
+    fonts = TTCollection(shared).fonts
+    glyf0 = fonts[0].reader.tables['glyf']
+    glyf1 = fonts[1].reader.tables['glyf']
+    assert glyf0.offset == glyf1.offset
+    head0 = fonts[0].reader.tables['head']
+    head1 = fonts[1].reader.tables['head']
+    assert head0.offset != head1.offset
+    for i, font in enumerate(fonts):
+        expected = TTFont(TTC_PATH, fontNumber=i)
+        for tag in ('glyf', 'hmtx', 'cmap', 'name'):
+            assert font.getTableData(tag) == expected.getTableData(tag)
+
+
+def test_save_roundtrip_with_modified_table():
+    collection = TTCollection(TTC_PATH)
+    collection[1]['name'].setName(u"Other", 4, 3, 1, 0x409)
+    output = BytesIO()
+    collection.save(output)
+    output.seek(0)
+    fonts = TTCollection(output).fonts
+    assert fonts[0]['name'].getName(4, 3, 1, 0x409).toUnicode() == "Test TTF"
+    assert fonts[1]['name'].getName(4, 3, 1, 0x409).toUnicode() == "Other"
+
+
+@pytest.mark.parametrize("flavor", ["woff", "woff2"])
+def test_save_flavored_font_not_allowed(flavor):
+    collection = TTCollection(TTC_PATH)
+    collection[1].flavor = flavor
+    with pytest.raises(TTLibError, match="Can't save"):
+        collection.save(BytesIO())
+
+
+def test_fontNumber_not_allowed():
+    with pytest.raises(TypeError):
+        TTCollection(TTC_PATH, fontNumber=0)
+
+
+def test_not_a_collection():
+    path = os.path.join(os.path.dirname(TTC_PATH), "TestTTF.ttf")
+    with pytest.raises(TTLibError):
+        TTCollection(path)
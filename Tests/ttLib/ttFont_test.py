@@ -0,0 +1,250 @@
+from __future__ import print_function, division, absolute_import
+from fontTools.misc.py23 import *
+from fontTools.ttLib import TTFont, newTable
+import copy
+import os
+import pickle
+import sys
+import threading
+import time
+import pytest
+
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "ttx", "data")
+TTF_PATH = os.path.join(DATA_DIR, "TestTTF.ttf")
+OTF_PATH = os.path.join(DATA_DIR, "TestOTF.otf")
+
+
+def test_getTableReadOnly_is_clean():
+    font = TTFont(TTF_PATH)
+    cmap = font.getTableReadOnly('cmap')
+    assert font.isLoaded('cmap')
+    assert not font.isDirty('cmap')
+    assert font.getTableReadOnly('cmap') is cmap
+    # the original data is returned, without compiling the table
+    cmap.compile = None
+    assert font.getTableData('cmap') == font.reader['cmap']
+    assert font['cmap'] is cmap
+    assert font.isDirty('cmap')
+
+
+def test_saveXML_keeps_tables_clean():
+    font = TTFont(TTF_PATH)
+    font.saveXML(StringIO())
+    tags = [tag for tag in font.keys() if tag != 'GlyphOrder']
+    assert all(font.isLoaded(tag) for tag in tags)
+    assert not any(font.isDirty(tag) for tag in tags)
+
+
+def test_save_recompiles_tables_reading_dirty_tables():
+    font = TTFont(TTF_PATH)
+    os2 = font.getTableReadOnly('OS/2')
+    assert os2.usLastCharIndex < 0xFFF0
+    font['cmap'].getcmap(3, 1).cmap[0xFFF0] = '.notdef'
+    assert font.isDirty('OS/2')
+    buf = BytesIO()
+    font.save(buf)
+    buf.seek(0)
+    assert TTFont(buf)['OS/2'].usLastCharIndex == 0xFFF0
+
+
+def test_unload():
+    font = TTFont(TTF_PATH)
+    cmap = font.getTableReadOnly('cmap')
+    assert font.unload('cmap')
+    assert not font.isLoaded('cmap')
+    assert not font.unload('cmap')
+    # it's decompiled again the next time it's accessed
+    assert font.getTableReadOnly('cmap') is not cmap
+    assert font.getTableReadOnly('cmap').getcmap(3, 1).cmap == \
+        cmap.getcmap(3, 1).cmap
+    # dirty tables are never unloaded
+    font['name']
+    assert not font.unload('name')
+    assert font.isLoaded('name')
+
+
+def test_getitem_is_dirty():
+    font = TTFont(TTF_PATH)
+    font['name'].setName(u"Modified", 1, 3, 1, 0x409)
+    assert font.isDirty('name')
+    # once returned by __getitem__, a table stays dirty
+    font.getTableReadOnly('name')
+    assert font.isDirty('name')
+    buf = BytesIO()
+    font.save(buf)
+    buf.seek(0)
+    font2 = TTFont(buf)
+    assert font2['name'].getName(1, 3, 1, 0x409).toUnicode() == u"Modified"
+
+
+def test_setitem_and_new_tables_are_dirty():
+    font = TTFont(TTF_PATH)
+    font.getTableReadOnly('post')
+    font['post'] = newTable('post')
+    assert font.isDirty('post')
+    font = TTFont()
+    font['head'] = newTable('head')
+    assert font.isDirty('head')
+
+
+def test_dirty_dependency():
+    font = TTFont(TTF_PATH)
+    font.getTableReadOnly('glyf')
+    # tables read by decompilers are loaded as clean
+    assert font.isLoaded('loca')
+    assert not font.isDirty('loca')
+    font['glyf']
+    # loca depends on glyf, so it must be compiled again
+    assert font.isDirty('loca')
+    assert not font.isDirty('hmtx')
+
+
+def test_setGlyphOrder_makes_tables_dirty():
+    font = TTFont(TTF_PATH)
+    glyphOrder = font.getGlyphOrder()
+    assert not font.isDirty('post')
+    font.setGlyphOrder([".notdef"] + ["x%d" % i for i in range(1, len(glyphOrder))])
+    assert font.isDirty('post')
+
+
+@pytest.mark.parametrize("path", [TTF_PATH, OTF_PATH])
+def test_save_clean_tables(path):
+    font = TTFont(path, recalcTimestamp=False)
+    for tag in font.keys():
+        if tag != "GlyphOrder":
+            font.getTableReadOnly(tag)
+    assert not any(font.isDirty(tag) for tag in font.keys())
+    buf = BytesIO()
+    font.save(buf, reorderTables=False)
+    buf.seek(0)
+    reference = TTFont(path)
+    saved = TTFont(buf)
+    for tag in reference.keys():
+        if tag != "GlyphOrder":
+            assert saved.getTableData(tag) == reference.getTableData(tag)
+
+
+AOTS_PATH = os.path.join(
+    os.path.dirname(__file__), "tables", "data", "aots",
+    "gpos_chaining2_boundary_f2.otf")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires fork")
+@pytest.mark.parametrize("path", [TTF_PATH, OTF_PATH, AOTS_PATH])
+def test_save_workers(path):
+    expected = BytesIO()
+    font = TTFont(path, recalcTimestamp=False)
+    for tag in font.keys():
+        font[tag]
+    font.save(expected)
+    font = TTFont(path, recalcTimestamp=False)
+    for tag in font.keys():
+        font[tag]
+    assert "name" in font._getIndependentTables(font.keys()[1:])
+    assert "loca" not in font._getIndependentTables(font.keys()[1:])
+    output = BytesIO()
+    font.save(output, workers=2)
+    assert output.getvalue() == expected.getvalue()
+
+
+def test_save_workers_lazy(tmpdir):
+    font = TTFont(AOTS_PATH, lazy=True)
+    font['GPOS']
+    assert font._createCompilePool(2) is None
+    output = BytesIO()
+    font.save(output, workers=2)
+    output.seek(0)
+    assert TTFont(output)['GPOS'].table.LookupList.LookupCount == \
+        font['GPOS'].table.LookupList.LookupCount
+
+
+def _runThreads(target, count=8):
+    start = threading.Event()
+    errors = []
+
+    def run():
+        start.wait()
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_getitem_threads_decompile_once(monkeypatch):
+    font = TTFont(TTF_PATH)
+    tableClass = type(newTable('maxp'))
+    decompile = tableClass.decompile
+    decompiling = threading.Event()
+    calls = []
+
+    def slowDecompile(self, data, ttFont):
+        calls.append(self)
+        decompiling.set()
+        time.sleep(0.05)
+        decompile(self, data, ttFont)
+
+    monkeypatch.setattr(tableClass, "decompile", slowDecompile)
+    results = []
+    first = threading.Thread(target=lambda: results.append(font['maxp']))
+    first.start()
+    decompiling.wait()
+    # not visible to other threads until fully decompiled
+    assert not font.isLoaded('maxp')
+    _runThreads(lambda: results.append(font['maxp'].numGlyphs))
+    first.join()
+    assert len(calls) == 1
+    assert results[0] is calls[0]
+    assert results[1:] == [6] * 8
+
+
+@pytest.mark.parametrize("lazy", [None, True])
+def test_shared_font_threads(lazy):
+    path = os.path.join(
+        os.path.dirname(__file__), "tables", "data", "aots",
+        "gpos1_1_lookupflag_f1.otf")
+    expected = TTFont(path, lazy=False)
+    expectedGPOS = expected['GPOS'].compile(expected)
+    ttf = TTFont(TTF_PATH, lazy=lazy)
+    expectedTTF = TTFont(TTF_PATH)
+    font = TTFont(path, lazy=lazy)
+
+    def check():
+        assert font.getGlyphOrder() == expected.getGlyphOrder()
+        gpos = font['GPOS'].table
+        for lookup in gpos.LookupList.Lookup:
+            for subtable in lookup.SubTable:
+                subtable.Coverage.glyphs
+        assert font['GPOS'].compile(font) == expectedGPOS
+        glyf = ttf['glyf']
+        for glyphName in ttf.getGlyphOrder():
+            assert (glyf[glyphName].getCoordinates(glyf)[0] ==
+                    expectedTTF['glyf'][glyphName].getCoordinates(glyf)[0])
+
+    _runThreads(check)
+
+
+@pytest.mark.parametrize("copyFont", [
+    copy.deepcopy,
+    lambda font: pickle.loads(pickle.dumps(font)),
+])
+def test_copy_and_pickle(copyFont):
+    font = TTFont(TTF_PATH, lazy=False)
+    font['maxp']
+    fontCopy = copyFont(font)
+    assert fontCopy._threadState is not font._threadState
+    assert fontCopy['maxp'].numGlyphs == 6
+    # tables not loaded before the copy are loaded from the copied reader
+    _runThreads(lambda: fontCopy['glyf'])
+    assert fontCopy.isLoaded('glyf') and not font.isLoaded('glyf')
+    assert fontCopy['hmtx'].metrics == font['hmtx'].metrics
+
@@ -123,6 +123,32 @@ class TTXTest(unittest.TestCase):
                 (os.path.join(self.tempdir, file_names[i]),
                  os.path.join(self.tempdir, file_names[i].split('.')[0] + extensions[i])))
 
+    def test_parseOptions_jobs(self):
+        temp_path = self.temp_font(self.getpath('TestTTF.ttf'), 'TestTTF.ttf')
+        _, options = ttx.parseOptions(['-j', '3', temp_path])
+        self.assertEqual(options.processes, 3)
+        _, options = ttx.parseOptions(['--jobs=1', temp_path])
+        self.assertEqual(options.processes, 1)
+        with self.assertRaises(getopt.GetoptError):
+            ttx.parseOptions(['-j', 'x', temp_path])
+
+    def test_process_jobs(self):
+        file_names = ['TestOTF.otf', 'TestTTF.ttf', 'TestTTF.ttx']
+        temp_paths = [self.temp_font(self.getpath(file_name), file_name)
+                      for file_name in file_names]
+        with open(os.path.join(self.tempdir, 'Bad.ttx'), 'w') as f:
+            f.write('<?xml version="1.0"?>\n<ttFont sfntVersion="\\x00\\x01\\x00\\x00">\n')
+        temp_paths.insert(1, os.path.join(self.tempdir, 'Bad.ttx'))
+        jobs, options = ttx.parseOptions(['-q', '-j', '2'] + temp_paths)
+        with self.assertRaises(SystemExit) as cm:
+            ttx.process(jobs, options)
+        self.assertEqual(cm.exception.code, 1)
+        # the other files were processed
+        for action, input, output in jobs:
+            if input.endswith('Bad.ttx'):
+                continue
+            self.assertTrue(os.path.getsize(output) > 0)
+
     def test_guessFileType_ttf(self):
         file_name = 'TestTTF.ttf'
         font_path = self.getpath(file_name)
@@ -139,6 +139,40 @@ class MutatorTest(unittest.TestCase):
         expected_ttx_path = self.get_test_output(varfont_name + '-instance.ttx')
         self.expect_ttx(instfont, expected_ttx_path, tables)
 
+    def test_varlib_mutator_jobs(self):
+        suffix = '.ttf'
+        ttx_dir = self.get_test_input('master_ttx_varfont_ttf')
+
+        self.temp_dir()
+        ttx_paths = self.get_file_list(ttx_dir, '.ttx', 'Mutator_IUP')
+        for path in ttx_paths:
+            self.compile_font(path, suffix, self.tempdir)
+
+        varfont_path = os.path.join(self.tempdir, 'Mutator_IUP' + suffix)
+        varfont_paths = []
+        for i in range(2):
+            path = os.path.join(self.tempdir, 'Mutator_IUP%d%s' % (i, suffix))
+            shutil.copy(varfont_path, path)
+            varfont_paths.append(path)
+
+        args = ['-j', '2'] + varfont_paths + ['wdth=80', 'ASCN=628']
+        self.assertEqual(mutator(args), 0)
+
+        expected_ttx_path = self.get_test_output('Mutator_IUP-instance.ttx')
+        for path in varfont_paths:
+            instfont_path = os.path.splitext(path)[0] + '-instance' + suffix
+            instfont = TTFont(instfont_path)
+            tables = [table_tag for table_tag in instfont.keys() if table_tag != 'head']
+            self.expect_ttx(instfont, expected_ttx_path, tables)
+
+        # a missing file fails alone
+        args = ['-j', '2', varfont_paths[0], varfont_path + '.missing', 'wdth=80']
+        self.assertEqual(mutator(args), 1)
+
+        # a -j option without a value is an error
+        self.assertEqual(mutator(varfont_paths + ['wdth=80', '-j']), 2)
+        self.assertEqual(mutator(varfont_paths + ['-jx', 'wdth=80']), 2)
+
 
 if __name__ == "__main__":
     sys.exit(unittest.main())